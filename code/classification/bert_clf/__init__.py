@@ -0,0 +1,4 @@
+from .texts import *
+from .inference import *
+from .training import *
+from .embeddings import *
@@ -0,0 +1,73 @@
+import pandas as pd
+from .inference import BertInference
+from .texts import RepositoryText
+
+
+class InferenceBenchmark:
+  '''
+  Class that compares the inference modes of `BertInference` on a CSV file
+  of repositories: one text per forward pass like in BERT_clf.ipynb, batches
+  of similar length, and batches with int8 linear layers.
+
+  For every mode the throughput, the number of tokens and padded tokens
+  (i.e. the work actually done) and the share of predictions that agree with
+  the first mode are reported.
+
+  Attributes
+  ----------
+  model_path: str
+    Path of a "BERT_ft_Epoch*.model" state dict of the notebook.
+  file_path: str
+    CSV file of repositories, e.g. of the open-source search.
+  limit: int
+    If given, only the first limit repositories are classified.
+  modes: list
+    The (batch_size, quantize) pairs that are compared.
+
+  Methods
+  -------
+  run() -> pd.DataFrame
+    Classifies the repositories in every mode and returns one row per mode.
+
+  Examples
+  --------
+  ```sh
+  cd code/classification
+  python -m bert_clf.benchmark Models/BERT_ft_Epoch5.model \
+    ../opensource_search/data/appended/data_filtered_appended_1.csv 500
+  ```
+  '''
+
+  def __init__(self, model_path: str, file_path: str, limit: int = None,
+               modes: list = None):
+    self.model_path: str = model_path
+    self.file_path: str = file_path
+    self.limit: int = limit
+    self.modes: list = modes or [(1, False), (16, False), (16, True)]
+
+  def run(self) -> pd.DataFrame:
+    '''Classifies the repositories in every mode, see the class description.'''
+    df: pd.DataFrame = pd.read_csv(self.file_path)
+    if self.limit is not None:
+      df = df.head(self.limit)
+    texts: pd.Series = RepositoryText().build(df)
+    rows: list = []
+    reference: pd.Series = None
+    for batch_size, quantize in self.modes:
+      clf: BertInference = BertInference(self.model_path,
+                                         batch_size=batch_size,
+                                         quantize=quantize)
+      predictions: pd.Series = clf.classify(df, texts)['prediction']
+      reference = predictions if reference is None else reference
+      rows.append({'batch_size': batch_size, 'int8': quantize, **clf.stats,
+                   'agreement': (predictions == reference).mean()})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+  import sys
+  pd.set_option('display.width', 200)
+  results: pd.DataFrame = InferenceBenchmark(
+    sys.argv[1], sys.argv[2],
+    int(sys.argv[3]) if len(sys.argv) > 3 else None).run()
+  print(results.round(3).to_string(index=False))
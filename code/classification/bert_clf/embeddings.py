@@ -0,0 +1,361 @@
+import hashlib
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+import torch
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_validate
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
+from transformers import BertModel, BertTokenizerFast
+from .texts import RepositoryText
+
+
+class BertEmbedder:
+  '''
+  Class that computes one vector per text with a frozen BERT model, without
+  truncating long READMEs.
+
+  Every text is tokenized completely and split into chunks of up to
+  max_length tokens (including [CLS] and [SEP]). The chunks of all texts are
+  batched by length like in `BertInference`, every chunk is embedded as the
+  mean of its last hidden states, and the vector of a text is the mean of
+  its chunks weighted by their number of tokens.
+
+  Attributes
+  ----------
+  model_name: str
+    Name of the pretrained BERT model.
+  model_path: str
+    Optional "BERT_ft_Epoch*.model" state dict of the notebook, whose
+    encoder weights replace the pretrained ones.
+  batch_size: int
+    Number of chunks per batch.
+  max_length: int
+    Number of tokens per chunk.
+  max_chunks: int
+    Only the first max_chunks chunks of a text are embedded, None for all.
+  dim: int
+    Size of the vectors.
+
+  Methods
+  -------
+  embed(texts: list) -> np.ndarray
+    Returns one float32 vector per text.
+  '''
+
+  def __init__(self, model_name: str = 'bert-base-uncased',
+               model_path: str = None, batch_size: int = 16,
+               max_length: int = 512, max_chunks: int = 32,
+               num_threads: int = None):
+    self.logger = logging.getLogger('classification_logger')
+    self.model_name: str = model_name
+    self.model_path: str = model_path
+    self.batch_size: int = batch_size
+    self.max_length: int = max_length
+    self.max_chunks: int = max_chunks
+    if num_threads is not None:
+      torch.set_num_threads(num_threads)
+    self.tokenizer: BertTokenizerFast = BertTokenizerFast.from_pretrained(
+      model_name, do_lower_case=True)
+    self.model: BertModel = BertModel.from_pretrained(model_name)
+    if model_path is not None:
+      self._load_encoder(model_path)
+    self.model.eval()
+    self.dim: int = self.model.config.hidden_size
+
+  def _load_encoder(self, model_path: str) -> None:
+    '''
+    Replaces the encoder weights by those of a notebook checkpoint. Raises a
+    ValueError if the checkpoint lacks weights of the encoder or holds
+    weights it does not have, e.g. of another model.
+    '''
+    state: dict = torch.load(model_path, map_location='cpu')
+    # keys of BertForSequenceClassification start with "bert.", the
+    # classifier is not part of the encoder
+    result = self.model.load_state_dict(
+      {key[len('bert.'):]: value for key, value in state.items()
+       if key.startswith('bert.') and not key.endswith('position_ids')},
+      strict=False)
+    # position_ids is stored by older transformers versions only
+    missing: list = [key for key in result.missing_keys
+                     if not key.endswith('position_ids')]
+    if missing or result.unexpected_keys:
+      raise ValueError(f'{model_path} does not fit {self.model_name}, '
+                       f'missing weights: {missing}, unexpected weights: '
+                       f'{result.unexpected_keys}')
+
+  def _chunks(self, texts: list) -> tuple[list, np.ndarray]:
+    '''Returns the token ids of all chunks and the text of every chunk.'''
+    ids: list = self.tokenizer(
+      texts, add_special_tokens=False, return_attention_mask=False,
+      return_token_type_ids=False, verbose=False)['input_ids']
+    body: int = self.max_length - 2
+    cls, sep = self.tokenizer.cls_token_id, self.tokenizer.sep_token_id
+    chunks: list = []
+    owners: list = []
+    for i, text_ids in enumerate(ids):
+      starts: range = range(0, max(len(text_ids), 1), body)
+      for start in starts[:self.max_chunks]:
+        chunks.append([cls] + text_ids[start:start + body] + [sep])
+        owners.append(i)
+    return chunks, np.array(owners, dtype=np.int64)
+
+  def embed(self, texts: list) -> np.ndarray:
+    '''Returns a (len(texts), dim) float32 array of text vectors.'''
+    texts = list(texts)
+    chunks, owners = self._chunks(texts)
+    lengths: np.ndarray = np.fromiter(map(len, chunks), dtype=np.int64,
+                                      count=len(chunks))
+    vectors: np.ndarray = np.zeros((len(chunks), self.dim), dtype=np.float32)
+    order: np.ndarray = np.argsort(-lengths, kind='stable')
+    with torch.inference_mode():
+      for i in range(0, len(order), self.batch_size):
+        positions: np.ndarray = order[i:i + self.batch_size]
+        width: int = int(lengths[positions].max())
+        input_ids: np.ndarray = np.full((len(positions), width),
+                                        self.tokenizer.pad_token_id,
+                                        dtype=np.int64)
+        for row, position in enumerate(positions):
+          input_ids[row, :lengths[position]] = chunks[position]
+        mask: torch.Tensor = torch.from_numpy(
+          (np.arange(width) < lengths[positions, None]).astype(np.int64))
+        hidden: torch.Tensor = self.model(
+          input_ids=torch.from_numpy(input_ids),
+          attention_mask=mask).last_hidden_state
+        summed: torch.Tensor = (hidden * mask.unsqueeze(-1)).sum(dim=1)
+        vectors[positions] = (summed / mask.sum(dim=1, keepdim=True)).numpy()
+    # mean of the chunks weighted by their tokens
+    pooled: np.ndarray = np.zeros((len(texts), self.dim), dtype=np.float64)
+    np.add.at(pooled, owners, vectors * lengths[:, None])
+    pooled /= np.bincount(owners, weights=lengths,
+                          minlength=len(texts))[:, None]
+    self.logger.info(f'Embedded {len(texts)} texts in {len(chunks)} chunks')
+    return pooled.astype(np.float32)
+
+
+class EmbeddingStore:
+  '''
+  Class that keeps the vectors of `BertEmbedder` on disk, one row per
+  repository, so every repository is embedded only once.
+
+  The vectors are appended to "vectors.f32" (raw float32 rows) and their
+  keys to "keys.txt", the model in "meta.json". A row only counts once its
+  key is written, rows of an interrupted update are cut off by the next one.
+  Loading maps the vectors into memory. `update` only embeds the keys that
+  are not stored yet, e.g. the repositories of a new crawl. Repositories
+  are keyed by their "id"; frames without ids such as emaemi_text.csv are
+  keyed by the SHA-1 of their text.
+
+  Attributes
+  ----------
+  directory: str
+    Directory of the store.
+  embedder: BertEmbedder
+    Embedder of new texts, only needed by `update`.
+
+  Methods
+  -------
+  keys() -> list[str]
+    Returns the stored keys in order.
+  vectors(keys: list) -> np.ndarray
+    Returns the vectors of the given keys (default: all, memory-mapped).
+  update(keys: list, texts: list) -> int
+    Embeds and stores the texts of keys that are not stored yet.
+  update_frame(df: pd.DataFrame, key: str) -> list
+    Stores the repositories of df and returns their keys.
+
+  Examples
+  --------
+  ```py
+  store = EmbeddingStore('data/embeddings', BertEmbedder())
+  df = pd.read_csv('emaemi_text.csv')
+  X = store.vectors(store.update_frame(df))
+  print(EmbeddingHead('logistic').cross_validate(X, df['label']))
+  ```
+  '''
+
+  def __init__(self, directory: str = 'data/embeddings',
+               embedder: BertEmbedder = None):
+    self.logger = logging.getLogger('classification_logger')
+    self.directory: str = directory
+    self.embedder: BertEmbedder = embedder
+    self._keys: list = None
+    self._index: dict = None
+
+  def _path(self, file_name: str) -> str:
+    return os.path.join(self.directory, file_name)
+
+  def _meta(self) -> dict:
+    if not os.path.exists(self._path('meta.json')):
+      return None
+    with open(self._path('meta.json'), 'r', encoding='utf-8') as file:
+      return json.load(file)
+
+  def keys(self) -> list[str]:
+    '''Returns the stored keys in the order of their vectors.'''
+    if self._keys is None:
+      self._keys = []
+      if os.path.exists(self._path('keys.txt')):
+        with open(self._path('keys.txt'), 'r', encoding='utf-8') as file:
+          # every key ends with a newline, a last line without one is the
+          # partly written key of an interrupted update
+          self._keys = file.read().split('\n')[:-1]
+      self._index = {key: i for i, key in enumerate(self._keys)}
+    return self._keys
+
+  def vectors(self, keys: list = None) -> np.ndarray:
+    '''
+    Returns the vectors of keys in their order, or all vectors as a
+    read-only memory map. Raises a KeyError for keys that are not stored.
+    '''
+    stored: list = self.keys()
+    if not stored:
+      return np.zeros((0, 0), dtype=np.float32)
+    vectors: np.ndarray = np.memmap(self._path('vectors.f32'),
+                                    dtype=np.float32, mode='r',
+                                    shape=(len(stored), self._meta()['dim']))
+    if keys is None:
+      return vectors
+    return vectors[[self._index[str(key)] for key in keys]]
+
+  def update(self, keys: list, texts: list) -> int:
+    '''
+    Embeds the texts of the keys that are not stored yet and appends them.
+    Returns the number of new vectors.
+    '''
+    self.keys()
+    new: dict = {}
+    for key, text in zip(map(str, keys), texts):
+      if key not in self._index and key not in new:
+        new[key] = text
+    if not new:
+      return 0
+    meta: dict = self._meta()
+    if meta is not None and meta['model'] != self._model_id():
+      raise ValueError(f'The store holds vectors of {meta["model"]}, '
+                       f'not of {self._model_id()}')
+    vectors: np.ndarray = self.embedder.embed(list(new.values()))
+    os.makedirs(self.directory, exist_ok=True)
+    if meta is None:
+      with open(self._path('meta.json'), 'w', encoding='utf-8') as file:
+        json.dump({'model': self._model_id(), 'dim': self.embedder.dim}, file)
+    # vectors first, a key marks a complete row
+    self._truncate(self.embedder.dim)
+    with open(self._path('vectors.f32'), 'ab') as file:
+      file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    with open(self._path('keys.txt'), 'a', encoding='utf-8') as file:
+      file.write(''.join(f'{key}\n' for key in new))
+    for key in new:
+      self._index[key] = len(self._keys)
+      self._keys.append(key)
+    self.logger.info(f'Stored {len(new)} new vectors, {len(self._keys)} in '
+                     f'total')
+    return len(new)
+
+  def _truncate(self, dim: int) -> None:
+    '''
+    Cuts off what an interrupted `update` left behind, i.e. vectors without
+    a key and a partly written last key, so that new rows are appended right
+    after the last complete one. Raises a ValueError if there are fewer
+    vectors than keys.
+    '''
+    if os.path.exists(self._path('keys.txt')):
+      with open(self._path('keys.txt'), 'rb') as file:
+        content: bytes = file.read()
+      os.truncate(self._path('keys.txt'), content.rfind(b'\n') + 1)
+    size: int = len(self._keys) * dim * 4
+    stored: int = os.path.getsize(self._path('vectors.f32')) \
+      if os.path.exists(self._path('vectors.f32')) else 0
+    if stored < size:
+      raise ValueError(f'{self._path("vectors.f32")} holds {stored} bytes, '
+                       f'{size} are needed for {len(self._keys)} keys')
+    if stored > size:
+      self.logger.warning(f'Dropping {(stored - size) // (dim * 4)} vectors '
+                          f'without key of an interrupted update')
+      os.truncate(self._path('vectors.f32'), size)
+
+  def update_frame(self, df: pd.DataFrame, key: str = 'id') -> list:
+    '''
+    Stores the repositories of df (texts of `RepositoryText`) and returns
+    their keys, the SHA-1 of the text if df has no key column.
+    '''
+    texts: pd.Series = RepositoryText().build(df)
+    keys: list = df[key].astype(str).tolist() if key in df.columns else \
+      [hashlib.sha1(text.encode('utf-8')).hexdigest() for text in texts]
+    self.update(keys, texts.tolist())
+    return keys
+
+  def _model_id(self) -> str:
+    return (f'{self.embedder.model_name}:{self.embedder.model_path}:'
+            f'{self.embedder.max_length}:{self.embedder.max_chunks}')
+
+
+class EmbeddingHead:
+  '''
+  Class that trains a small classifier on stored vectors instead of
+  fine-tuning BERT, which takes seconds on the CPU and allows quick
+  experiments with the labels.
+
+  Attributes
+  ----------
+  kind: str
+    "logistic" for a logistic regression, "mlp" for a perceptron with one
+    hidden layer. The vectors are standardized first.
+  params: dict
+    Parameters of the scikit-learn estimator.
+  model: Pipeline
+    The estimator fitted by `fit`.
+
+  Methods
+  -------
+  cross_validate(X: np.ndarray, y: np.ndarray, folds: int, seed: int)
+      -> pd.DataFrame
+    Returns the weighted F1 score and accuracy of every fold.
+  fit(X: np.ndarray, y: np.ndarray) -> EmbeddingHead
+    Fits the head on all vectors.
+  predict_proba(X: np.ndarray) -> np.ndarray
+    Returns the class probabilities of vectors.
+  '''
+
+  def __init__(self, kind: str = 'logistic', **params):
+    if kind not in ('logistic', 'mlp'):
+      raise ValueError(f'kind must be "logistic" or "mlp", got "{kind}"')
+    self.kind: str = kind
+    self.params: dict = params
+    self.model: Pipeline = None
+
+  def _estimator(self, seed: int = 42) -> Pipeline:
+    if self.kind == 'logistic':
+      params: dict = {'C': 1.0, 'max_iter': 1000, **self.params}
+      return make_pipeline(StandardScaler(), LogisticRegression(**params))
+    params: dict = {'hidden_layer_sizes': (128,), 'alpha': 1e-3,
+                    'max_iter': 500, 'early_stopping': False,
+                    'random_state': seed, **self.params}
+    return make_pipeline(StandardScaler(), MLPClassifier(**params))
+
+  def cross_validate(self, X: np.ndarray, y: np.ndarray, folds: int = 5,
+                     seed: int = 42) -> pd.DataFrame:
+    '''
+    Returns the weighted F1 score (the metric of the notebook), accuracy and
+    fit time of every fold of a stratified cross-validation.
+    '''
+    scores: dict = cross_validate(
+      self._estimator(seed), np.asarray(X), np.asarray(y),
+      cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed),
+      scoring={'f1': 'f1_weighted', 'accuracy': 'accuracy'})
+    return pd.DataFrame({'f1': scores['test_f1'],
+                         'accuracy': scores['test_accuracy'],
+                         'fit_time': scores['fit_time']})
+
+  def fit(self, X: np.ndarray, y: np.ndarray) -> 'EmbeddingHead':
+    '''Fits the head on all vectors and returns it.'''
+    self.model = self._estimator().fit(np.asarray(X), np.asarray(y))
+    return self
+
+  def predict_proba(self, X: np.ndarray) -> np.ndarray:
+    '''Returns the class probabilities of every vector.'''
+    return self.model.predict_proba(np.asarray(X))
@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import Iterator
+import numpy as np
+import pandas as pd
+import torch
+from transformers import BertForSequenceClassification, BertTokenizerFast
+from .texts import RepositoryText
+
+
+class BertInference:
+  '''
+  Class that classifies repositories with a BERT model fine-tuned in
+  BERT_clf.ipynb, in batches on the CPU.
+
+  The checkpoint is loaded once. All texts are tokenized at once by the fast
+  tokenizer without padding, sorted by their number of tokens and split into
+  batches of similar length, so every batch is only padded to its longest
+  text instead of all texts to 512 tokens. The batches run under
+  `torch.inference_mode`, i.e. without autograd. Optionally the linear layers
+  are quantized to int8 weights (`torch.ao.quantization.quantize_dynamic`),
+  which is faster on most CPUs at a small cost of accuracy. The probabilities
+  are written back batch by batch, and the throughput of the last call is
+  available as `stats`.
+
+  Attributes
+  ----------
+  model_path: str
+    Path of a "BERT_ft_Epoch*.model" state dict of the notebook.
+  model_name: str
+    Name of the pretrained BERT model the checkpoint was fine-tuned from.
+  batch_size: int
+    Number of texts per batch.
+  max_length: int
+    Texts are truncated to this number of tokens, like in the notebook.
+  quantize: bool
+    If True, the linear layers use dynamic int8 quantization.
+  stats: dict
+    Number of documents, tokens and padded tokens, the seconds and the
+    documents per second of the last call of `classify`.
+
+  Methods
+  -------
+  predict(texts: list) -> Iterator[tuple[np.ndarray, np.ndarray]]
+    Yields the positions of every batch and their class probabilities.
+  classify(df: pd.DataFrame, texts: pd.Series) -> pd.DataFrame
+    Returns the predicted label and probabilities of every repository.
+  classify_csv(file_path: str, out_path: str, chunksize: int) -> dict
+    Classifies a CSV file of repositories in chunks.
+
+  Examples
+  --------
+  ```py
+  clf = BertInference('Models/BERT_ft_Epoch5.model', quantize=True)
+  df = pd.read_csv('data/appended/data_filtered_appended_1.csv')
+  df = df.join(clf.classify(df))
+  print(clf.stats)
+  ```
+  '''
+
+  labels: dict = {0: 'Unrelated', 1: 'Potential EMA/EMI'}
+
+  def __init__(self, model_path: str, model_name: str = 'bert-base-uncased',
+               batch_size: int = 16, max_length: int = 512,
+               quantize: bool = False, num_threads: int = None):
+    self.logger = logging.getLogger('classification_logger')
+    self.model_path: str = model_path
+    self.model_name: str = model_name
+    self.batch_size: int = batch_size
+    self.max_length: int = max_length
+    self.quantize: bool = quantize
+    if num_threads is not None:
+      torch.set_num_threads(num_threads)
+    self.tokenizer: BertTokenizerFast = BertTokenizerFast.from_pretrained(
+      model_name, do_lower_case=True)
+    self.model: torch.nn.Module = self._load_model()
+    self.stats: dict = {}
+
+  def _load_model(self) -> torch.nn.Module:
+    model: BertForSequenceClassification = \
+      BertForSequenceClassification.from_pretrained(
+        self.model_name, num_labels=len(self.labels),
+        output_attentions=False, output_hidden_states=False)
+    state: dict = torch.load(self.model_path, map_location='cpu')
+    # stored by older transformers versions, newer ones create it themselves
+    state.pop('bert.embeddings.position_ids', None)
+    model.load_state_dict(state)
+    model.eval()
+    if self.quantize:
+      model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8)
+    self.logger.info(f'Loaded {self.model_path}'
+                     + (' with int8 linear layers' if self.quantize else ''))
+    return model
+
+  def _batches(self, lengths: np.ndarray) -> list:
+    '''Returns the positions of the texts of every batch.'''
+    # longest first, so the memory peak is reached in the first batch
+    order: np.ndarray = np.argsort(-lengths, kind='stable')
+    return [order[i:i + self.batch_size]
+            for i in range(0, len(order), self.batch_size)]
+
+  def predict(self, texts: list) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    '''
+    Yields for every batch the positions of its texts in texts and their
+    class probabilities (one row per text, one column per label).
+    '''
+    ids: list = self.tokenizer(
+      list(texts), add_special_tokens=True, truncation=True,
+      max_length=self.max_length, return_attention_mask=False,
+      return_token_type_ids=False)['input_ids']
+    lengths: np.ndarray = np.fromiter(map(len, ids), dtype=np.int64,
+                                      count=len(ids))
+    self.stats['tokens'] = int(lengths.sum())
+    self.stats['padded_tokens'] = 0
+    with torch.inference_mode():
+      for positions in self._batches(lengths):
+        width: int = int(lengths[positions].max())
+        input_ids: np.ndarray = np.full((len(positions), width),
+                                        self.tokenizer.pad_token_id,
+                                        dtype=np.int64)
+        for row, position in enumerate(positions):
+          input_ids[row, :lengths[position]] = ids[position]
+        attention_mask: np.ndarray = (np.arange(width)
+                                      < lengths[positions, None])
+        logits: torch.Tensor = self.model(
+          input_ids=torch.from_numpy(input_ids),
+          attention_mask=torch.from_numpy(attention_mask.astype(np.int64))
+        ).logits
+        self.stats['padded_tokens'] += input_ids.size
+        yield positions, torch.softmax(logits.float(), dim=-1).numpy()
+
+  def classify(self, df: pd.DataFrame, texts: pd.Series = None) \
+      -> pd.DataFrame:
+    '''
+    Returns a frame with the index of df holding the predicted class
+    ("prediction"), its name ("label") and the probability of every class
+    named after its label, e.g. "prob_Unrelated". texts defaults to the
+    texts of `RepositoryText`.
+    '''
+    texts = texts if texts is not None else RepositoryText().build(df)
+    probabilities: np.ndarray = np.zeros((len(df), len(self.labels)),
+                                         dtype=np.float32)
+    start: float = time.perf_counter()
+    for positions, batch in self.predict(texts.tolist()):
+      probabilities[positions] = batch
+    seconds: float = time.perf_counter() - start
+    self.stats.update({'documents': len(df), 'seconds': seconds,
+                       'docs_per_second': len(df) / seconds if seconds else 0})
+    self.logger.info(f'Classified {len(df)} texts in {seconds:.2f}s '
+                     f'({self.stats["docs_per_second"]:.1f} docs/s)')
+    predictions: np.ndarray = probabilities.argmax(axis=1)
+    result: pd.DataFrame = pd.DataFrame(
+      probabilities, index=df.index,
+      columns=[f'prob_{name}' for name in self.labels.values()])
+    result.insert(0, 'prediction', predictions)
+    result.insert(1, 'label', pd.Categorical.from_codes(
+      predictions, categories=list(self.labels.values())))
+    return result
+
+  def classify_csv(self, file_path: str, out_path: str,
+                   chunksize: int = 1000) -> dict:
+    '''
+    Reads the repositories of a CSV file (e.g. of a new crawl) in chunks and
+    appends each chunk with its predictions to the CSV file out_path, so
+    files of any size are classified with bounded memory. Returns the stats
+    of all chunks.
+    '''
+    totals: dict = {'documents': 0, 'tokens': 0, 'padded_tokens': 0,
+                    'seconds': 0.0}
+    for i, chunk in enumerate(pd.read_csv(file_path, chunksize=chunksize)):
+      chunk = chunk.join(self.classify(chunk))
+      chunk.to_csv(out_path, mode='w' if i == 0 else 'a', header=i == 0,
+                   index=False)
+      for key in totals:
+        totals[key] += self.stats[key]
+    totals['docs_per_second'] = totals['documents'] / totals['seconds'] \
+      if totals['seconds'] else 0
+    self.stats = totals
+    return totals
+
@@ -0,0 +1,60 @@
+import re
+import unicodedata
+import pandas as pd
+
+
+class RepositoryText:
+  '''
+  Class that turns repositories of the open-source search into the texts the
+  BERT classifier was trained on, i.e. "{name} {description} {readme}" like
+  in emaemi_text.csv.
+
+  The descriptions and READMEs of emaemi_text.csv were cleaned when the file
+  was created. The same cleaning is approximated for new crawls: images in
+  markdown are reduced to an exclamation mark and their alternative text
+  ("![Logo](x.png)" becomes "!logo"), symbols such as emojis are removed, all
+  whitespace is collapsed to single spaces and the text is lowercased. The
+  texts of emaemi_text.csv stay unchanged. Missing fields are skipped.
+
+  Attributes
+  ----------
+  columns: list
+    Columns that are joined, in order.
+  clean_columns: list
+    Columns that are cleaned, no others if empty.
+
+  Methods
+  -------
+  build(df: pd.DataFrame) -> pd.Series
+    Returns the text of every repository of df.
+  clean_text(text: str) -> str
+    Returns a single cleaned text.
+  '''
+
+  image_pattern: re.Pattern = re.compile(r'!\[([^\]]+)\]\([^)]*\)')
+  whitespace_pattern: re.Pattern = re.compile(r'\s+')
+
+  def __init__(self, columns: list = None, clean_columns: list = None):
+    self.columns: list = columns or ['name', 'description', 'readme']
+    self.clean_columns: list = clean_columns if clean_columns is not None \
+      else ['description', 'readme']
+
+  def build(self, df: pd.DataFrame) -> pd.Series:
+    '''Returns the text of every repository of df, aligned with df.'''
+    parts: list = []
+    for column in self.columns:
+      values: pd.Series = df[column].map(
+        lambda v: v if isinstance(v, str) else '')
+      if column in self.clean_columns:
+        values = values.map(self.clean_text)
+      parts.append(values.to_numpy())
+    return pd.Series([' '.join(part for part in row if part)
+                      for row in zip(*parts)], index=df.index, dtype=object)
+
+  def clean_text(self, text: str) -> str:
+    '''Returns text cleaned like the texts of emaemi_text.csv.'''
+    text = self.image_pattern.sub(r'!\1', text)
+    text = ''.join(char for char in text
+                   if unicodedata.category(char) != 'So'
+                   and char != '\ufe0f')  # emoji variation selector
+    return self.whitespace_pattern.sub(' ', text).strip().lower()
@@ -0,0 +1,370 @@
+import hashlib
+import logging
+import math
+import os
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler
+from transformers import BertTokenizerFast
+
+
+class TokenCache:
+  '''
+  Class that tokenizes texts once and keeps the token ids on disk, so that
+  repeated runs of the notebook do not tokenize the READMEs again.
+
+  The ids of all texts are stored unpadded and back to back in one ".npy"
+  file ("uint16" for vocabularies of up to 65536 tokens, like BERT's),
+  together with the offset of every text, under the SHA-256 of the tokenizer
+  name, vocabulary size, maximum length and all texts. Loading maps the files
+  into memory instead of reading them.
+
+  Attributes
+  ----------
+  directory: str
+    Directory of the cached files.
+  model_name: str
+    Name of the pretrained tokenizer.
+  max_length: int
+    Texts are truncated to this number of tokens, including [CLS] and [SEP].
+
+  Methods
+  -------
+  key(texts: list) -> str
+    Returns the key of the texts with this tokenizer.
+  encode(texts: list) -> tuple[np.ndarray, np.ndarray]
+    Returns the flat token ids and offsets of the texts, cached on disk.
+
+  Examples
+  --------
+  ```py
+  cache = TokenCache('data/token_cache')
+  ids, offsets = cache.encode(RepositoryText().build(df).tolist())
+  dataset = TokenDataset(ids, offsets, df['label'].to_numpy())
+  ```
+  '''
+
+  def __init__(self, directory: str = 'data/token_cache',
+               model_name: str = 'bert-base-uncased', max_length: int = 512):
+    self.logger = logging.getLogger('classification_logger')
+    self.directory: str = directory
+    self.model_name: str = model_name
+    self.max_length: int = max_length
+    self._tokenizer: BertTokenizerFast = None
+
+  @property
+  def tokenizer(self) -> BertTokenizerFast:
+    # loaded once on first use, reading the vocabulary is cheap compared to
+    # tokenizing the texts
+    if self._tokenizer is None:
+      self._tokenizer = BertTokenizerFast.from_pretrained(
+        self.model_name, do_lower_case=True)
+    return self._tokenizer
+
+  def key(self, texts: list) -> str:
+    '''
+    Returns the key of the texts with this tokenizer, its vocabulary size and
+    max_length.
+    '''
+    digest = hashlib.sha256(f'{self.model_name}\0{len(self.tokenizer)}\0'
+                            f'{self.max_length}'.encode())
+    for text in texts:
+      encoded: bytes = text.encode('utf-8')
+      digest.update(len(encoded).to_bytes(8, 'little'))
+      digest.update(encoded)
+    return digest.hexdigest()
+
+  def encode(self, texts: list) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns the token ids of all texts concatenated (memory-mapped) and the
+    offsets of the texts in it, i.e. the ids of text i are
+    ids[offsets[i]:offsets[i + 1]].
+    '''
+    texts = list(texts)
+    key: str = self.key(texts)
+    ids_path: str = os.path.join(self.directory, f'{key}.ids.npy')
+    offsets_path: str = os.path.join(self.directory, f'{key}.offsets.npy')
+    if not os.path.exists(ids_path):
+      encoded: list = self.tokenizer(
+        texts, add_special_tokens=True, truncation=True,
+        max_length=self.max_length, return_attention_mask=False,
+        return_token_type_ids=False)['input_ids']
+      offsets: np.ndarray = np.zeros(len(encoded) + 1, dtype=np.int64)
+      np.cumsum([len(ids) for ids in encoded], out=offsets[1:])
+      dtype = np.uint16 if len(self.tokenizer) <= 2**16 else np.int32
+      os.makedirs(self.directory, exist_ok=True)
+      np.save(offsets_path, offsets)
+      # ids last, their file marks a complete entry
+      np.save(ids_path + '.tmp.npy', np.fromiter(
+        (token for ids in encoded for token in ids), dtype=dtype,
+        count=int(offsets[-1])))
+      os.replace(ids_path + '.tmp.npy', ids_path)
+      self.logger.info(f'Tokenized {len(texts)} texts into {offsets[-1]} '
+                       f'tokens')
+    return np.load(ids_path, mmap_mode='r'), np.load(offsets_path)
+
+
+class TokenDataset(Dataset):
+  '''
+  Dataset of tokenized texts and their labels that pads every batch only to
+  its longest text, see `collate`.
+
+  Attributes
+  ----------
+  ids: np.ndarray
+    The token ids of all texts, concatenated, see `TokenCache.encode`.
+  offsets: np.ndarray
+    Start of every text in ids, followed by the end of the last one.
+  labels: np.ndarray
+    Label of every text.
+  lengths: np.ndarray
+    Number of tokens of every text.
+  pad_token_id: int
+    Id used for padding.
+
+  Methods
+  -------
+  subset(positions: np.ndarray) -> TokenDataset
+    Returns the dataset of the given texts, e.g. of the train split.
+  collate(batch: list) -> dict
+    Returns the padded model inputs of a batch of items.
+  '''
+
+  def __init__(self, ids: np.ndarray, offsets: np.ndarray,
+               labels: np.ndarray, pad_token_id: int = 0):
+    self.ids: np.ndarray = ids
+    self.offsets: np.ndarray = np.asarray(offsets)
+    self.labels: np.ndarray = np.asarray(labels)
+    self.lengths: np.ndarray = np.diff(self.offsets)
+    self.pad_token_id: int = pad_token_id
+    # positions of the texts in ids, other than 0..n-1 for subsets
+    self._starts: np.ndarray = self.offsets[:-1]
+
+  def subset(self, positions: np.ndarray) -> 'TokenDataset':
+    '''Returns the dataset of the texts at the given positions.'''
+    subset: TokenDataset = TokenDataset(self.ids, self.offsets, self.labels,
+                                        self.pad_token_id)
+    positions = np.asarray(positions)
+    subset._starts = self._starts[positions]
+    subset.lengths = self.lengths[positions]
+    subset.labels = self.labels[positions]
+    return subset
+
+  def __len__(self) -> int:
+    return len(self.lengths)
+
+  def __getitem__(self, i: int) -> tuple[np.ndarray, int]:
+    start: int = int(self._starts[i])
+    return self.ids[start:start + int(self.lengths[i])], int(self.labels[i])
+
+  def collate(self, batch: list) -> dict:
+    '''
+    Returns input_ids, attention_mask and labels of a list of items, padded
+    to the longest text of the batch. Use as collate_fn of a DataLoader.
+    '''
+    lengths: np.ndarray = np.array([len(ids) for ids, _ in batch])
+    input_ids: np.ndarray = np.full((len(batch), lengths.max()),
+                                    self.pad_token_id, dtype=np.int64)
+    for row, (ids, _) in enumerate(batch):
+      input_ids[row, :len(ids)] = ids
+    attention_mask: np.ndarray = np.arange(lengths.max()) < lengths[:, None]
+    return {'input_ids': torch.from_numpy(input_ids),
+            'attention_mask': torch.from_numpy(attention_mask.astype(np.int64)),
+            'labels': torch.tensor([label for _, label in batch])}
+
+
+class LengthGroupedSampler(Sampler):
+  '''
+  Batch sampler that puts texts of similar length into the same batch while
+  keeping the batches random, so little compute is spent on padding.
+
+  Every epoch the texts are shuffled and cut into buckets of
+  batch_size * bucket_batches texts. Each bucket is sorted by length and cut
+  into batches, and the order of all batches is shuffled. With
+  bucket_batches=1 this is plain random batching like the `RandomSampler` of
+  the notebook.
+
+  Attributes
+  ----------
+  lengths: np.ndarray
+    Number of tokens of every text.
+  batch_size: int
+    Number of texts per batch.
+  bucket_batches: int
+    Number of batches per bucket.
+  shuffle: bool
+    If False, the batches are built from the texts sorted by length only,
+    e.g. for evaluation.
+  seed: int
+    Seed of the shuffling, combined with the epoch.
+
+  Methods
+  -------
+  set_epoch(epoch: int) -> None
+    Sets the epoch, which changes the shuffling.
+  padding(batches: list) -> float
+    Returns the share of padded tokens of the given batches.
+
+  Examples
+  --------
+  ```py
+  sampler = LengthGroupedSampler(dataset.lengths, batch_size=16)
+  dataloader = DataLoader(dataset, batch_sampler=sampler,
+                          collate_fn=dataset.collate)
+  ```
+  '''
+
+  def __init__(self, lengths: np.ndarray, batch_size: int = 16,
+               bucket_batches: int = 50, shuffle: bool = True,
+               seed: int = 42):
+    self.lengths: np.ndarray = np.asarray(lengths)
+    self.batch_size: int = batch_size
+    self.bucket_batches: int = bucket_batches
+    self.shuffle: bool = shuffle
+    self.seed: int = seed
+    self.epoch: int = 0
+
+  def set_epoch(self, epoch: int) -> None:
+    '''Sets the epoch, every epoch is shuffled differently.'''
+    self.epoch = epoch
+
+  def batches(self) -> list:
+    '''Returns the positions of the texts of every batch of this epoch.'''
+    n: int = len(self.lengths)
+    if not self.shuffle:
+      order: np.ndarray = np.argsort(self.lengths, kind='stable')
+      return [order[i:i + self.batch_size]
+              for i in range(0, n, self.batch_size)]
+    rng: np.random.Generator = np.random.default_rng((self.seed, self.epoch))
+    order: np.ndarray = rng.permutation(n)
+    bucket: int = self.batch_size * self.bucket_batches
+    batches: list = []
+    for start in range(0, n, bucket):
+      members: np.ndarray = order[start:start + bucket]
+      members = members[np.argsort(self.lengths[members], kind='stable')]
+      batches.extend(members[i:i + self.batch_size]
+                     for i in range(0, len(members), self.batch_size))
+    return [batches[i] for i in rng.permutation(len(batches))]
+
+  def padding(self, batches: list = None) -> float:
+    '''
+    Returns the share of pad tokens among all tokens of the given batches
+    (default: the batches of this epoch).
+    '''
+    batches = batches if batches is not None else self.batches()
+    padded: int = sum(len(b) * int(self.lengths[b].max()) for b in batches)
+    return 1 - self.lengths.sum() / padded if padded else 0.0
+
+  def __iter__(self):
+    for batch in self.batches():
+      yield batch.tolist()
+
+  def __len__(self) -> int:
+    return math.ceil(len(self.lengths) / self.batch_size)
+
+
+class BertTrainer:
+  '''
+  Class that runs the training and evaluation loops of BERT_clf.ipynb with
+  gradient accumulation.
+
+  The loss of each batch is divided by the number of batches of its
+  accumulation group and the gradients of the group are summed before a
+  single optimizer and scheduler step, so accumulation_steps batches of
+  batch_size texts train like one batch of accumulation_steps * batch_size
+  texts while only one batch is held in memory. The gradient norm is
+  clipped to max_grad_norm before every step like in the notebook.
+
+  Attributes
+  ----------
+  model: torch.nn.Module
+    The model, e.g. a `BertForSequenceClassification`.
+  optimizer: torch.optim.Optimizer
+    The optimizer of the model parameters.
+  scheduler: object
+    Optional learning rate scheduler, stepped after every optimizer step.
+  accumulation_steps: int
+    Number of batches per optimizer step.
+  max_grad_norm: float
+    Maximum norm of the gradients.
+  device: str
+    Device the batches are moved to.
+
+  Methods
+  -------
+  optimizer_steps(num_batches: int, epochs: int) -> int
+    Returns the number of optimizer steps, e.g. for the scheduler.
+  train_epoch(dataloader: DataLoader) -> float
+    Trains one epoch and returns the average loss per batch.
+  evaluate(dataloader: DataLoader) -> tuple
+    Returns the average loss, the logits and the labels of all batches.
+
+  Examples
+  --------
+  ```py
+  trainer = BertTrainer(model, optimizer, accumulation_steps=4)
+  trainer.scheduler = get_linear_schedule_with_warmup(
+    optimizer, num_warmup_steps=0,
+    num_training_steps=trainer.optimizer_steps(len(dataloader), epochs))
+  for epoch in range(1, epochs + 1):
+    sampler.set_epoch(epoch)
+    loss_train = trainer.train_epoch(dataloader)
+  ```
+  '''
+
+  def __init__(self, model: torch.nn.Module,
+               optimizer: torch.optim.Optimizer, scheduler: object = None,
+               accumulation_steps: int = 1, max_grad_norm: float = 1.0,
+               device: str = 'cpu'):
+    self.logger = logging.getLogger('classification_logger')
+    self.model: torch.nn.Module = model
+    self.optimizer: torch.optim.Optimizer = optimizer
+    self.scheduler: object = scheduler
+    self.accumulation_steps: int = accumulation_steps
+    self.max_grad_norm: float = max_grad_norm
+    self.device: str = device
+
+  def optimizer_steps(self, num_batches: int, epochs: int = 1) -> int:
+    '''Returns the number of optimizer steps of epochs epochs.'''
+    return math.ceil(num_batches / self.accumulation_steps) * epochs
+
+  def train_epoch(self, dataloader: torch.utils.data.DataLoader) -> float:
+    '''Trains the model for one epoch, returns the average batch loss.'''
+    self.model.train()
+    self.model.zero_grad()
+    num_batches: int = len(dataloader)
+    loss_total: float = 0.0
+    for i, batch in enumerate(dataloader):
+      group_start: int = i - i % self.accumulation_steps
+      group_size: int = min(self.accumulation_steps, num_batches - group_start)
+      outputs = self.model(**{k: v.to(self.device) for k, v in batch.items()})
+      loss: torch.Tensor = outputs[0]
+      loss_total += loss.item()
+      (loss / group_size).backward()
+      if i + 1 == group_start + group_size:
+        torch.nn.utils.clip_grad_norm_(self.model.parameters(),
+                                       self.max_grad_norm)
+        self.optimizer.step()
+        if self.scheduler is not None:
+          self.scheduler.step()
+        self.model.zero_grad()
+    return loss_total / num_batches
+
+  def evaluate(self, dataloader: torch.utils.data.DataLoader) -> tuple:
+    '''
+    Returns the average batch loss, the logits and the labels of all
+    batches, like the evaluate function of the notebook.
+    '''
+    self.model.eval()
+    loss_total: float = 0.0
+    predictions: list = []
+    true_vals: list = []
+    with torch.inference_mode():
+      for batch in dataloader:
+        outputs = self.model(**{k: v.to(self.device)
+                                for k, v in batch.items()})
+        loss_total += outputs[0].item()
+        predictions.append(outputs[1].detach().cpu().numpy())
+        true_vals.append(batch['labels'].numpy())
+    return (loss_total / len(dataloader), np.concatenate(predictions, axis=0),
+            np.concatenate(true_vals, axis=0))
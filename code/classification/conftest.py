@@ -0,0 +1,47 @@
+# pytest puts the directory of this file on sys.path, so the tests import the
+# bert_clf package like the notebook does: cd code/classification && python -m
+# pytest. The tests need torch and transformers and are skipped without them.
+import os
+import pytest
+
+VOCAB: list = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]', 'ecological',
+               'momentary', 'assessment', 'intervention', 'app', 'apps',
+               'mood', 'diary', 'study', 'daily', 'survey', 'sleep', 'game',
+               'web', 'server', 'library', 'the', 'a', 'of', 'for', 'and',
+               '.', ',', '!']
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory) -> str:
+  '''
+  Directory of a tiny, randomly initialised BertForSequenceClassification
+  and its tokenizer, used as model_name instead of "bert-base-uncased".
+  '''
+  torch = pytest.importorskip('torch')
+  transformers = pytest.importorskip('transformers')
+  directory: str = str(tmp_path_factory.mktemp('tiny_bert'))
+  vocab_path: str = os.path.join(directory, 'vocab.txt')
+  with open(vocab_path, 'w', encoding='utf-8') as file:
+    file.write('\n'.join(VOCAB) + '\n')
+  transformers.BertTokenizerFast(
+    vocab_path, do_lower_case=True).save_pretrained(directory)
+  torch.manual_seed(0)
+  config = transformers.BertConfig(
+    vocab_size=len(VOCAB), hidden_size=16, num_hidden_layers=2,
+    num_attention_heads=2, intermediate_size=32, max_position_embeddings=64,
+    num_labels=2)
+  transformers.BertForSequenceClassification(config).save_pretrained(directory)
+  return directory
+
+
+@pytest.fixture
+def texts() -> list:
+  '''Texts of different lengths, some with words missing from VOCAB.'''
+  return ['ecological momentary assessment app',
+          'a game',
+          'daily mood diary app for the study , sleep survey and apps .',
+          'web server library',
+          'ecological momentary intervention !',
+          'unknown words only',
+          '',
+          'mood app . mood app . mood app . mood app . mood app .']
@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+from bert_clf.embeddings import BertEmbedder, EmbeddingHead, EmbeddingStore
+
+
+@pytest.fixture(scope='module')
+def embedder(model_dir: str) -> BertEmbedder:
+  return BertEmbedder(model_dir, max_length=16)
+
+
+class RecordingEmbedder:
+  '''Embedder that keeps the texts of every call of embed.'''
+
+  def __init__(self, embedder: BertEmbedder):
+    self.embedder: BertEmbedder = embedder
+    self.calls: list = []
+
+  def __getattr__(self, name: str):
+    return getattr(self.embedder, name)
+
+  def embed(self, texts: list) -> np.ndarray:
+    self.calls.append(list(texts))
+    return self.embedder.embed(texts)
+
+
+def test_update_embeds_only_new_keys(embedder: BertEmbedder, texts: list,
+                                     tmp_path):
+  recording: RecordingEmbedder = RecordingEmbedder(embedder)
+  store: EmbeddingStore = EmbeddingStore(str(tmp_path), recording)
+  assert store.update(['a', 'b', 'a'], texts[:3]) == 2
+  assert store.update(['b', 'c'], texts[1:3]) == 1
+  assert store.update(['c'], texts[2:3]) == 0
+  assert recording.calls == [texts[:2], texts[2:3]]
+  # a new instance reads the keys and vectors from disk
+  stored: EmbeddingStore = EmbeddingStore(str(tmp_path))
+  assert stored.keys() == ['a', 'b', 'c']
+  assert np.allclose(stored.vectors(['c', 'a']),
+                     embedder.embed([texts[2], texts[0]]), atol=1e-5)
+  assert stored.vectors().shape == (3, embedder.dim)
+  with pytest.raises(KeyError):
+    stored.vectors(['d'])
+  other: EmbeddingStore = EmbeddingStore(
+    str(tmp_path), BertEmbedder(embedder.model_name, max_length=8))
+  with pytest.raises(ValueError, match='holds vectors of'):
+    other.update(['d'], texts[3:4])
+
+
+def test_update_frame_keys(embedder: BertEmbedder, tmp_path):
+  df: pd.DataFrame = pd.DataFrame({'id': [7, 8], 'name': ['mood', 'game'],
+                                   'description': ['Daily app', None],
+                                   'readme': [None, 'web']})
+  store: EmbeddingStore = EmbeddingStore(str(tmp_path), embedder)
+  assert store.update_frame(df) == ['7', '8']
+  keys: list = store.update_frame(df.drop(columns='id'))
+  assert len(keys) == 2 and len(keys[0]) == 40
+  assert store.keys() == ['7', '8'] + keys
+
+
+def test_interrupted_update_is_cut_off(embedder: BertEmbedder, texts: list,
+                                       tmp_path):
+  EmbeddingStore(str(tmp_path), embedder).update(['a', 'b'], texts[:2])
+  vectors_path: str = os.path.join(tmp_path, 'vectors.f32')
+  keys_path: str = os.path.join(tmp_path, 'keys.txt')
+  row: int = embedder.dim * 4
+  # vectors of two rows were written, but only a part of the first key
+  with open(vectors_path, 'ab') as file:
+    file.write(b'\0' * row * 2)
+  with open(keys_path, 'a', encoding='utf-8') as file:
+    file.write('c')
+  store: EmbeddingStore = EmbeddingStore(str(tmp_path), embedder)
+  assert store.keys() == ['a', 'b']
+  assert store.update(['c'], texts[2:3]) == 1
+  assert os.path.getsize(vectors_path) == row * 3
+  with open(keys_path, 'r', encoding='utf-8') as file:
+    assert file.read() == 'a\nb\nc\n'
+  assert np.allclose(EmbeddingStore(str(tmp_path)).vectors(['c']),
+                     embedder.embed(texts[2:3]), atol=1e-5)
+  # vectors that are missing can not be restored
+  os.truncate(vectors_path, row * 2)
+  with pytest.raises(ValueError, match='are needed for 3 keys'):
+    EmbeddingStore(str(tmp_path), embedder).update(['d'], texts[3:4])
+
+
+def test_chunks_are_pooled(model_dir: str):
+  words: list = ['ecological', 'momentary', 'assessment', 'app', 'mood',
+                 'diary', 'study', 'daily', 'survey', 'sleep']
+  # 4 words per chunk, [CLS] and [SEP] included
+  embedder: BertEmbedder = BertEmbedder(model_dir, max_length=6,
+                                        max_chunks=None)
+  chunks, owners = embedder._chunks([' '.join(words), ''])
+  assert [len(chunk) for chunk in chunks] == [6, 6, 4, 2]
+  assert owners.tolist() == [0, 0, 0, 1]
+  parts: np.ndarray = embedder.embed([' '.join(words[i:i + 4])
+                                      for i in range(0, 10, 4)])
+  vectors: np.ndarray = embedder.embed([' '.join(words), ''])
+  assert vectors.shape == (2, embedder.dim) and vectors.dtype == np.float32
+  # weighted by the tokens of the chunks
+  assert np.allclose(vectors[0], (6 * parts[0] + 6 * parts[1] + 4 * parts[2])
+                     / 16, atol=1e-5)
+  embedder.max_chunks = 2
+  assert len(embedder._chunks([' '.join(words)])[0]) == 2
+  assert np.allclose(embedder.embed([' '.join(words)])[0],
+                     (parts[0] + parts[1]) / 2, atol=1e-5)
+
+
+def test_checkpoint_must_fit_the_encoder(model_dir: str, tmp_path):
+  model = transformers.BertForSequenceClassification.from_pretrained(
+    model_dir)
+  with torch.no_grad():
+    model.bert.pooler.dense.bias.fill_(1.0)
+  model_path: str = os.path.join(tmp_path, 'BERT_ft_Epoch1.model')
+  torch.save(model.state_dict(), model_path)
+  embedder: BertEmbedder = BertEmbedder(model_dir, model_path=model_path)
+  assert torch.equal(embedder.model.pooler.dense.bias,
+                     torch.ones(embedder.dim))
+  # weights of the encoder without "bert." do not fit
+  torch.save(model.bert.state_dict(), model_path)
+  with pytest.raises(ValueError, match='missing weights'):
+    BertEmbedder(model_dir, model_path=model_path)
+  torch.save({**model.state_dict(), 'bert.extra.weight': torch.zeros(1)},
+             model_path)
+  with pytest.raises(ValueError, match=r"unexpected weights: \['extra"):
+    BertEmbedder(model_dir, model_path=model_path)
+
+
+def test_head_cross_validation():
+  rng: np.random.Generator = np.random.default_rng(0)
+  y: np.ndarray = np.repeat([0, 1], 30)
+  X: np.ndarray = rng.normal(size=(60, 8)) + y[:, None] * 3
+  for kind in ('logistic', 'mlp'):
+    scores: pd.DataFrame = EmbeddingHead(kind, max_iter=300).cross_validate(
+      X, y, folds=3)
+    assert list(scores.columns) == ['f1', 'accuracy', 'fit_time']
+    assert len(scores) == 3 and (scores['f1'] > 0.9).all()
+  head: EmbeddingHead = EmbeddingHead(C=0.5).fit(X, y)
+  probabilities: np.ndarray = head.predict_proba(X)
+  assert probabilities.shape == (60, 2)
+  assert (probabilities.argmax(axis=1) == y).mean() > 0.9
+  with pytest.raises(ValueError):
+    EmbeddingHead('svm')
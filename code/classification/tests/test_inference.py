@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+from bert_clf.inference import BertInference
+from bert_clf.texts import RepositoryText
+
+
+@pytest.fixture(scope='module')
+def model_path(model_dir: str, tmp_path_factory) -> str:
+  '''A checkpoint like the "BERT_ft_Epoch*.model" files of the notebook.'''
+  model = transformers.BertForSequenceClassification.from_pretrained(
+    model_dir)
+  model_path: str = os.path.join(tmp_path_factory.mktemp('models'),
+                                 'BERT_ft_Epoch1.model')
+  torch.save(model.state_dict(), model_path)
+  return model_path
+
+
+@pytest.fixture
+def repositories(texts: list) -> pd.DataFrame:
+  # names are single words, the rest of the text is the description
+  df: pd.DataFrame = pd.DataFrame({
+    'id': [17, 3, 12, 5, 8, 0, 21, 9],
+    'name': [text.split(' ', 1)[0] for text in texts],
+    'description': [text.split(' ', 1)[1] if ' ' in text else None
+                    for text in texts],
+    'readme': None})
+  return df.set_index(df['id'].to_numpy())
+
+
+def expected(model_dir: str, texts: list) -> np.ndarray:
+  '''Probabilities of the texts classified one at a time.'''
+  tokenizer = transformers.BertTokenizerFast.from_pretrained(model_dir)
+  model = transformers.BertForSequenceClassification.from_pretrained(
+    model_dir).eval()
+  with torch.inference_mode():
+    return np.concatenate([torch.softmax(model(**tokenizer(
+      text, truncation=True, max_length=16, return_tensors='pt')).logits,
+      dim=-1).numpy() for text in texts])
+
+
+def test_batches_are_sorted_by_length(model_dir: str, model_path: str,
+                                      texts: list):
+  clf: BertInference = BertInference(model_path, model_dir, batch_size=3,
+                                     max_length=16)
+  batches: list = list(clf.predict(texts))
+  positions: list = [p for batch, _ in batches for p in batch.tolist()]
+  assert sorted(positions) == list(range(len(texts)))
+  lengths: list = [len(clf.tokenizer(text, truncation=True, max_length=16)
+                       ['input_ids']) for text in texts]
+  assert [lengths[p] for p in positions] == sorted(lengths, reverse=True)
+  assert clf.stats['tokens'] == sum(lengths)
+  assert clf.stats['padded_tokens'] == sum(
+    len(batch) * max(lengths[p] for p in batch) for batch, _ in batches)
+  probabilities: np.ndarray = np.zeros((len(texts), 2))
+  for batch, batch_probabilities in batches:
+    probabilities[batch] = batch_probabilities
+  assert np.allclose(probabilities, expected(model_dir, texts), atol=1e-5)
+
+
+def test_classify_keeps_the_rows(model_dir: str, model_path: str,
+                                 repositories: pd.DataFrame):
+  clf: BertInference = BertInference(model_path, model_dir, batch_size=3,
+                                     max_length=16)
+  result: pd.DataFrame = clf.classify(repositories)
+  assert result.index.equals(repositories.index)
+  assert list(result.columns) == ['prediction', 'label', 'prob_Unrelated',
+                                  'prob_Potential EMA/EMI']
+  probabilities: np.ndarray = expected(
+    model_dir, RepositoryText().build(repositories).tolist())
+  assert np.allclose(result.iloc[:, 2:].to_numpy(), probabilities,
+                     atol=1e-5)
+  assert result['prediction'].tolist() == \
+    probabilities.argmax(axis=1).tolist()
+  assert result['label'].tolist() == [
+    clf.labels[prediction] for prediction in result['prediction']]
+  assert clf.stats['documents'] == len(repositories)
+
+
+def test_classify_csv_in_chunks(model_dir: str, model_path: str,
+                                repositories: pd.DataFrame, tmp_path):
+  file_path: str = os.path.join(tmp_path, 'data.csv')
+  out_path: str = os.path.join(tmp_path, 'classified.csv')
+  repositories.to_csv(file_path, index=False)
+  clf: BertInference = BertInference(model_path, model_dir, batch_size=2,
+                                     max_length=16)
+  # 8 rows in chunks of 3, the last one is shorter
+  stats: dict = clf.classify_csv(file_path, out_path, chunksize=3)
+  assert stats['documents'] == 8 and stats['tokens'] > 0
+  classified: pd.DataFrame = pd.read_csv(out_path)
+  assert classified['id'].tolist() == repositories['id'].tolist()
+  probabilities: np.ndarray = expected(
+    model_dir, RepositoryText().build(repositories).tolist())
+  assert np.allclose(classified[['prob_Unrelated', 'prob_Potential EMA/EMI']]
+                     .to_numpy(), probabilities, atol=1e-5)
+  assert classified['label'].isin(clf.labels.values()).all()
@@ -0,0 +1,138 @@
+import logging
+import os
+import shutil
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+from bert_clf.training import BertTrainer, LengthGroupedSampler, \
+  TokenCache, TokenDataset
+
+
+def test_cache_key_depends_on_the_tokenizer(model_dir: str, texts: list,
+                                            tmp_path):
+  cache: TokenCache = TokenCache(str(tmp_path), model_dir, max_length=16)
+  key: str = cache.key(texts)
+  assert TokenCache(str(tmp_path), model_dir, max_length=16).key(texts) == key
+  assert cache.key(texts[1:]) != key
+  assert TokenCache(str(tmp_path), model_dir, max_length=32).key(texts) != key
+  other_dir: str = shutil.copytree(model_dir, os.path.join(tmp_path, 'other'))
+  assert TokenCache(str(tmp_path), other_dir, max_length=16).key(texts) != key
+  # same name, but a token was added to the vocabulary
+  cache.tokenizer.add_tokens(['emaemi'])
+  assert cache.key(texts) != key
+
+
+def test_cached_ids_are_reused(model_dir: str, texts: list, tmp_path,
+                               caplog):
+  caplog.set_level(logging.INFO, logger='classification_logger')
+  cache: TokenCache = TokenCache(str(tmp_path), model_dir, max_length=8)
+  ids, offsets = cache.encode(texts)
+  assert ids.dtype == np.uint16 and isinstance(ids, np.memmap)
+  expected: list = cache.tokenizer(texts, truncation=True,
+                                   max_length=8)['input_ids']
+  assert [ids[offsets[i]:offsets[i + 1]].tolist()
+          for i in range(len(texts))] == expected
+  assert max(map(len, expected)) == 8 and min(map(len, expected)) == 2
+  key: str = cache.key(texts)
+  assert sorted(os.listdir(tmp_path)) == [f'{key}.ids.npy',
+                                          f'{key}.offsets.npy']
+  assert len([r for r in caplog.records if 'Tokenized' in r.message]) == 1
+  # a new run maps the files instead of tokenizing again
+  cached_ids, cached_offsets = TokenCache(str(tmp_path), model_dir,
+                                          max_length=8).encode(texts)
+  assert len([r for r in caplog.records if 'Tokenized' in r.message]) == 1
+  assert np.array_equal(cached_ids, ids)
+  assert np.array_equal(cached_offsets, offsets)
+
+
+def test_collate_pads_to_the_longest_text():
+  ids: np.ndarray = np.arange(1, 10, dtype=np.uint16)
+  dataset: TokenDataset = TokenDataset(ids, [0, 2, 7, 9], [0, 1, 0])
+  subset: TokenDataset = dataset.subset([2, 0])
+  assert len(subset) == 2 and subset.lengths.tolist() == [2, 2]
+  batch: dict = subset.collate([subset[0], subset[1]])
+  assert batch['input_ids'].tolist() == [[8, 9], [1, 2]]
+  assert batch['labels'].tolist() == [0, 0]
+  batch = dataset.collate([dataset[0], dataset[1]])
+  assert batch['input_ids'].tolist() == [[1, 2, 0, 0, 0], [3, 4, 5, 6, 7]]
+  assert batch['attention_mask'].tolist() == [[1, 1, 0, 0, 0],
+                                              [1, 1, 1, 1, 1]]
+  assert batch['labels'].tolist() == [0, 1]
+  assert batch['input_ids'].dtype == torch.int64
+
+
+def test_sampler_groups_texts_by_length():
+  lengths: np.ndarray = np.random.default_rng(0).permutation(100) + 1
+  sampler: LengthGroupedSampler = LengthGroupedSampler(
+    lengths, batch_size=8, bucket_batches=4)
+  batches: list = list(sampler)
+  assert len(batches) == len(sampler) == 13
+  assert sorted(i for batch in batches for i in batch) == list(range(100))
+  # every bucket of 32 texts is cut into batches of adjacent lengths
+  bucket_order: np.ndarray = np.random.default_rng((42, 0)).permutation(100)
+  for start in range(0, 100, 32):
+    bucket: set = set(bucket_order[start:start + 32].tolist())
+    members: list = sorted((b for b in batches if set(b) <= bucket),
+                           key=lambda b: lengths[b].min())
+    assert sum(map(len, members)) == len(bucket)
+    for first, second in zip(members, members[1:]):
+      assert lengths[first].max() < lengths[second].min()
+  assert sampler.padding() < LengthGroupedSampler(
+    lengths, batch_size=8, bucket_batches=1).padding()
+  sampler.set_epoch(1)
+  assert [b.tolist() for b in sampler.batches()] != batches
+  ordered: list = list(LengthGroupedSampler(lengths, batch_size=8,
+                                            shuffle=False))
+  assert [i for batch in ordered for i in batch] == \
+    np.argsort(lengths).tolist()
+
+
+class RecordingSGD(torch.optim.SGD):
+  '''SGD that keeps the gradient of the classifier at every step.'''
+
+  def __init__(self, model: torch.nn.Module):
+    # no learning rate, the weights stay the same for the comparison
+    super().__init__(model.parameters(), lr=0.0)
+    self.model: torch.nn.Module = model
+    self.gradients: list = []
+
+  def step(self, closure=None):
+    self.gradients.append(self.model.classifier.weight.grad.clone())
+    return super().step(closure)
+
+
+def test_gradients_are_accumulated(model_dir: str, texts: list, tmp_path):
+  model = transformers.BertForSequenceClassification.from_pretrained(
+    model_dir, hidden_dropout_prob=0.0, attention_probs_dropout_prob=0.0)
+  ids, offsets = TokenCache(str(tmp_path), model_dir,
+                            max_length=16).encode(texts[:5] * 2)
+  dataset: TokenDataset = TokenDataset(ids, offsets, [0, 1] * 5)
+  dataloader: torch.utils.data.DataLoader = torch.utils.data.DataLoader(
+    dataset, batch_size=2, collate_fn=dataset.collate)
+  optimizer: RecordingSGD = RecordingSGD(model)
+  scheduler = torch.optim.lr_scheduler.LambdaLR(optimizer, lambda step: 1.0)
+  trainer: BertTrainer = BertTrainer(model, optimizer, scheduler,
+                                     accumulation_steps=2, max_grad_norm=1e9)
+  loss: float = trainer.train_epoch(dataloader)
+  # 5 batches are 2 full groups and a last group of one batch
+  assert trainer.optimizer_steps(len(dataloader)) == 3
+  assert len(optimizer.gradients) == scheduler.last_epoch == 3
+  gradients: list = []
+  losses: list = []
+  for batch in dataloader:
+    model.zero_grad()
+    outputs = model(**batch)
+    outputs[0].backward()
+    losses.append(outputs[0].item())
+    gradients.append(model.classifier.weight.grad.clone())
+  assert loss == pytest.approx(np.mean(losses))
+  expected: list = [(gradients[0] + gradients[1]) / 2,
+                    (gradients[2] + gradients[3]) / 2, gradients[4]]
+  for actual, wanted in zip(optimizer.gradients, expected):
+    assert torch.allclose(actual, wanted, atol=1e-6)
+  # without dropout and learning rate, evaluation sees the same losses
+  eval_loss, logits, labels = trainer.evaluate(dataloader)
+  assert logits.shape == (10, 2) and labels.tolist() == [0, 1] * 5
+  assert eval_loss == pytest.approx(loss)
@@ -0,0 +1,2 @@
+# pytest puts the directory of this file on sys.path, so the tests import the
+# screening package like the notebook does: cd code/filters && python -m pytest
@@ -0,0 +1,10 @@
+from .formats import *
+from .sources import *
+from .dedup import *
+from .keywords import *
+from .near_duplicates import *
+from .stages import *
+from .cache import *
+from .pipeline import *
+from .store import *
+from .evaluation import *
@@ -0,0 +1,231 @@
+import glob
+import io
+import json
+import os
+import time
+import tracemalloc
+import bibtexparser
+import pandas as pd
+import rispy
+from .formats import BibFile, RisFile
+from .pipeline import ScreeningPipeline
+from .sources import DEFAULT_SOURCES, RecordSet
+from .stages import default_stages
+
+
+class FormatBenchmark:
+  '''
+  Class that compares `BibFile` and `RisFile` with the loaders and exporters
+  of the notebook (bibtexparser and rispy) on the BibTeX and RIS files of the
+  repository.
+
+  For every file the time to read it into a DataFrame and to write that
+  DataFrame back is measured for both implementations, together with the
+  peak memory allocated while reading. The results of both implementations
+  are compared, so the benchmark doubles as a round-trip check.
+
+  Attributes
+  ----------
+  directory: str
+    Directory that is searched recursively for .bib and .ris files.
+  repeat: int
+    Number of runs per measurement, the fastest one is reported.
+
+  Methods
+  -------
+  run() -> pd.DataFrame
+    Benchmarks all files and returns one row per file.
+
+  Examples
+  --------
+  ```sh
+  cd code/filters
+  python -m screening.benchmark ./data
+  ```
+  '''
+
+  def __init__(self, directory: str = './data', repeat: int = 3):
+    self.directory: str = directory
+    self.repeat: int = repeat
+
+  def files(self) -> list:
+    '''Returns all non-empty .bib and .ris files, largest first.'''
+    files: list = [f for ext in ('bib', 'ris') for f in glob.glob(
+      os.path.join(self.directory, '**', f'*.{ext}'), recursive=True)
+                   if os.path.getsize(f) > 0]
+    return sorted(files, key=os.path.getsize, reverse=True)
+
+  def run(self) -> pd.DataFrame:
+    '''Benchmarks all files, see the class description.'''
+    rows: list = [self._benchmark(file_path) for file_path in self.files()]
+    return pd.DataFrame(rows)
+
+  def _benchmark(self, file_path: str) -> dict:
+    if file_path.endswith('.bib'):
+      old_read, old_write = self._bibtexparser_read, self._bibtexparser_write
+      new: BibFile = BibFile()
+      new_write = lambda df: new._format(df, na_rep='nan')
+    else:
+      old_read, old_write = self._rispy_read, self._rispy_write
+      new: RisFile = RisFile()
+      new_write = new._format
+    old_df, old_read_s, old_peak = self._measure(old_read, file_path)
+    new_df, new_read_s, new_peak = self._measure(new.read, file_path)
+    old_text, old_write_s, _ = self._measure(old_write, old_df)
+    new_text, new_write_s, _ = self._measure(new_write, old_df)
+    return {'file': os.path.relpath(file_path, self.directory),
+            'entries': len(old_df),
+            'read_old_s': old_read_s, 'read_new_s': new_read_s,
+            'read_speedup': old_read_s / new_read_s,
+            'write_old_s': old_write_s, 'write_new_s': new_write_s,
+            'write_speedup': old_write_s / new_write_s,
+            'peak_old_mb': old_peak / 2**20, 'peak_new_mb': new_peak / 2**20,
+            'same_entries': self._equal(old_df, new_df),
+            'same_file': old_text == new_text}
+
+  def _measure(self, func, arg) -> tuple:
+    '''Returns the result, the fastest time and the peak memory of func.'''
+    best: float = float('inf')
+    for _ in range(self.repeat):
+      start: float = time.perf_counter()
+      result = func(arg)
+      best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(arg)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+  def _equal(self, a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    try:
+      pd.testing.assert_frame_equal(a, b)
+      return True
+    except AssertionError:
+      return False
+
+  # region notebook implementations
+
+  def _bibtexparser_read(self, file_path: str) -> pd.DataFrame:
+    with open(file_path, 'r', encoding='utf-8') as file:
+      return pd.DataFrame(bibtexparser.load(file).entries)
+
+  def _bibtexparser_write(self, df: pd.DataFrame) -> str:
+    bib_db = bibtexparser.bibdatabase.BibDatabase()
+    bib_db.entries = df.map(str).to_dict(orient='records')
+    return bibtexparser.bwriter.BibTexWriter().write(bib_db)
+
+  def _rispy_read(self, file_path: str) -> pd.DataFrame:
+    with open(file_path, 'r', encoding='utf-8') as file:
+      return pd.DataFrame(rispy.load(file))
+
+  def _rispy_write(self, df: pd.DataFrame) -> str:
+    df = df.map(lambda x: x if isinstance(x, (dict, list))
+                else '' if pd.isna(x) else str(x))
+    file: io.StringIO = io.StringIO()
+    rispy.dump(df.to_dict(orient='records'), file)
+    return file.getvalue()
+
+  # endregion
+
+
+class ScreeningBenchmark:
+  '''
+  Class that measures the operations of pre_screening_filters.ipynb on the
+  exports in the raw data directory: loading every BibTeX, RIS and CSV
+  export, mapping them onto the unified records and every stage of the
+  `ScreeningPipeline` (date, language, publication type, review filtering,
+  DOI and near-duplicate deduplication).
+
+  Only the sources whose export files exist are loaded, see
+  `RecordSet.available`. Every measurement is the fastest of repeat runs,
+  the pipeline runs without cache.
+
+  Attributes
+  ----------
+  directory: str
+    The raw data directory.
+  repeat: int
+    Number of runs per measurement, the fastest one is reported.
+  sources: list
+    The `SourceMapping` objects to load, default are all `DEFAULT_SOURCES`.
+
+  Methods
+  -------
+  run() -> pd.DataFrame
+    Measures all operations and returns one row per operation.
+
+  Examples
+  --------
+  ```sh
+  cd code/filters
+  python -m screening.benchmark ./data data/benchmark.json
+  ```
+  '''
+
+  def __init__(self, directory: str = './data/raw', repeat: int = 3,
+               sources: list = None):
+    self.directory: str = directory
+    self.repeat: int = repeat
+    self.sources: list = sources if sources is not None else DEFAULT_SOURCES
+
+  def run(self) -> pd.DataFrame:
+    '''Measures all operations, see the class description.'''
+    sources: list = RecordSet.available(self.directory, self.sources)
+    rows: list = []
+    raw: dict = {}
+    for mapping in sources:
+      raw[mapping.name], seconds = self._fastest(mapping.load, self.directory)
+      rows.append({'operation': f'load {mapping.name} '
+                                f'({mapping.file_format})',
+                   'records': len(raw[mapping.name]), 'removed': 0,
+                   'seconds': seconds})
+    record_set, seconds = self._fastest(lambda _: RecordSet(sources, raw),
+                                        None)
+    rows.append({'operation': 'unify', 'records': len(record_set.records),
+                 'removed': 0, 'seconds': seconds})
+    reports: list = []
+    for _ in range(self.repeat):
+      pipeline: ScreeningPipeline = ScreeningPipeline(default_stages())
+      pipeline.run(record_set)
+      reports.append(pipeline.report)
+    report: pd.DataFrame = reports[0]
+    alive: int = len(record_set.records)
+    for i, stage in enumerate(report['stage']):
+      removed: int = int(report['removed'].iloc[i])
+      rows.append({'operation': f'stage {stage}', 'records': alive,
+                   'removed': removed,
+                   'seconds': min(r['seconds'].iloc[i] for r in reports)})
+      alive -= removed
+    return pd.DataFrame(rows)
+
+  def _fastest(self, func, arg) -> tuple:
+    '''Returns the result and the fastest time of repeat runs of func.'''
+    best: float = float('inf')
+    for _ in range(self.repeat):
+      start: float = time.perf_counter()
+      result = func(arg)
+      best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == '__main__':
+  import sys
+  pd.set_option('display.width', 200)
+  pd.set_option('display.max_columns', 20)
+  directory: str = sys.argv[1] if len(sys.argv) > 1 else './data'
+  results: pd.DataFrame = FormatBenchmark(directory).run()
+  print(results.round(3).to_string(index=False))
+  print(f'\nTotal read: {results["read_old_s"].sum():.2f}s -> '
+        f'{results["read_new_s"].sum():.2f}s, total write: '
+        f'{results["write_old_s"].sum():.2f}s -> '
+        f'{results["write_new_s"].sum():.2f}s\n')
+  screening: pd.DataFrame = ScreeningBenchmark(
+    os.path.join(directory, 'raw')).run()
+  print(screening.round(3).to_string(index=False))
+  print(f'\nTotal screening: {screening["seconds"].sum():.2f}s')
+  # machine-readable results, e.g. to compare runs
+  if len(sys.argv) > 2:
+    with open(sys.argv[2], 'w', encoding='utf-8') as file:
+      json.dump({'formats': results.to_dict(orient='records'),
+                 'screening': screening.to_dict(orient='records')},
+                file, indent=2, default=str)
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from .sources import RecordSet
+from .stages import Stage
+
+
+class StageCache:
+  '''
+  Class that caches the parsed database exports and the outcome of every
+  screening stage under a fingerprint of its inputs, so that changing one
+  parameter only re-runs the stages that depend on it.
+
+  The exports are cached under the SHA-256 of their files and source
+  mappings, so they are only parsed again if a file changes. The fingerprint
+  of the unified records is the hash of their content. Every stage is keyed
+  by the key of the previous stage (or of the records), its class and its
+  parameters (`repr(stage)`), i.e. the key changes with the input data, the
+  stage and every stage before it. Changing e.g. the cutoff year of the
+  first stage re-runs all stages, changing the review keywords only the
+  stages from `ReviewStage` on. For every key the mask of the stage is
+  stored, which is all the pipeline needs to continue, together with the
+  details of the run (`Stage.details`) such as the duplicate clusters.
+
+  Attributes
+  ----------
+  directory: str
+    Directory of the cache.
+  version: str
+    Part of every key, changed when the parsing or the stages change in a
+    way their parameters do not reflect.
+
+  Methods
+  -------
+  load_record_set(directory: str, sources: list) -> RecordSet
+    Returns the record set of the raw exports, parsed only if they changed.
+  records_key(records: pd.DataFrame) -> str
+    Returns the fingerprint of the unified records.
+  stage_key(previous: str, stage: Stage) -> str
+    Returns the fingerprint of a stage given the one before it.
+  get(key: str) -> np.ndarray
+    Returns the cached mask of a stage, None if there is none.
+  get_details(key: str) -> object
+    Returns the cached details of a stage, None if there are none.
+  put(key: str, passed: np.ndarray, details: object) -> None
+    Caches the mask and the details of a stage.
+  clear() -> None
+    Removes all cached entries.
+
+  Examples
+  --------
+  ```py
+  cache = StageCache('./data/cache')
+  record_set = cache.load_record_set('./data/raw')
+  pipeline = ScreeningPipeline(default_stages(cutoff_year=2010), cache=cache)
+  result = pipeline.run(record_set)
+  print(pipeline.report)
+  ```
+  '''
+
+  version: str = '3'
+
+  def __init__(self, directory: str = './data/cache'):
+    self.logger = logging.getLogger('screening_logger')
+    self.directory: str = directory
+
+  def _path(self, *parts: str) -> str:
+    return os.path.join(self.directory, *parts)
+
+  def _hash(self, *parts: bytes) -> str:
+    digest = hashlib.sha256(self.version.encode())
+    for part in parts:
+      digest.update(len(part).to_bytes(8, 'little'))
+      digest.update(part)
+    return digest.hexdigest()
+
+  def load_record_set(self, directory: str = './data/raw',
+                      sources: list = None) -> RecordSet:
+    '''
+    Returns `RecordSet.load(directory, sources)`, read from the cache if no
+    file and no mapping of the sources changed since it was cached.
+    '''
+    sources = RecordSet.available(directory, sources)
+    raw: dict = {}
+    for mapping in sources:
+      files: list = list(mapping.files)
+      if mapping.join is not None:
+        files.append(mapping.join[0])
+      config: dict = {k: v for k, v in vars(mapping).items() if k != 'logger'}
+      parts: list = [repr(sorted(config.items())).encode()]
+      for file_name in files:
+        with open(os.path.join(directory, file_name), 'rb') as file:
+          parts.append(file.read())
+      file_path: str = self._path('raw', f'{self._hash(*parts)}.pkl')
+      if os.path.exists(file_path):
+        raw[mapping.name] = pd.read_pickle(file_path)
+        self.logger.info(f'Loaded {len(raw[mapping.name])} entries from '
+                         f'{mapping.label} (cached)')
+      else:
+        raw[mapping.name] = mapping.load(directory)
+        os.makedirs(self._path('raw'), exist_ok=True)
+        raw[mapping.name].to_pickle(file_path)
+    return RecordSet(sources, raw)
+
+  def records_key(self, records: pd.DataFrame) -> str:
+    '''Returns the fingerprint of the content of the unified records.'''
+    hashes: np.ndarray = pd.util.hash_pandas_object(
+      records, index=False).to_numpy()
+    return self._hash(' '.join(records.columns).encode(), hashes.tobytes())
+
+  def stage_key(self, previous: str, stage: Stage) -> str:
+    '''
+    Returns the fingerprint of a stage that is applied to the outcome of the
+    stage (or records) with the fingerprint previous.
+    '''
+    kind: str = f'{type(stage).__module__}.{type(stage).__qualname__}'
+    return self._hash(previous.encode(), kind.encode(), repr(stage).encode())
+
+  def get(self, key: str) -> np.ndarray:
+    '''Returns the cached mask of the stage with the given key, or None.'''
+    file_path: str = self._path('stages', f'{key}.npy')
+    if not os.path.exists(file_path):
+      return None
+    return np.load(file_path)
+
+  def get_details(self, key: str) -> object:
+    '''Returns the cached details of the stage with the given key, or None.'''
+    file_path: str = self._path('stages', f'{key}.pkl')
+    if not os.path.exists(file_path):
+      return None
+    return pd.read_pickle(file_path)
+
+  def put(self, key: str, passed: np.ndarray, details: object = None) -> None:
+    '''Caches the mask and the details of the stage with the given key.'''
+    os.makedirs(self._path('stages'), exist_ok=True)
+    # details first, the mask marks a complete entry
+    if details is not None:
+      pd.to_pickle(details, self._path('stages', f'{key}.pkl'))
+    np.save(self._path('stages', f'{key}.npy'), passed)
+
+  def clear(self) -> None:
+    '''Removes all cached exports, stage masks and details.'''
+    shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,151 @@
+import logging
+import re
+import numpy as np
+import pandas as pd
+
+
+def source_ranks(source: pd.Series, priority: list = None) -> np.ndarray:
+  '''
+  Returns the priority rank of the source of every record as small integers,
+  which numpy sorts stably with a linear radix sort. priority lists the source
+  names from highest to lowest priority, unlisted sources come last. If None,
+  the order of the categories of the source column is used.
+  '''
+  if priority is None and isinstance(source.dtype, pd.CategoricalDtype):
+    return source.cat.codes.to_numpy().astype(np.int16)
+  priority = priority if priority is not None else list(pd.unique(source))
+  ranks: pd.Series = source.astype(object).map(
+    {name: rank for rank, name in enumerate(priority)})
+  return ranks.fillna(len(priority)).to_numpy(dtype=np.int16)
+
+
+class DoiDeduplicator:
+  '''
+  Class that finds records with identical DOIs across all databases and
+  decides which of them to keep.
+
+  DOIs are normalized with one vectorized extraction over all records. The
+  normalized DOIs are then hashed into one index (`pd.factorize`), so every
+  DOI gets an integer code. Records are ordered by the priority of their
+  database and their position in it, the first record of every code is kept
+  and all others are dropped. Each step is a single pass over the records,
+  so the runtime grows linearly with their total number.
+
+  Attributes
+  ----------
+  priority: list
+    Source names from highest to lowest priority. Records of sources that
+    are not listed come last. If None, the order of the categories of the
+    source column is used.
+  min_length: int
+    DOIs with this many characters or fewer are treated as missing.
+
+  Methods
+  -------
+  normalize(doi: pd.Series) -> pd.Series
+    Returns the normalized DOIs of the given values.
+  deduplicate(records: pd.DataFrame, alive: np.ndarray) -> DeduplicationResult
+    Decides which records to keep.
+
+  Examples
+  --------
+  ```py
+  result = DoiDeduplicator().deduplicate(record_set.records)
+  print(result.provenance.groupby(['source', 'kept_source']).size())
+  ```
+  '''
+
+  doi_pattern: str = r'(10\.\d{4,9}/[-._;()/:A-Za-z0-9]+)'
+
+  def __init__(self, priority: list = None, min_length: int = 5):
+    self.logger = logging.getLogger('screening_logger')
+    self.priority: list = priority
+    self.min_length: int = min_length
+
+  def normalize(self, doi: pd.Series) -> pd.Series:
+    '''
+    Returns the lower-cased DOIs of the given values, which may also be DOI
+    urls such as "https://dx.doi.org/<DOI>". Values without a DOI are kept
+    lower-cased as they are. Values with min_length characters or fewer
+    after normalization become "", i.e. missing.
+    '''
+    text: pd.Series = doi.astype('string').fillna('')
+    extracted: pd.Series = text.str.extract(self.doi_pattern, flags=re.I)[0]
+    normalized: pd.Series = extracted.fillna(text).str.lower()
+    return normalized.where(normalized.str.len() > self.min_length, '')
+
+  def deduplicate(self, records: pd.DataFrame,
+                  alive: np.ndarray = None) -> 'DeduplicationResult':
+    '''
+    Decides for the unified records which to keep. Only records where alive
+    is true (default: all) take part, all others are neither kept nor
+    dropped by this step.
+    '''
+    n: int = len(records)
+    alive = np.ones(n, dtype=bool) if alive is None else np.asarray(alive)
+    doi: pd.Series = self.normalize(records['doi'])
+    candidates: np.ndarray = alive & (doi != '').to_numpy(dtype=bool)
+    # hash index: one integer code per distinct DOI, -1 for non-candidates
+    codes: np.ndarray = np.full(n, -1, dtype=np.int64)
+    codes[candidates] = pd.factorize(doi[candidates])[0]
+    # records in priority order, ties by position (stable sort)
+    ranks: np.ndarray = source_ranks(records['source'], self.priority)
+    order: np.ndarray = np.argsort(ranks, kind='stable')
+    order = order[candidates[order]]
+    first: np.ndarray = ~pd.Series(codes[order]).duplicated().to_numpy()
+    winner: np.ndarray = np.empty(codes.max(initial=-1) + 1, dtype=np.int64)
+    winner[codes[order[first]]] = order[first]
+    dropped: np.ndarray = np.zeros(n, dtype=bool)
+    dropped[order[~first]] = True
+    # only dropped records have a winner, winner is empty without candidates
+    kept_by: np.ndarray = np.full(n, -1, dtype=np.int64)
+    kept_by[dropped] = winner[codes[dropped]]
+    result: DeduplicationResult = DeduplicationResult(
+      records, doi, candidates & ~dropped, dropped, kept_by)
+    self.logger.info(f'Found {len(winner)} DOIs with {dropped.sum()} '
+                     f'duplicates among {candidates.sum()} records')
+    return result
+
+
+class DeduplicationResult:
+  '''
+  Class that holds the decisions of a `DoiDeduplicator`.
+
+  Attributes
+  ----------
+  keep: np.ndarray
+    True for every record with a DOI that is kept, i.e. the first record of
+    its DOI in priority order (including DOIs that occur only once).
+  drop: np.ndarray
+    True for every record that duplicates the DOI of a kept record.
+  doi: pd.Series
+    The normalized DOI of every record.
+  provenance: pd.DataFrame
+    One row per dropped record with its position in the records, source,
+    source row and DOI, and the position, source and source row of the
+    record that was kept instead.
+  '''
+
+  def __init__(self, records: pd.DataFrame, doi: pd.Series, keep: np.ndarray,
+               drop: np.ndarray, kept_by: np.ndarray):
+    self.keep: np.ndarray = keep
+    self.drop: np.ndarray = drop
+    self.doi: pd.Series = doi
+    dropped: np.ndarray = np.flatnonzero(drop)
+    winners: np.ndarray = kept_by[dropped]
+    self.provenance: pd.DataFrame = pd.DataFrame({
+      'record': dropped,
+      'source': records['source'].to_numpy()[dropped],
+      'source_row': records['source_row'].to_numpy()[dropped],
+      'doi': doi.to_numpy()[dropped],
+      'kept_record': winners,
+      'kept_source': records['source'].to_numpy()[winners],
+      'kept_source_row': records['source_row'].to_numpy()[winners]})
+
+  def summary(self) -> pd.DataFrame:
+    '''
+    Returns the number of dropped records per source (rows) and the source
+    of the record kept instead (columns).
+    '''
+    return pd.crosstab(self.provenance['source'],
+                       self.provenance['kept_source'])
@@ -0,0 +1,160 @@
+import re
+import numpy as np
+import pandas as pd
+from .near_duplicates import NearDuplicateResult, TextNormalizer
+
+
+class RayyanEvaluation:
+  '''
+  Class that uses the decisions of the manual deduplication with Rayyan
+  (search_strategy/rayyan_deduplication.md) as an evaluation set for the
+  `NearDuplicateDetector`.
+
+  Every top-level entry of the file is one decision. Entries under
+  "Ressolved Duplicates" name a publication that was found more than once,
+  entries under "Kept All" name a publication (and usually the title of the
+  similar one as first sub-entry) that were kept as different publications.
+  Titles are matched with the records by their normalized titles, where a
+  title may be a prefix of the other (truncated titles of Google Scholar,
+  conference names appended in the file).
+
+  A duplicate decision is detected if at least two matching records ended
+  up in the same cluster. A kept decision is respected if no record of the
+  title shares a cluster with a record of the alternative title, or, if
+  there is none, if no two matching records share a cluster. Decisions with
+  less than two matching records, e.g. because the records of a database
+  are not loaded or were removed by an earlier stage, can not be evaluated.
+
+  Attributes
+  ----------
+  decisions: pd.DataFrame
+    One row per decision with its section ("trivial", "non-trivial",
+    "unclear" or "kept"), title, alternative title, the similarity reported
+    by Rayyan and the sources named in the file.
+  min_length: int
+    Normalized titles shorter than this only match exactly, prefixes also
+    need at least half the length of the longer title.
+
+  Methods
+  -------
+  evaluate(records: pd.DataFrame, result: NearDuplicateResult,
+           alive: np.ndarray) -> pd.DataFrame
+    Returns the decisions with their matching records and outcomes.
+  summary(evaluated: pd.DataFrame) -> pd.DataFrame
+    Returns the outcomes per section.
+
+  Examples
+  --------
+  ```py
+  md_path = '../../search_strategy/rayyan_deduplication.md'
+  evaluation = RayyanEvaluation(md_path)
+  evaluated = evaluation.evaluate(record_set.records, result)
+  print(evaluation.summary(evaluated))
+  ```
+  '''
+
+  sections: dict = {'### Trivial': 'trivial', '### Non-Trivial': 'non-trivial',
+                    '## Unclear': 'unclear', '## Kept All': 'kept'}
+  similarity_pattern: str = r'^(\d+)%(?:,\s*(.*))?$'
+
+  def __init__(self, file_path: str, min_length: int = 20):
+    self.file_path: str = file_path
+    self.min_length: int = min_length
+    self.normalizer: TextNormalizer = TextNormalizer()
+    self.decisions: pd.DataFrame = self._parse()
+
+  def _parse(self) -> pd.DataFrame:
+    rows: list = []
+    section: str = None
+    with open(self.file_path, 'r', encoding='utf-8') as file:
+      for line in file:
+        line = line.rstrip()
+        if line.startswith('#'):
+          section = self.sections.get(line.strip())
+          continue
+        if section is None or not line.lstrip().startswith('* '):
+          continue
+        text: str = line.lstrip()[2:].strip()
+        indent: int = len(line) - len(line.lstrip())
+        if indent == 0:
+          rows.append({'section': section, 'title': text,
+                       'other_title': None, 'similarity': np.nan,
+                       'sources': None, 'subentries': 0})
+          continue
+        if indent != 2 or not rows:
+          continue
+        row: dict = rows[-1]
+        match: re.Match = re.match(self.similarity_pattern, text)
+        if match is not None and np.isnan(row['similarity']):
+          row['similarity'] = int(match.group(1)) / 100
+          row['sources'] = match.group(2)
+        elif section == 'kept' and row['subentries'] == 0:
+          row['other_title'] = text
+        row['subentries'] += 1
+    return pd.DataFrame(rows).drop(columns='subentries')
+
+  def evaluate(self, records: pd.DataFrame, result: NearDuplicateResult,
+               alive: np.ndarray = None) -> pd.DataFrame:
+    '''
+    Returns the decisions with the positions of their matching records, the
+    clusters of these records, whether the decision can be evaluated and
+    whether the detector agreed with it. Only records where alive is true
+    (default: all), i.e. that were passed to the detector, are matched.
+    '''
+    titles: pd.Series = self.normalizer.title(records['title'])
+    if alive is not None:
+      titles = titles[np.asarray(alive)]
+    cluster: pd.Series = result.clusters.set_index('record')['cluster']
+    evaluated: pd.DataFrame = self.decisions.copy()
+    matched: list = []
+    merged: list = []
+    for title, other_title in zip(evaluated['title'],
+                                  evaluated['other_title']):
+      first: list = self._match(title, titles)
+      second: list = self._match(other_title, titles) \
+        if other_title is not None else []
+      matched.append(sorted(set(first) | set(second)))
+      first_clusters: set = set(cluster.reindex(first).dropna())
+      if other_title is not None:
+        merged.append(bool(first_clusters
+                           & set(cluster.reindex(second).dropna())))
+      else:
+        merged.append(len(first_clusters)
+                      < cluster.reindex(first).notna().sum())
+    evaluated['records'] = matched
+    evaluated['clusters'] = [cluster.reindex(m).dropna().astype(int).tolist()
+                             for m in matched]
+    evaluated['evaluable'] = evaluated['records'].str.len() >= 2
+    # duplicates are detected, kept ones are not merged
+    merged: np.ndarray = np.array(merged, dtype=bool)
+    evaluated['correct'] = pd.Series(np.where(
+      evaluated['section'] == 'kept', ~merged, merged), dtype='boolean')
+    evaluated.loc[~evaluated['evaluable'], 'correct'] = pd.NA
+    return evaluated
+
+  def summary(self, evaluated: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Returns per section the number of decisions, of evaluable decisions and
+    of decisions the detector agreed with, and the share of the latter among
+    the evaluable ones (recall for duplicates, specificity for kept ones).
+    '''
+    grouped = evaluated.groupby('section', sort=False)
+    summary: pd.DataFrame = pd.DataFrame({
+      'decisions': grouped.size(),
+      'evaluable': grouped['evaluable'].sum(),
+      'correct': grouped['correct'].sum()})
+    summary['rate'] = summary['correct'] / summary['evaluable']
+    return summary
+
+  def _match(self, title: str, titles: pd.Series) -> list:
+    '''Returns the positions of the titles matching the given one.'''
+    title = self.normalizer.title(pd.Series([title]))[0]
+    positions: list = []
+    for i, other in titles.items():
+      if other == title:
+        positions.append(i)
+      elif min(len(other), len(title)) \
+          >= max(self.min_length, max(len(other), len(title)) / 2) \
+          and (other.startswith(title) or title.startswith(other)):
+        positions.append(i)
+    return positions
@@ -0,0 +1,472 @@
+import logging
+import mmap
+import re
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from bibtexparser.bibdatabase import COMMON_STRINGS, STANDARD_TYPES
+from rispy.config import DELIMITED_TAG_MAPPING, LIST_TYPE_TAGS, \
+  TAG_KEY_MAPPING
+
+
+class _Columns:
+  '''
+  Collects records as one list per column, missing values are NaN. Columns
+  are ordered by their first appearance like `pd.DataFrame(records)`.
+  '''
+
+  def __init__(self):
+    self.columns: dict = {}
+    self.length: int = 0
+
+  def append(self, record: dict) -> None:
+    for key, value in record.items():
+      column: list = self.columns.get(key)
+      if column is None:
+        column = self.columns[key] = [np.nan] * self.length
+      column.append(value)
+    self.length += 1
+    if len(record) < len(self.columns):
+      for column in self.columns.values():
+        if len(column) < self.length:
+          column.append(np.nan)
+
+  def to_frame(self) -> pd.DataFrame:
+    if not self.columns:
+      return pd.DataFrame(index=range(self.length))
+    return pd.DataFrame({key: pd.Series(column, dtype=object)
+                         for key, column in self.columns.items()})
+
+
+class _RecordFile:
+  '''
+  Base class of the streaming readers and writers. Subclasses implement
+  `_iter_records` over a memory-mapped file and `_format` of whole columns.
+  '''
+
+  def __init__(self, encoding: str = 'utf-8'):
+    self.logger = logging.getLogger('screening_logger')
+    self.encoding: str = encoding
+
+  def iter_batches(self, file_path: str,
+                   batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+    '''
+    Yields the records of file_path as DataFrames of up to batch_size rows.
+    Only the current batch is kept in memory. The columns of each batch are
+    the fields that occur in it.
+    '''
+    columns: _Columns = _Columns()
+    for record in self._iter_records(file_path):
+      columns.append(record)
+      if columns.length == batch_size:
+        yield columns.to_frame()
+        columns = _Columns()
+    if columns.length > 0:
+      yield columns.to_frame()
+
+  def read(self, file_path: str) -> pd.DataFrame:
+    '''Reads all records of file_path into one DataFrame.'''
+    columns: _Columns = _Columns()
+    for record in self._iter_records(file_path):
+      columns.append(record)
+    self.logger.debug(f'Read {columns.length} entries from {file_path}')
+    return columns.to_frame()
+
+  def write(self, df: pd.DataFrame, file_path: str, **kwargs) -> None:
+    '''Writes the records of df to file_path.'''
+    with open(file_path, 'w', encoding=self.encoding) as file:
+      file.write(self._format(df, **kwargs))
+
+  def _iter_records(self, file_path: str) -> Iterator[dict]:
+    raise NotImplementedError
+
+  def _format(self, df: pd.DataFrame, **kwargs) -> str:
+    raise NotImplementedError
+
+  def _as_text(self, s: pd.Series, na_rep: str = None) -> pd.Series:
+    '''
+    Returns the values of s as strings in one conversion of the column,
+    missing values become na_rep (default: stay missing).
+    '''
+    missing: pd.Series = s.isna()
+    if s.dtype == object and not missing.any() \
+       and pd.api.types.infer_dtype(s, skipna=False) == 'string':
+      return s
+    text: pd.Series = s.astype(str).astype(object)
+    return text.mask(missing, np.nan if na_rep is None else na_rep)
+
+  def _map(self, file_path: str) -> mmap.mmap:
+    with open(file_path, 'rb') as file:
+      try:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+      except ValueError:  # empty files can not be mapped
+        return mmap.mmap(-1, 1)
+
+
+class BibFile(_RecordFile):
+  '''
+  Streaming reader and writer of BibTeX files that produces the same
+  entries as `bibtexparser.load` and the same files as `BibTexWriter`.
+
+  The file is memory-mapped and cut at every "@" that starts a line, each
+  piece is decoded and parsed on its own and its fields are appended to the
+  column lists directly. Like bibtexparser, field names and entry types are
+  lower-cased, "ENTRYTYPE" and "ID" are added, entries of non-standard types,
+  comments and preambles are skipped, @string macros and month abbreviations
+  are interpolated and the indentation of continued lines is removed. An
+  entry that is not closed before the next entry starts is skipped.
+
+  Writing builds the text of each field for all rows at once with string
+  operations on whole columns instead of converting every cell in Python.
+
+  Methods
+  -------
+  iter_batches(file_path: str, batch_size: int) -> Iterator[pd.DataFrame]
+    Yields the entries of a file in batches.
+  read(file_path: str) -> pd.DataFrame
+    Reads all entries of a file.
+  write(df: pd.DataFrame, file_path: str, na_rep: str) -> None
+    Writes entries to a file, sorted by their ID.
+
+  Examples
+  --------
+  ```py
+  bib = BibFile()
+  df = bib.read('./data/raw/acm_digitallibrary.bib')
+  bib.write(df[df['year'] >= '2009'], './acm_recent.bib')
+  ```
+  '''
+
+  _record_start: re.Pattern = re.compile(rb'(?:^|\n)[ \t]*@')
+  _head: re.Pattern = re.compile(r'@\s*([A-Za-z]+)\s*([{(])')
+  _entry_head: re.Pattern = re.compile(rb'@\s*[A-Za-z]+\s*[{(]')
+  _field_name: re.Pattern = re.compile(r'\s*([\w\-().+]+)\s*=\s*')
+  _entry_end: re.Pattern = re.compile(r'\s*,?\s*[})]')
+  _separator: re.Pattern = re.compile(r'\s*,')
+  _concatenation: re.Pattern = re.compile(r'\s*#\s*')
+  _integer: re.Pattern = re.compile(r'\d+')
+  _string_name: re.Pattern = re.compile(r'[\w\-:]+')
+  _braces: re.Pattern = re.compile(r'[{}]')
+  _quote_or_braces: re.Pattern = re.compile(r'["{}]')
+
+  def _iter_records(self, file_path: str) -> Iterator[dict]:
+    strings: dict = dict(COMMON_STRINGS)
+    with self._map(file_path) as data:
+      starts: list = [m.end() - 1 for m in self._record_start.finditer(data)]
+      starts.append(len(data))
+      i: int = 0
+      while i < len(starts) - 1:
+        # an entry ends before the next "@" at the start of a line, unless
+        # that one is part of a value, then the next piece is added
+        j: int = i + 1
+        while True:
+          text: str = data[starts[i]:starts[j]].decode(self.encoding)
+          if i == 0 and text.startswith('\ufeff'):
+            text = text[1:]
+          try:
+            record: dict = self._parse(text, strings)
+            break
+          except _Incomplete:
+            # a piece that starts an entry of its own ends a broken one
+            if j == len(starts) - 1 \
+               or self._entry_head.match(data, starts[j]):
+              self.logger.debug(f'Skipped incomplete entry in {file_path}')
+              record, j = None, i + 1
+              break
+            j += 1
+          except ValueError as e:
+            self.logger.debug(f'Skipped invalid entry in {file_path}: {e}')
+            record, j = None, i + 1
+            break
+        if record is not None:
+          yield record
+        i = j
+
+  def _parse(self, text: str, strings: dict) -> dict:
+    '''
+    Parses one "@..." block. Returns the entry as dict or None for comments,
+    preambles, string definitions and entries of non-standard types.
+    '''
+    head: re.Match = self._head.match(text)
+    if head is None:
+      raise ValueError('Missing entry type')
+    entry_type: str = head.group(1).lower()
+    if entry_type in ('comment', 'preamble'):
+      return None
+    pos: int = head.end()
+    if entry_type == 'string':
+      name: re.Match = self._field_name.match(text, pos)
+      if name is None:
+        raise ValueError('Invalid string definition')
+      value, pos = self._parse_value(text, name.end(), strings)
+      strings[name.group(1).lower()] = value
+      return None
+    comma: int = text.find(',', pos)
+    if comma < 0:
+      raise _Incomplete()
+    key: str = text[pos:comma].strip()
+    if not key or any(c.isspace() for c in key):
+      raise ValueError(f'Invalid citation key "{key}"')
+    pos = comma + 1
+    pairs: list = []
+    while True:
+      if self._entry_end.match(text, pos):
+        break
+      name: re.Match = self._field_name.match(text, pos)
+      if name is None:
+        if text[pos:].strip() == '':
+          raise _Incomplete()
+        raise ValueError(f'Invalid field in entry "{key}"')
+      value, pos = self._parse_value(text, name.end(), strings)
+      pairs.append((name.group(1), value))
+      separator: re.Match = self._separator.match(text, pos)
+      if separator is None:
+        if self._entry_end.match(text, pos):
+          break
+        raise _Incomplete() if text[pos:].strip() == '' \
+          else ValueError(f'Missing comma in entry "{key}"')
+      pos = separator.end()
+    if entry_type not in STANDARD_TYPES:
+      self.logger.debug(f'Entry type {entry_type} not standard, skipped')
+      return None
+    # duplicate fields keep their first value, like bibtexparser does
+    fields: dict = {name: value for name, value in reversed(pairs)}
+    entry: dict = {}
+    for name, value in fields.items():
+      entry[name.lower()] = '' if not value or value == '{}' else value
+    entry['ENTRYTYPE'] = entry_type
+    entry['ID'] = key
+    return entry
+
+  def _parse_value(self, text: str, pos: int, strings: dict) -> tuple:
+    '''Parses the value starting at pos, returns it and its end position.'''
+    integer: re.Match = self._integer.match(text, pos)
+    if integer is not None and not self._string_name.match(text,
+                                                           integer.end()):
+      return integer.group(), integer.end()
+    parts: list = []
+    while True:
+      if pos >= len(text):
+        raise _Incomplete()
+      if text[pos] == '{':
+        end: int = self._closing(text, pos, self._braces)
+        parts.append(self._strip_lines(text[pos + 1:end - 1]))
+      elif text[pos] == '"':
+        end: int = self._closing(text, pos, self._quote_or_braces)
+        parts.append(self._strip_lines(text[pos + 1:end - 1]))
+      else:
+        name: re.Match = self._string_name.match(text, pos)
+        if name is None:
+          raise ValueError(f'Invalid value at "{text[pos:pos + 20]}"')
+        end = name.end()
+        parts.append(self._interpolate(name.group(), strings))
+      concatenation: re.Match = self._concatenation.match(text, end)
+      if concatenation is None:
+        return ''.join(parts), end
+      pos = concatenation.end()
+
+  def _closing(self, text: str, pos: int, pattern: re.Pattern) -> int:
+    '''Returns the position after the delimiter that closes the one at pos.'''
+    depth: int = 0
+    for m in pattern.finditer(text, pos + 1):
+      c: str = m.group()
+      if c == '"' and depth == 0:
+        return m.end()
+      if c == '{':
+        depth += 1
+      elif c == '}':
+        if depth == 0:
+          return m.end()
+        depth -= 1
+    raise _Incomplete()
+
+  def _strip_lines(self, value: str) -> str:
+    '''Removes the leading whitespace of all but the first line.'''
+    lines: list = value.splitlines()
+    if len(lines) > 1:
+      lines = [lines[0]] + [line.lstrip() for line in lines[1:]]
+    return '\n'.join(lines)
+
+  def _interpolate(self, name: str, strings: dict) -> str:
+    value: str = strings.get(name.lower())
+    if value is None:
+      self.logger.warning(f'Undefined BibTeX string "{name}" kept as is')
+      return name
+    return value
+
+  def _format(self, df: pd.DataFrame, na_rep: str = None) -> str:
+    '''
+    Returns the entries of df as BibTeX in the layout of `BibTexWriter`:
+    sorted by the lower-cased ID, one field per line in alphabetical order.
+    Missing values are left out, or written as na_rep if it is given.
+    '''
+    if len(df) == 0:
+      return ''
+    df = df.iloc[np.argsort(self._as_text(df['ID'], '').str.lower()
+                            .to_numpy(dtype=str), kind='stable')]
+    text: pd.Series = '@' + self._as_text(df['ENTRYTYPE'], na_rep) + '{' \
+      + self._as_text(df['ID'], na_rep)
+    for field in sorted(c for c in df.columns if c not in ('ENTRYTYPE', 'ID')):
+      values: pd.Series = self._as_text(df[field], na_rep)
+      text = text + (',\n ' + field + ' = {' + values + '}').fillna('')
+    return '\n'.join((text + '\n}\n').tolist())
+
+
+class RisFile(_RecordFile):
+  '''
+  Streaming reader and writer of RIS files that produces the same records
+  as `rispy.load` and the same files as `rispy.dump`.
+
+  The file is memory-mapped and cut after every "ER" line, each record is
+  decoded and parsed on its own. Tags are mapped to the field names of
+  rispy, list tags (e.g. authors and keywords) become lists, continued lines
+  are joined by spaces and unknown tags (and "UK" lines) are collected in
+  "unknown_tag".
+
+  Writing builds the lines of each field for all rows at once with string
+  operations on whole columns, list fields are exploded into one line per
+  value first.
+
+  Methods
+  -------
+  iter_batches(file_path: str, batch_size: int) -> Iterator[pd.DataFrame]
+    Yields the records of a file in batches.
+  read(file_path: str) -> pd.DataFrame
+    Reads all records of a file.
+  write(df: pd.DataFrame, file_path: str) -> None
+    Writes records to a file.
+
+  Examples
+  --------
+  ```py
+  ris = RisFile()
+  df = ris.read('./data/raw/ieee_xplore_fromDOIs.ris')
+  ris.write(df[df['year'] >= '2009'], './ieee_recent.ris')
+  ```
+  '''
+
+  _line_break: re.Pattern = re.compile(r'\r\n|\r|\n')
+  _unknown: str = TAG_KEY_MAPPING['UK']
+  _list_tags: set = set(LIST_TYPE_TAGS)
+  _tags: dict = {name: tag for tag, name in TAG_KEY_MAPPING.items()}
+  # names of the tags that hold a single value, read without `_add`
+  _single_names: dict = {tag: name for tag, name in TAG_KEY_MAPPING.items()
+                         if tag not in LIST_TYPE_TAGS and tag != 'UK'
+                         and tag not in DELIMITED_TAG_MAPPING}
+
+  def _iter_records(self, file_path: str) -> Iterator[dict]:
+    last_tag: str = None  # like rispy, kept from one record to the next
+    with self._map(file_path) as data:
+      start: int = 0
+      while True:
+        end: int = data.find(b'\nER  -', start)
+        if end < 0:
+          break
+        end = data.find(b'\n', end + 1)
+        end = len(data) if end < 0 else end
+        text: str = data[start:end].decode(self.encoding)
+        if start == 0 and text.startswith('\ufeff'):
+          text = text[1:]
+        start = end + 1
+        # only the line breaks of text files, not all of str.splitlines
+        lines: list = self._line_break.split(text) if '\r' in text \
+          else text.split('\n')
+        record, last_tag = self._parse(lines, last_tag)
+        if record is not None:
+          yield record
+
+  def _parse(self, lines: list, last_tag: str) -> tuple:
+    '''
+    Parses the lines of one record up to its "ER" line. Lines before its
+    "TY" line are skipped. Returns the record and the last tag.
+    '''
+    record: dict = None
+    for line in lines:
+      # a tag line is "XY  - content", other lines continue the last tag
+      is_tag: bool = line[2:5] == '  -' and line[:2].isupper() \
+        and line[0:1].isalpha()
+      if record is None:
+        if line.startswith('TY'):
+          record = {TAG_KEY_MAPPING['TY']: line[6:].strip() if is_tag
+                    else line.strip()}
+      elif not is_tag:
+        self._add(record, last_tag, line.strip(), continued=True)
+      elif line[:2] == 'ER':
+        return record, last_tag
+      else:
+        last_tag = line[:2]
+        name: str = self._single_names.get(last_tag)
+        if name is None:
+          self._add(record, last_tag, line[6:].strip())
+        elif name not in record:  # the first value of a tag wins
+          record[name] = line[6:].strip()
+    return None, last_tag
+
+  def _add(self, record: dict, tag: str, content: str,
+           continued: bool = False) -> None:
+    name: str = TAG_KEY_MAPPING.get(tag)
+    if name is None or tag == 'UK':  # "UK" lines are unknown tags as well
+      record.setdefault(self._unknown, {}).setdefault(tag, []).append(content)
+      return
+    delimiter: str = DELIMITED_TAG_MAPPING.get(tag)
+    if delimiter is not None:
+      content = [part.strip() for part in content.split(delimiter)]
+    if tag in self._list_tags:
+      values: list = content if isinstance(content, list) else [content]
+      if name in record:
+        record[name].extend(values)
+      else:
+        record[name] = list(values)
+    elif not continued:
+      record.setdefault(name, content)
+    elif isinstance(content, list):
+      record[name].extend(content)
+    else:
+      record[name] = record[name] + ' ' + content
+
+  def _format(self, df: pd.DataFrame) -> str:
+    '''
+    Returns the records of df as RIS in the layout of `rispy.dump`, with a
+    numbered header line and an empty line between records. Missing values
+    are written as empty lines of their tag, missing lists are left out.
+    '''
+    n: int = len(df)
+    if n == 0:
+      return ''
+    df = df.reset_index(drop=True)
+    type_key: str = TAG_KEY_MAPPING['TY']
+    reference_type: pd.Series = self._as_text(df[type_key], '') \
+      if type_key in df.columns else pd.Series('JOUR', index=df.index)
+    text: pd.Series = pd.Series(np.arange(1, n + 1), index=df.index) \
+      .astype(str) + '.\nTY  - ' + reference_type + '\n'
+    for column in df.columns:
+      tag: str = self._tags.get(str(column).lower())
+      if tag is None:
+        self.logger.warning(f'Column {column} is not a RIS field, skipped')
+        continue
+      if tag == 'TY':
+        continue
+      if tag in self._list_tags or tag == 'UK':
+        text = text + self._format_lists(df[column], tag)
+      else:
+        text = text + tag + '  - ' + self._as_text(df[column], '') + '\n'
+    text = text + 'ER  - \n'
+    text.iloc[:-1] = text.iloc[:-1] + '\n'
+    return ''.join(text.tolist())
+
+  def _format_lists(self, s: pd.Series, tag: str) -> pd.Series:
+    '''Returns one line per list value of s, or per value of each tag.'''
+    if tag == 'UK':
+      s = s.map(lambda tags: [f'{t}  - {v}' for t, values in tags.items()
+                              for v in values]
+                if isinstance(tags, dict) else np.nan)
+      prefix: str = ''
+    else:
+      prefix: str = f'{tag}  - '
+    values: pd.Series = s.explode().dropna()
+    lines: pd.Series = prefix + values.astype(str) + '\n'
+    return lines.groupby(level=0).sum().reindex(s.index, fill_value='')
+
+
+class _Incomplete(Exception):
+  '''Raised when a BibTeX entry continues after the end of its piece.'''
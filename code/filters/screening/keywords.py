@@ -0,0 +1,143 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+class KeywordIndex:
+  '''
+  Class that finds many keywords at once in large amounts of text, e.g. the
+  review keywords in titles and abstracts of publications or search terms in
+  descriptions and READMEs of repositories. The crawler imports it for its
+  `RelevanceScreen` (code/opensource_search/gh_search/keywords.py).
+
+  The keywords are case folded and compiled once into a trie, which is
+  turned into a single regular expression whose alternatives share their
+  prefixes. Unlike an alternation of the plain keywords, the regex engine
+  never tries a keyword again after a shared prefix failed, so every text is
+  scanned in one pass in C regardless of the number of keywords, like with
+  an Aho-Corasick automaton. Texts are case folded before the scan, which is
+  several times faster than a case-insensitive regex. All occurrences are
+  reported, including overlapping ones ("literature review" inside
+  "systematic literature review") and keywords that are a prefix of another
+  one.
+
+  Attributes
+  ----------
+  keywords: list
+    The keywords, matched case-insensitively.
+  whole_words: bool
+    If True, keywords only match as whole words, i.e. not directly preceded
+    or followed by a letter, digit or underscore.
+
+  Methods
+  -------
+  find(text: str) -> list[tuple[int, str]]
+    Returns the start and keyword of every occurrence in a text.
+  contains(s: pd.Series) -> np.ndarray
+    Returns for every text whether any keyword occurs in it.
+  scan(df: pd.DataFrame, fields: list) -> pd.DataFrame
+    Returns all occurrences in the given columns, one row per occurrence.
+
+  Examples
+  --------
+  ```py
+  index = KeywordIndex(['Systematic Review', 'Meta-Analysis'])
+  hits = index.scan(records, ['title', 'abstract'])
+  print(hits.groupby(['field', 'keyword']).size())
+  ```
+  '''
+
+  def __init__(self, keywords: list, whole_words: bool = True):
+    self.keywords: list = list(keywords)
+    self.whole_words: bool = whole_words
+    # folded keyword -> first keyword with that folding
+    self._folded: dict = {}
+    for keyword in self.keywords:
+      self._folded.setdefault(keyword.casefold(), keyword)
+    trie: dict = {}
+    for folded in self._folded:
+      node: dict = trie
+      for char in folded:
+        node = node.setdefault(char, {})
+      node[''] = {}
+    body: str = self._to_regex(trie)
+    if whole_words:
+      body = rf'(?<!\w)(?:{body})(?!\w)'
+    self._search: re.Pattern = re.compile(body)
+    # a lookahead matches at every position, which yields overlapping hits
+    self._overlapping: re.Pattern = re.compile(f'(?=({body}))')
+    # for the few texts whose folding changes their length (e.g. "ß" -> "ss")
+    self._overlapping_ignorecase: re.Pattern = re.compile(f'(?=({body}))',
+                                                          re.IGNORECASE)
+    self._prefixes: dict = {folded: self._prefixes_of(folded)
+                            for folded in self._folded}
+
+  def find(self, text: str) -> list[tuple[int, str]]:
+    '''
+    Returns the start and keyword of every occurrence of a keyword in text,
+    ordered by start.
+    '''
+    hits: list = []
+    if not isinstance(text, str):
+      return hits
+    folded: str = text.casefold()
+    matches = self._overlapping.finditer(folded) if len(folded) == len(text) \
+      else self._overlapping_ignorecase.finditer(text)
+    for match in matches:
+      matched: str = match.group(1).casefold()
+      for prefix in self._prefixes.get(matched, []):
+        hits.append((match.start(), self._folded[prefix]))
+    return hits
+
+  def contains(self, s: pd.Series) -> np.ndarray:
+    '''Returns for every text whether any keyword occurs in it.'''
+    search = self._search.search
+    return np.fromiter((isinstance(text, str)
+                        and search(text.casefold()) is not None
+                        for text in s), dtype=bool, count=len(s))
+
+  def scan(self, df: pd.DataFrame, fields: list) -> pd.DataFrame:
+    '''
+    Returns all occurrences of keywords in the given columns of df with one
+    pass over each column. Every row holds the position of the row in df,
+    the column, the keyword and the start of the occurrence in the text.
+    '''
+    rows: list = []
+    for field in fields:
+      for position, text in enumerate(df[field]):
+        for start, keyword in self.find(text):
+          rows.append((position, field, keyword, start))
+    hits: pd.DataFrame = pd.DataFrame(
+      rows, columns=['row', 'field', 'keyword', 'start'])
+    hits['field'] = pd.Categorical(hits['field'], categories=fields)
+    hits['keyword'] = pd.Categorical(hits['keyword'],
+                                     categories=list(self._folded.values()))
+    return hits
+
+  def _to_regex(self, node: dict) -> str:
+    '''Returns the regex of a trie node, ending keywords are optional.'''
+    ends: bool = '' in node
+    branches: list = [re.escape(char) + self._to_regex(child)
+                      for char, child in sorted(node.items()) if char != '']
+    if not branches:
+      return ''
+    body: str = branches[0] if len(branches) == 1 \
+      else '(?:' + '|'.join(branches) + ')'
+    # greedy: the longest keyword is tried first, shorter ones on backtracking
+    return f'(?:{body})?' if ends else body
+
+  def _prefixes_of(self, folded: str) -> list:
+    '''
+    Returns the keywords that are found together with folded, i.e. folded
+    itself and all keywords that are a prefix of it (and end at a word
+    boundary of it if whole_words is set).
+    '''
+    prefixes: list = []
+    for other in self._folded:
+      if not folded.startswith(other):
+        continue
+      rest: str = folded[len(other):]
+      if other == folded or not self.whole_words \
+         or not (rest[0].isalnum() or rest[0] == '_'):
+        prefixes.append(other)
+    return prefixes
@@ -0,0 +1,504 @@
+import logging
+import numpy as np
+import pandas as pd
+from .dedup import source_ranks
+
+
+class TextNormalizer:
+  '''
+  Class that normalizes titles, abstracts and author lists by the rules of
+  the manual deduplication in search_strategy/rayyan_deduplication.md, i.e.
+  it removes the differences that databases add to the same publication:
+
+  - casing ("OBJECTIVE" vs "objective", "PsycInfo" vs "PsycINFO")
+  - LaTeX exports ("\\chi" vs "X", "Sch\\"{u}z" vs "Schüz") and accents
+  - keyword sections appended to the end of abstracts
+  - highlight sections added to the start of abstracts
+  - copyright notes of the databases at the end of abstracts
+  - the order of given names and surnames ("DA Daugherty" vs "Daugherty DA")
+
+  All methods work on whole Series with vectorized string operations.
+  '''
+
+  # LaTeX and Greek letters that exports render as latin look-alikes
+  greek: dict = {'alpha': 'a', 'beta': 'b', 'gamma': 'g', 'delta': 'd',
+                 'epsilon': 'e', 'kappa': 'k', 'lambda': 'l', 'mu': 'm',
+                 'pi': 'p', 'rho': 'r', 'sigma': 's', 'tau': 't', 'chi': 'x',
+                 'omega': 'w'}
+  greek_chars: dict = {'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e',
+                       'κ': 'k', 'λ': 'l', 'μ': 'm', 'π': 'p', 'ρ': 'r',
+                       'σ': 's', 'τ': 't', 'χ': 'x', 'ω': 'w'}
+  keywords_section: str = r'\b(?:key ?words?|index terms)\b\s*[:.-].*$'
+  highlights_section: str = r'^\s*highlights?\b.*?\babstract\b\s*[:.-]?'
+  copyright_note: str = (r'(?:\(\s*psycinfo database record.*$'
+                         r'|(?:©|\(c\)|copyright)\s*\d{4}.*$)')
+
+  def title(self, s: pd.Series) -> pd.Series:
+    '''Returns the normalized titles, without trailing ellipses.'''
+    return self._clean(s.astype('string').fillna('')
+                       .str.replace(r'(?:\.\.\.|…)\s*$', '', regex=True))
+
+  def abstract(self, s: pd.Series) -> pd.Series:
+    '''Returns the normalized abstracts without added sections.'''
+    text: pd.Series = self._latex(s.astype('string').fillna('')).str.lower()
+    text = text.str.replace(self.highlights_section, '', regex=True)
+    text = text.str.replace(self.keywords_section, '', regex=True)
+    text = text.str.replace(self.copyright_note, '', regex=True)
+    return self._clean(text)
+
+  def authors(self, s: pd.Series) -> pd.Series:
+    '''
+    Returns the sorted, space separated surnames of each author list. Parts
+    of names with up to two letters are taken as initials and dropped, so
+    the order of surname and initials does not matter.
+    '''
+    names: pd.Series = self._clean(s.astype('string').fillna(''))
+    return names.str.split().map(
+      lambda parts: ' '.join(sorted({p for p in parts
+                                     if len(p) > 2 and p != 'and'})))
+
+  def _latex(self, s: pd.Series) -> pd.Series:
+    s = s.str.replace(r'\\(' + '|'.join(self.greek) + r')\b',
+                      lambda m: self.greek[m.group(1)], regex=True)
+    s = s.str.replace(r'\\[a-zA-Z]+\s*|\\.|[{}$]', '', regex=True)
+    return s.str.replace('[' + ''.join(self.greek_chars) + ']',
+                         lambda m: self.greek_chars[m.group()], regex=True)
+
+  def _clean(self, s: pd.Series) -> pd.Series:
+    '''Lower-cases, removes LaTeX, accents and punctuation.'''
+    # punctuation first, encoding would drop dashes like "–" without a space
+    s = self._latex(s).str.lower().str.replace(r'[^\w\s]+', ' ', regex=True)
+    s = s.str.normalize('NFKD')
+    s = s.str.encode('ascii', errors='ignore').str.decode('ascii')
+    return s.str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+
+
+class MinHashIndex:
+  '''
+  Class that finds candidate pairs of similar shingle sets with MinHash
+  signatures and locality-sensitive hashing.
+
+  Every set is reduced to num_perm minimum hash values, the hash functions
+  are multiply-shift hashes h(x) = (a * x + b) >> 32 on 64 bit integers,
+  which numpy computes without divisions. The signatures are
+  cut into bands of rows = num_perm / bands values, two sets become a
+  candidate pair if all values of any band are equal. Pairs with a Jaccard
+  similarity s are found with probability 1 - (1 - s^rows)^bands, e.g.
+  > 99.9% for s >= 0.75 with the defaults, while the work grows linearly with
+  the number of sets instead of with the number of pairs.
+
+  Attributes
+  ----------
+  num_perm: int
+    Number of hash functions, i.e. the length of the signatures.
+  bands: int
+    Number of bands, must divide num_perm.
+  max_bucket: int
+    Buckets with more sets than this are ignored, they hold extremely common
+    shingle sets (e.g. empty titles) and would create quadratically many
+    pairs.
+  seed: int
+    Seed of the hash functions.
+  '''
+
+  def __init__(self, num_perm: int = 128, bands: int = 32,
+               max_bucket: int = 50, seed: int = 0):
+    if num_perm % bands != 0:
+      raise ValueError(f'bands ({bands}) must divide num_perm ({num_perm})')
+    self.num_perm: int = num_perm
+    self.bands: int = bands
+    self.max_bucket: int = max_bucket
+    self.seed: int = seed
+    rng: np.random.Generator = np.random.default_rng(seed)
+    # a must be odd for a universal family of multiply-shift hashes
+    self._a: np.ndarray = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) \
+      * np.uint64(2) + np.uint64(1)
+    self._b: np.ndarray = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+
+  def signatures(self, shingles: np.ndarray, offsets: np.ndarray,
+                 chunk_size: int = 1 << 16) -> np.ndarray:
+    '''
+    Returns the signature of every set. Set i holds the shingle hashes
+    shingles[offsets[i]:offsets[i + 1]], empty sets get the maximum value.
+    '''
+    n: int = len(offsets) - 1
+    signatures: np.ndarray = np.full((n, self.num_perm),
+                                     np.iinfo(np.uint32).max, dtype=np.uint32)
+    non_empty: np.ndarray = np.flatnonzero(np.diff(offsets) > 0)
+    start: int = 0
+    # chunks of whole sets with about chunk_size shingles each
+    while start < len(non_empty):
+      end: int = int(np.searchsorted(offsets[non_empty + 1],
+                                     offsets[non_empty[start]] + chunk_size,
+                                     side='right'))
+      end = max(end, start + 1)
+      sets: np.ndarray = non_empty[start:end]
+      values: np.ndarray = shingles[offsets[sets[0]]:offsets[sets[-1] + 1]]
+      # one contiguous row per hash function, reduceat runs along the rows
+      hashed: np.ndarray = ((self._a[:, None] * values + self._b[:, None])
+                            >> np.uint64(32)).astype(np.uint32)
+      signatures[sets] = np.minimum.reduceat(
+        hashed, offsets[sets] - offsets[sets[0]], axis=1).T
+      start = end
+    return signatures
+
+  def candidates(self, signatures: np.ndarray,
+                 valid: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns the unique candidate pairs (i, j), i < j, as an array of shape
+    (pairs, 2). Only sets where valid is true (default: all) take part.
+    '''
+    ids: np.ndarray = np.arange(len(signatures)) if valid is None \
+      else np.flatnonzero(valid)
+    rows: int = self.num_perm // self.bands
+    pairs: list = []
+    for band in range(self.bands):
+      block: np.ndarray = signatures[ids, band * rows:(band + 1) * rows]
+      key: np.ndarray = block[:, 0].copy()
+      for column in range(1, rows):
+        key = key * np.uint64(0x9E3779B97F4A7C15) + block[:, column]
+      buckets: np.ndarray = pd.factorize(key)[0]
+      sizes: np.ndarray = np.bincount(buckets)
+      shared: np.ndarray = (sizes[buckets] > 1) \
+        & (sizes[buckets] <= self.max_bucket)
+      if not shared.any():
+        continue
+      members: np.ndarray = np.flatnonzero(shared)
+      members = members[np.argsort(buckets[members], kind='stable')]
+      starts: np.ndarray = np.flatnonzero(np.r_[True, np.diff(
+        buckets[members]) != 0])
+      for start, end in zip(starts, np.r_[starts[1:], len(members)]):
+        i, j = np.triu_indices(end - start, 1)
+        pairs.append(np.column_stack((ids[members[start + i]],
+                                      ids[members[start + j]])))
+    if not pairs:
+      return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+class NearDuplicateDetector:
+  '''
+  Class that finds publications that are listed by several databases under
+  slightly different titles and abstracts, which the DOI deduplication can
+  not catch, and decides which of them to keep. It replaces the manual pass
+  with Rayyan (see search_strategy/rayyan_deduplication.md).
+
+  Titles and abstracts are normalized with `TextNormalizer`. Candidate pairs
+  come from two `MinHashIndex` blockings, one over character 4-grams of the
+  titles (publications without abstract, e.g. from Google Scholar) and one
+  over word 3-grams of title and abstract. Only candidate pairs are scored:
+
+  - title similarity: Jaccard similarity of the title 4-grams
+  - text similarity: Jaccard similarity of the title and abstract 3-grams,
+    only if both records have an abstract of at least min_abstract_words
+  - author similarity: share of the surnames of the shorter author list
+    that the other list contains, so lists that Google Scholar cuts off
+    ("MA Marciniak, L Shanahan…") still match
+  - score: the mean of both similarities if there is a text similarity,
+    else the title similarity. Long titles that are (almost) identical score
+    their title similarity alone, databases attach different abstracts to
+    the same publication (report previews, retraction notices).
+
+  Pairs where both records have an abstract are duplicates if their score is
+  at least threshold. A title alone is weaker evidence, series of protocols
+  and reviews differ in one word ("... in Adults With Type 2 Diabetes" vs
+  "... With Hypertension"). Such pairs are duplicates only if the titles are
+  identical or one of them is truncated, by an ellipsis ("...") or by a
+  dropped subtitle, and if their author similarity is at least
+  min_author_similarity (unless an author list is missing). Corrections,
+  errata and retraction notices are never duplicates of other records.
+
+  Duplicate pairs are merged into clusters. The record of the database with
+  the highest priority is kept, ties go to the earlier record, like in the
+  DOI deduplication.
+
+  Attributes
+  ----------
+  threshold: float
+    Minimum score of a duplicate pair, the manual pass accepted pairs down
+    to 75% similarity.
+  priority: list
+    Source names from highest to lowest priority, if None the order of the
+    categories of the source column.
+  min_abstract_words: int
+    Abstracts with fewer words (e.g. search result snippets) are ignored.
+  title_threshold: float
+    Title similarity from which titles count as identical.
+  min_title_length: int
+    Titles need this many characters (after normalization) to count as
+    identical or truncated, short titles like "Ecological momentary
+    assessment" are shared by different publications.
+  min_author_similarity: float
+    Minimum author similarity of pairs that are compared by title only.
+  index: MinHashIndex
+    The blocking index.
+
+  Methods
+  -------
+  detect(records: pd.DataFrame, alive: np.ndarray) -> NearDuplicateResult
+    Finds and resolves the near-duplicates among the records.
+
+  Examples
+  --------
+  ```py
+  result = NearDuplicateDetector().detect(record_set.records)
+  print(result.clusters.sort_values(['cluster', 'kept']))
+  ```
+  '''
+
+  notice_pattern: str = (r'^(?:correction|corrigendum|erratum|retraction'
+                         r'|retracted|withdrawn|expression of concern)\b')
+  truncation_pattern: str = r'^\s*(?:\.\.\.|…)|(?:\.\.\.|…)\s*$'
+
+  def __init__(self, threshold: float = 0.75, priority: list = None,
+               min_abstract_words: int = 30, title_threshold: float = 0.95,
+               min_title_length: int = 40, min_author_similarity: float = 0.5,
+               index: MinHashIndex = None):
+    self.logger = logging.getLogger('screening_logger')
+    self.threshold: float = threshold
+    self.priority: list = priority
+    self.min_abstract_words: int = min_abstract_words
+    self.title_threshold: float = title_threshold
+    self.min_author_similarity: float = min_author_similarity
+    self.min_title_length: int = min_title_length
+    self.index: MinHashIndex = index or MinHashIndex()
+    self.normalizer: TextNormalizer = TextNormalizer()
+
+  def detect(self, records: pd.DataFrame,
+             alive: np.ndarray = None) -> 'NearDuplicateResult':
+    '''
+    Finds the near-duplicates among the records where alive is true
+    (default: all) and decides which to keep.
+    '''
+    n: int = len(records)
+    alive = np.ones(n, dtype=bool) if alive is None else np.asarray(alive)
+    features: dict = self._features(records, alive)
+    has_abstract: np.ndarray = features['has_abstract']
+    pairs: np.ndarray = np.unique(np.concatenate([
+      self.index.candidates(self.index.signatures(*features['title_sets']),
+                            alive),
+      self.index.candidates(self.index.signatures(*features['text_sets']),
+                            alive & has_abstract)]), axis=0)
+    scores: pd.DataFrame = self._score(pairs, features)
+    alive_count: int = int(alive.sum())
+    self.logger.info(f'Scored {len(pairs)} candidate pairs of {alive_count} '
+                     f'records instead of '
+                     f'{alive_count * (alive_count - 1) // 2}')
+    duplicates: pd.DataFrame = scores[scores['duplicate']]
+    return NearDuplicateResult(self, records, duplicates, scores, features)
+
+  def _features(self, records: pd.DataFrame, alive: np.ndarray) -> dict:
+    '''
+    Returns the normalized titles, the title and text shingles, the author
+    surnames and flags for abstracts, truncated titles and notices of every
+    record.
+    '''
+    title: pd.Series = self.normalizer.title(records['title'])
+    abstract: pd.Series = self.normalizer.abstract(records['abstract'])
+    has_abstract: np.ndarray = (abstract.str.count(' ') + 1
+                                >= self.min_abstract_words).to_numpy()
+    text: pd.Series = (title + ' ' + abstract.where(has_abstract, '')) \
+      .str.strip()
+    truncated: pd.Series = records['title'].astype('string').fillna('') \
+      .str.contains(self.truncation_pattern, regex=True)
+    authors: pd.Series = self.normalizer.authors(records['authors'])
+    return {'title': title.to_numpy(dtype=object),
+            'has_abstract': has_abstract,
+            'truncated': truncated.to_numpy(dtype=bool),
+            'notice': title.str.contains(self.notice_pattern, regex=True)
+            .to_numpy(dtype=bool),
+            'authors': authors.str.split().map(frozenset).to_numpy(),
+            'title_sets': self._char_shingles(title, alive),
+            'text_sets': self._word_shingles(text, alive & has_abstract)}
+
+  def _char_shingles(self, s: pd.Series, valid: np.ndarray,
+                     k: int = 4) -> tuple:
+    '''Returns the hashed character k-grams of every string and offsets.'''
+    grams: pd.Series = s.where(valid, '').map(
+      lambda t: [t[i:i + k] for i in range(len(t) - k + 1)])
+    lengths: np.ndarray = grams.str.len().to_numpy()
+    flat: pd.Series = grams.explode().dropna()
+    ids: np.ndarray = pd.factorize(flat)[0].astype(np.uint64)
+    return ids, np.r_[0, np.cumsum(lengths)]
+
+  def _word_shingles(self, s: pd.Series, valid: np.ndarray,
+                     k: int = 3) -> tuple:
+    '''Returns the hashed word k-grams of every string and offsets.'''
+    # the exploded index has to be the position of every string
+    words: pd.Series = s.reset_index(drop=True).where(valid, '').str.split() \
+      .explode()
+    ids: np.ndarray = pd.factorize(words.fillna(''))[0].astype(np.uint64)
+    owner: np.ndarray = words.index.to_numpy()
+    owner[words.isna().to_numpy()] = -1  # empty strings explode to NaN
+    # a k-gram is valid if its k words belong to the same string
+    same: np.ndarray = owner[:len(owner) - k + 1] >= 0
+    for i in range(1, k):
+      same &= owner[:len(owner) - k + 1] == owner[i:len(owner) - k + 1 + i]
+    hashed: np.ndarray = ids[:len(ids) - k + 1].copy()
+    for i in range(1, k):
+      hashed = hashed * np.uint64(1000003) ^ ids[i:len(ids) - k + 1 + i]
+    hashed = hashed[same]
+    lengths: np.ndarray = np.bincount(owner[:len(owner) - k + 1][same],
+                                      minlength=len(s))
+    return hashed, np.r_[0, np.cumsum(lengths)]
+
+  def _score(self, pairs: np.ndarray, features: dict) -> pd.DataFrame:
+    a: np.ndarray = pairs[:, 0]
+    b: np.ndarray = pairs[:, 1]
+    title_similarity: np.ndarray = self._jaccard(pairs,
+                                                 *features['title_sets'])
+    both: np.ndarray = features['has_abstract'][a] \
+      & features['has_abstract'][b]
+    text_similarity: np.ndarray = np.full(len(pairs), np.nan)
+    text_similarity[both] = self._jaccard(pairs[both], *features['text_sets'])
+    author_similarity: np.ndarray = self._author_similarity(
+      pairs, features['authors'])
+    # a title of length l has l - 3 4-grams
+    grams: np.ndarray = np.diff(features['title_sets'][1])
+    same_title: np.ndarray = (title_similarity >= self.title_threshold) \
+      & (grams[a].clip(max=grams[b]) >= self.min_title_length - 3)
+    score: np.ndarray = np.where(both & ~same_title,
+                                 (title_similarity + text_similarity) / 2,
+                                 title_similarity)
+    # NaN (a missing author list) does not reject a pair
+    title_match: np.ndarray = (same_title | self._truncated_match(
+      pairs, features['title'], features['truncated'])) \
+      & ~(author_similarity < self.min_author_similarity)
+    duplicate: np.ndarray = np.where(both, score >= self.threshold,
+                                     title_match) \
+      & (features['notice'][a] == features['notice'][b])
+    return pd.DataFrame({
+      'record_a': a, 'record_b': b,
+      'title_similarity': title_similarity,
+      'text_similarity': text_similarity,
+      'author_similarity': author_similarity,
+      'score': score, 'duplicate': duplicate})
+
+  def _truncated_match(self, pairs: np.ndarray, title: np.ndarray,
+                       truncated: np.ndarray) -> np.ndarray:
+    '''
+    Returns true for every pair where one title, at least min_title_length
+    characters long, is a truncation of the other: it ends with an ellipsis
+    and occurs in the other title, or the other title continues it with more
+    words (a subtitle that a database dropped).
+    '''
+    match: np.ndarray = np.zeros(len(pairs), dtype=bool)
+    for k, (i, j) in enumerate(pairs):
+      for short, full in ((i, j), (j, i)):
+        if len(title[short]) < self.min_title_length:
+          continue
+        if (title[full] + ' ').startswith(title[short] + ' ') \
+           or truncated[short] and title[short] in title[full]:
+          match[k] = True
+    return match
+
+  def _author_similarity(self, pairs: np.ndarray,
+                         authors: np.ndarray) -> np.ndarray:
+    '''
+    Returns the share of the surnames of the shorter author list of every
+    pair that the other list contains, NaN if a list is empty.
+    '''
+    similarity: np.ndarray = np.full(len(pairs), np.nan)
+    for k, (i, j) in enumerate(pairs):
+      if authors[i] and authors[j]:
+        similarity[k] = len(authors[i] & authors[j]) \
+          / min(len(authors[i]), len(authors[j]))
+    return similarity
+
+  def _jaccard(self, pairs: np.ndarray, shingles: np.ndarray,
+               offsets: np.ndarray) -> np.ndarray:
+    '''Returns the exact Jaccard similarity of the shingle sets of pairs.'''
+    sets: dict = {}
+    for i in np.unique(pairs):
+      sets[i] = np.unique(shingles[offsets[i]:offsets[i + 1]])
+    similarity: np.ndarray = np.zeros(len(pairs))
+    for k, (i, j) in enumerate(pairs):
+      union: int = len(np.union1d(sets[i], sets[j]))
+      if union > 0:
+        similarity[k] = len(np.intersect1d(sets[i], sets[j],
+                                           assume_unique=True)) / union
+    return similarity
+
+
+class NearDuplicateResult:
+  '''
+  Class that holds the decisions of a `NearDuplicateDetector`.
+
+  Attributes
+  ----------
+  drop: np.ndarray
+    True for every record that is a near-duplicate of a kept record.
+  pairs: pd.DataFrame
+    All scored candidate pairs with their title, text and author similarity,
+    score and whether they are duplicates.
+  clusters: pd.DataFrame
+    One row per record in a cluster of near-duplicates with the cluster
+    number, its position in the records, source, source row and title,
+    whether it is kept, and its scores and author similarity compared to the
+    kept record of the cluster.
+  '''
+
+  def __init__(self, detector: NearDuplicateDetector, records: pd.DataFrame,
+               duplicates: pd.DataFrame, pairs: pd.DataFrame,
+               features: dict):
+    self.pairs: pd.DataFrame = pairs
+    cluster: np.ndarray = self._components(
+      len(records), duplicates[['record_a', 'record_b']].to_numpy())
+    members: np.ndarray = np.flatnonzero(cluster >= 0)
+    # the member of the database with the highest priority is kept
+    ranks: np.ndarray = source_ranks(records['source'],
+                                     detector.priority)[members]
+    order: np.ndarray = members[np.lexsort((members, ranks))]
+    kept_of: dict = {}
+    for record in order:
+      kept_of.setdefault(cluster[record], record)
+    kept: np.ndarray = np.array([kept_of[cluster[m]] for m in members],
+                                dtype=np.int64)
+    self.drop: np.ndarray = np.zeros(len(records), dtype=bool)
+    self.drop[members[members != kept]] = True
+    # compare every member with the kept record of its cluster
+    compared: np.ndarray = np.column_stack((members, kept))
+    scores: pd.DataFrame = detector._score(compared, features)
+    self.clusters: pd.DataFrame = pd.DataFrame({
+      'cluster': pd.factorize(cluster[members], sort=True)[0],
+      'record': members,
+      'source': records['source'].to_numpy()[members],
+      'source_row': records['source_row'].to_numpy()[members],
+      'title': records['title'].to_numpy()[members],
+      'kept': members == kept,
+      'title_similarity': scores['title_similarity'].to_numpy(),
+      'text_similarity': scores['text_similarity'].to_numpy(),
+      'score': scores['score'].to_numpy(),
+      'author_similarity': scores['author_similarity'].to_numpy()})
+    self.clusters = self.clusters.sort_values(
+      ['cluster', 'kept'], ascending=[True, False], ignore_index=True)
+
+  def summary(self) -> pd.DataFrame:
+    '''
+    Returns the number of dropped records per source (rows) and the source
+    of the record kept instead (columns).
+    '''
+    kept: pd.Series = self.clusters[self.clusters['kept']] \
+      .set_index('cluster')['source']
+    dropped: pd.DataFrame = self.clusters[~self.clusters['kept']]
+    return pd.crosstab(dropped['source'], dropped['cluster'].map(kept)
+                       .rename('kept_source'))
+
+  def _components(self, n: int, edges: np.ndarray) -> np.ndarray:
+    '''Returns the connected component of every record, -1 if it has none.'''
+    parent: np.ndarray = np.arange(n)
+
+    def find(i: int) -> int:
+      while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+      return i
+
+    for i, j in edges:
+      parent[find(i)] = find(j)
+    roots: np.ndarray = np.array([find(i) for i in range(n)])
+    component: np.ndarray = np.full(n, -1)
+    linked: np.ndarray = np.zeros(n, dtype=bool)
+    linked[edges.ravel()] = True
+    component[linked] = roots[linked]
+    return component
@@ -0,0 +1,195 @@
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from .cache import StageCache
+from .sources import RecordSet
+from .stages import default_stages
+
+
+class ScreeningResult:
+  '''
+  Class that holds the outcome of a `ScreeningPipeline` run, i.e. for every
+  unified record the first stage that rejected it.
+
+  Attributes
+  ----------
+  record_set: RecordSet
+    The screened records.
+  stages: list
+    The stages of the pipeline in order.
+  rejected_by: pd.Series
+    Categorical of the name of the first stage that rejected each record,
+    NaN for records that passed all stages. Aligned with the records.
+  fingerprints: list
+    The `StageCache` key of every stage if the pipeline ran with a cache,
+    else None. Used by `export` to skip stages whose files are up to date.
+
+  Methods
+  -------
+  kept() -> pd.DataFrame
+    Returns the unified records that passed all stages.
+  summary() -> pd.DataFrame
+    Returns the number of records removed per source and stage.
+  export(directory: str, stages: list) -> None
+    Writes the in and out files of each stage like the notebook did.
+  '''
+
+  def __init__(self, record_set: RecordSet, stages: list,
+               rejected_by: pd.Series, fingerprints: list = None):
+    self.logger = logging.getLogger('screening_logger')
+    self.record_set: RecordSet = record_set
+    self.stages: list = stages
+    self.rejected_by: pd.Series = rejected_by
+    self.fingerprints: list = fingerprints
+
+  def kept(self) -> pd.DataFrame:
+    '''Returns the unified records that passed all stages.'''
+    return self.record_set.records[self.rejected_by.isna()]
+
+  def summary(self) -> pd.DataFrame:
+    '''
+    Returns a DataFrame with one row per source and one column per stage
+    holding the number of records removed by that stage, plus the number of
+    loaded and kept records.
+    '''
+    records: pd.DataFrame = self.record_set.records
+    summary: pd.DataFrame = pd.crosstab(records['source'], self.rejected_by,
+                                        dropna=False)
+    summary = summary.reindex(columns=[stage.name for stage in self.stages],
+                              fill_value=0)
+    summary.insert(0, 'loaded', records.groupby('source', observed=False)
+                   .size())
+    summary['kept'] = summary['loaded'] - summary.iloc[:, 1:].sum(axis=1)
+    summary.columns.name = None
+    return summary
+
+  def export(self, directory: str = './data', stages: list = None) -> None:
+    '''
+    Writes the records entering each stage that survive it to
+    "filter{k}_{Name}/{source}_filter_{short}_in.{ext}" and the ones it
+    removes to "..._out.{ext}" inside directory, in the format of the source.
+    Only the given stage names are written (default: all stages). With
+    fingerprints, a stage is skipped if its directory was written for the
+    same fingerprint, which is stored in its file ".fingerprint".
+    '''
+    records: pd.DataFrame = self.record_set.records
+    # index of the stage that removed each record, len(stages) if it was kept
+    removed_at: np.ndarray = self.rejected_by.cat.codes.to_numpy()
+    removed_at = np.where(removed_at < 0, len(self.stages), removed_at)
+    for k, stage in enumerate(self.stages):
+      if stages is not None and stage.name not in stages:
+        continue
+      stage_dir: str = os.path.join(directory, f'filter{k + 1}_{stage.name}')
+      marker: str = os.path.join(stage_dir, '.fingerprint')
+      if self.fingerprints is not None and os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as file:
+          if file.read() == self.fingerprints[k]:
+            self.logger.info(f'Skipped stage {stage.name}, {stage_dir} is '
+                             f'up to date')
+            continue
+      os.makedirs(stage_dir, exist_ok=True)
+      for mapping in self.record_set.sources:
+        of_source: np.ndarray = (records['source'] == mapping.name).to_numpy()
+        raw: pd.DataFrame = self.record_set.raw[mapping.name]
+        for suffix, selected in (('in', removed_at > k),
+                                 ('out', removed_at == k)):
+          rows: np.ndarray = records['source_row'].to_numpy()[
+            of_source & selected]
+          file_name: str = (f'{mapping.name}_filter_{stage.short}_{suffix}.'
+                            f'{mapping.file_format}')
+          mapping.write(raw.iloc[rows], os.path.join(stage_dir, file_name))
+      if self.fingerprints is not None:
+        with open(marker, 'w', encoding='utf-8') as file:
+          file.write(self.fingerprints[k])
+      self.logger.info(f'Exported stage {stage.name} to {stage_dir}')
+
+
+class ScreeningPipeline:
+  '''
+  Class that runs a chain of screening stages over the records of all
+  databases at once instead of filtering every database separately.
+
+  Each stage computes its mask over all records in a single vectorized call.
+  Records are never copied or removed between stages, the pipeline only
+  keeps track of which records are still alive, so every record is tagged
+  with the first stage that rejected it. The files of the notebook are
+  written on request only, see `ScreeningResult.export`.
+
+  With a `StageCache`, the mask of every stage is looked up under the
+  fingerprint of the records, the stage and all stages before it, and the
+  stage only runs if it is not cached. Changing a parameter therefore only
+  runs the stage it belongs to and the ones after it. The details of every
+  run (e.g. `ReviewStage.hits`) are cached with the mask, so stages read
+  from the cache get them back as if they had run.
+
+  Attributes
+  ----------
+  stages: list
+    The `Stage` objects in the order they are applied.
+  cache: StageCache
+    Optional cache of the stage masks.
+  report: pd.DataFrame
+    One row per stage of the last run with its fingerprint (None without
+    cache), whether it was read from the cache, the number of removed
+    records and the seconds it took.
+
+  Methods
+  -------
+  run(record_set: RecordSet) -> ScreeningResult
+    Applies all stages to the records.
+
+  Examples
+  --------
+  ```py
+  record_set = RecordSet.load('./data/raw')
+  result = ScreeningPipeline().run(record_set)
+  print(result.summary())
+  result.export('./data', stages=['DoiDeduplication'])
+  ```
+  '''
+
+  def __init__(self, stages: list = None, cache: StageCache = None):
+    self.logger = logging.getLogger('screening_logger')
+    self.stages: list = stages if stages is not None else default_stages()
+    self.cache: StageCache = cache
+    self.report: pd.DataFrame = None
+    names: list = [stage.name for stage in self.stages]
+    if len(set(names)) != len(names):
+      raise ValueError(f'Stage names must be unique, got {names}')
+
+  def run(self, record_set: RecordSet) -> ScreeningResult:
+    '''Applies all stages to the records of record_set.'''
+    records: pd.DataFrame = record_set.records
+    alive: np.ndarray = np.ones(len(records), dtype=bool)
+    rejected_by: np.ndarray = np.full(len(records), None, dtype=object)
+    key: str = self.cache.records_key(records) if self.cache else None
+    rows: list = []
+    for stage in self.stages:
+      start: float = time.perf_counter()
+      passed: np.ndarray = None
+      if self.cache is not None:
+        key = self.cache.stage_key(key, stage)
+        passed = self.cache.get(key)
+      cached: bool = passed is not None
+      if cached:
+        stage.restore(self.cache.get_details(key))
+      else:
+        passed = np.asarray(stage.mask(records, alive), dtype=bool)
+        if self.cache is not None:
+          self.cache.put(key, passed, stage.details())
+      rejected: np.ndarray = alive & ~passed
+      rejected_by[rejected] = stage.name
+      alive &= passed
+      seconds: float = time.perf_counter() - start
+      rows.append((stage.name, key, cached, rejected.sum(), seconds))
+      self.logger.info(f'{stage.name}: removed {rejected.sum()} of '
+                       f'{rejected.sum() + alive.sum()} entries in '
+                       f'{seconds:.3f}s' + (' (cached)' if cached else ''))
+    self.report = pd.DataFrame(rows, columns=['stage', 'fingerprint', 'cached',
+                                              'removed', 'seconds'])
+    return ScreeningResult(record_set, self.stages, pd.Series(
+      pd.Categorical(rejected_by, categories=[s.name for s in self.stages]),
+      index=records.index, name='rejected_by'),
+      self.report['fingerprint'].tolist() if self.cache else None)
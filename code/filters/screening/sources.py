@@ -0,0 +1,239 @@
+import copy
+import logging
+import os
+import pandas as pd
+from .formats import BibFile, RisFile
+
+
+class SourceMapping:
+  '''
+  Class that describes how the export of one literature database is read and
+  how its columns map onto the unified record schema of the screening.
+
+  Unified records have the columns "source", "source_row" (position of the
+  record in the loaded export), "title", "abstract", "authors", "year",
+  "language", "entry_type" and "doi". A unified column whose source column is
+  missing or empty gets the default of the mapping, or stays empty.
+
+  Attributes
+  ----------
+  name: str
+    Short name of the database as used in the exported file names, e.g. "acm".
+  label: str
+    Full name of the database for reports, e.g. "ACM Digital Library".
+  file_format: str
+    Format of the export, one of "bib", "ris" and "csv".
+  files: list
+    File names of the export inside the raw data directory. Multiple files
+    are concatenated in order.
+  columns: dict
+    Maps unified column names to the column names of the export.
+  defaults: dict
+    Maps unified column names to the value used for missing values.
+  join: tuple
+    Optional (file name, key, columns) of a CSV file whose columns replace
+    the ones of the export, matched on the key column.
+
+  Methods
+  -------
+  load(directory: str) -> pd.DataFrame
+    Reads the export from the raw data directory.
+  to_unified(df: pd.DataFrame) -> pd.DataFrame
+    Maps a loaded export onto the unified record schema.
+  write(df: pd.DataFrame, file_path: str) -> None
+    Writes records of the export back in its own format.
+  '''
+
+  unified_columns: list = ['source', 'source_row', 'title', 'abstract',
+                           'authors', 'year', 'language', 'entry_type', 'doi']
+
+  def __init__(self, name: str, label: str, file_format: str, files: list,
+               columns: dict, defaults: dict = None, join: tuple = None):
+    self.logger = logging.getLogger('screening_logger')
+    self.name: str = name
+    self.label: str = label
+    self.file_format: str = file_format
+    self.files: list = files
+    self.columns: dict = columns
+    self.defaults: dict = defaults or {}
+    self.join: tuple = join
+
+  def load(self, directory: str) -> pd.DataFrame:
+    '''
+    Reads all files of the export from directory and returns them as one
+    DataFrame with a fresh index.
+    '''
+    frames: list = [self._read(os.path.join(directory, file_name))
+                    for file_name in self.files]
+    df: pd.DataFrame = pd.concat(frames, axis=0, ignore_index=True)
+    if self.join is not None:
+      file_name, key, columns = self.join
+      extra: pd.DataFrame = pd.read_csv(os.path.join(directory, file_name))
+      extra = extra.drop_duplicates(subset=key).set_index(key)
+      for column in columns:
+        df[column] = df[key].map(extra[column])
+    self.logger.info(f'Loaded {len(df)} entries from {self.label}')
+    return df
+
+  def _read(self, file_path: str) -> pd.DataFrame:
+    if self.file_format == 'bib':
+      return BibFile().read(file_path)
+    if self.file_format == 'ris':
+      return RisFile().read(file_path)
+    return pd.read_csv(file_path)
+
+  def to_unified(self, df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Returns the records of a loaded export in the unified record schema. The
+    year is the first four digit number of the year column, authors given as
+    lists are joined by "; ".
+    '''
+    unified: pd.DataFrame = pd.DataFrame(index=range(len(df)))
+    unified['source'] = self.name
+    unified['source_row'] = range(len(df))
+    for column in self.unified_columns[2:]:
+      source_column: str = self.columns.get(column)
+      if source_column is not None and source_column in df.columns:
+        values: pd.Series = df[source_column].reset_index(drop=True)
+      else:
+        values: pd.Series = pd.Series([None] * len(df), dtype=object)
+      if column == 'authors':
+        values = values.map(lambda v: '; '.join(map(str, v))
+                            if isinstance(v, list) else v)
+      if column == 'year':
+        values = pd.to_numeric(values.astype(str).str.extract(r'(\d{4})')[0],
+                               errors='coerce').astype('Int32')
+      else:
+        values = values.astype(object).where(values.notna()
+                                             & (values.astype(str) != ''),
+                                             self.defaults.get(column))
+      unified[column] = values
+    return unified
+
+  def write(self, df: pd.DataFrame, file_path: str) -> None:
+    '''
+    Writes records of this export (in the columns of `load`) to file_path in
+    the format of the export, like the notebook exports did.
+    '''
+    if self.file_format == 'bib':
+      # the notebook wrote missing values as "nan", keep the files comparable
+      BibFile().write(df, file_path, na_rep='nan')
+    elif self.file_format == 'ris':
+      RisFile().write(df, file_path)
+    else:
+      df.to_csv(file_path, index=False)
+
+
+# the databases of the search strategy in the priority order of the DOI
+# deduplication, the first database wins
+DEFAULT_SOURCES: list = [
+  SourceMapping('pubmed', 'PubMed & MEDLINE', 'csv', ['pubmed_base.csv'],
+                {'title': 'Title', 'abstract': 'Abstract',
+                 'authors': 'Authors', 'year': 'Publication Year',
+                 'doi': 'DOI'},
+                defaults={'language': 'English'},
+                join=('pd2xl.csv', 'PMID', ['Abstract'])),
+  SourceMapping('acm', 'ACM Digital Library', 'bib',
+                ['acm_digitallibrary.bib'],
+                {'title': 'title', 'abstract': 'abstract', 'authors': 'author',
+                 'year': 'year', 'entry_type': 'ENTRYTYPE', 'doi': 'doi'},
+                defaults={'language': 'English'}),
+  SourceMapping('ieee', 'IEEE Xplore', 'ris', ['ieee_xplore_fromDOIs.ris'],
+                {'title': 'title', 'abstract': 'abstract',
+                 'authors': 'authors', 'year': 'year', 'doi': 'doi'},
+                defaults={'language': 'English'}),
+  SourceMapping('wos', 'Web of Science CORE', 'bib',
+                ['webofscience_0001-1000.bib', 'webofscience_1001-1807.bib'],
+                {'title': 'title', 'abstract': 'abstract', 'authors': 'author',
+                 'year': 'year', 'language': 'language',
+                 'entry_type': 'ENTRYTYPE', 'doi': 'doi'}),
+  SourceMapping('apa', 'APA PsycInfo', 'ris', ['apa_psycinfo.ris'],
+                {'title': 'primary_title', 'abstract': 'notes_abstract',
+                 'authors': 'first_authors', 'year': 'publication_year',
+                 'language': 'language', 'doi': 'doi'},
+                # many matches are not labeled, they are assumed English
+                defaults={'language': 'English'}),
+  SourceMapping('gs', 'Google Scholar', 'csv', ['googlescholar_appended.csv'],
+                {'title': 'Title', 'abstract': 'Abstract',
+                 'authors': 'Authors', 'year': 'Year', 'doi': 'DOI'},
+                defaults={'language': 'English'}),
+]
+
+
+class RecordSet:
+  '''
+  Class that holds the loaded exports of all databases together with their
+  records in the unified schema, concatenated in the order of the sources.
+
+  Attributes
+  ----------
+  sources: list
+    The `SourceMapping` of every loaded database, in priority order.
+  raw: dict
+    Maps each source name to its loaded export.
+  records: pd.DataFrame
+    The unified records of all sources, with a fresh index.
+
+  Methods
+  -------
+  load(directory: str, sources: list) -> RecordSet
+    Loads the exports of all sources from the raw data directory.
+  available(directory: str, sources: list) -> list
+    Returns the sources whose exports exist in the raw data directory.
+  source(name: str) -> SourceMapping
+    Returns the mapping of a source by name.
+
+  Examples
+  --------
+  ```py
+  record_set = RecordSet.load('./data/raw')
+  print(record_set.records.groupby('source').size())
+  ```
+  '''
+
+  def __init__(self, sources: list, raw: dict):
+    self.sources: list = sources
+    self.raw: dict = raw
+    frames: list = [mapping.to_unified(raw[mapping.name])
+                    for mapping in sources]
+    self.records: pd.DataFrame = pd.concat(frames, axis=0, ignore_index=True)
+    self.records['source'] = pd.Categorical(
+      self.records['source'], categories=[m.name for m in sources])
+
+  @classmethod
+  def load(cls, directory: str = './data/raw',
+           sources: list = None) -> 'RecordSet':
+    '''
+    Loads the exports of all sources (default: DEFAULT_SOURCES) that exist
+    in the directory, see `available`.
+    '''
+    sources = cls.available(directory, sources)
+    return cls(sources, {mapping.name: mapping.load(directory)
+                         for mapping in sources})
+
+  @staticmethod
+  def available(directory: str = './data/raw', sources: list = None) -> list:
+    '''
+    Returns the sources (default: DEFAULT_SOURCES) whose export files exist
+    in the directory. Sources with a missing export are skipped with a
+    warning, a missing join file (e.g. the PubMed abstracts) is left out of
+    a copy of the mapping.
+    '''
+    logger = logging.getLogger('screening_logger')
+    available: list = []
+    for mapping in sources if sources is not None else DEFAULT_SOURCES:
+      if not all(os.path.exists(os.path.join(directory, file_name))
+                 for file_name in mapping.files):
+        logger.warning(f'Skipping {mapping.label}, its export is missing')
+        continue
+      if mapping.join is not None and not os.path.exists(
+         os.path.join(directory, mapping.join[0])):
+        logger.warning(f'Loading {mapping.label} without '
+                       f'{mapping.join[0]}, the file is missing')
+        mapping = copy.copy(mapping)
+        mapping.join = None
+      available.append(mapping)
+    return available
+
+  def source(self, name: str) -> SourceMapping:
+    return next(mapping for mapping in self.sources if mapping.name == name)
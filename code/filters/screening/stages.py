@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+from .dedup import DoiDeduplicator, DeduplicationResult
+from .keywords import KeywordIndex
+from .near_duplicates import NearDuplicateDetector, NearDuplicateResult
+
+
+class Stage:
+  '''
+  Base class of a screening stage. A stage decides for every unified record
+  whether it passes, all at once over the records of all sources.
+
+  Attributes
+  ----------
+  name: str
+    Name of the stage as used in the export directories, e.g. "Date".
+  short: str
+    Short name of the stage as used in the export file names, e.g. "date".
+
+  Methods
+  -------
+  mask(records: pd.DataFrame, alive: np.ndarray) -> np.ndarray
+    Returns a boolean array that is true for every record that passes.
+  params() -> dict
+    Returns the parameters of the stage.
+  details() -> object
+    Returns the details of the last run, which are cached with the mask.
+  restore(details: object) -> None
+    Restores the details of a cached run.
+  '''
+
+  name: str = 'Stage'
+  short: str = 'stage'
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    '''
+    Returns a boolean array that is true for every record that passes this
+    stage. alive is true for every record that passed all previous stages,
+    stages that compare records with each other must only consider those.
+    '''
+    raise NotImplementedError
+
+  def params(self) -> dict:
+    '''Returns the parameters of the stage, e.g. for reports.'''
+    return {}
+
+  def details(self) -> object:
+    '''
+    Returns the picklable details of the last run of `mask`, e.g. which
+    keyword matched which record, or None if the stage keeps none.
+    '''
+    return None
+
+  def restore(self, details: object) -> None:
+    '''Restores the details of a run that was read from a cache.'''
+
+  def __repr__(self) -> str:
+    params: str = ', '.join(f'{k}={v!r}' for k, v in self.params().items())
+    return f'{type(self).__name__}({params})'
+
+
+class DateStage(Stage):
+  '''
+  Stage that removes publications released before the cutoff year, as no
+  smartphones were available before 2009. Records without a year are kept.
+  '''
+
+  name: str = 'Date'
+  short: str = 'date'
+
+  def __init__(self, cutoff_year: int = 2009):
+    self.cutoff_year: int = cutoff_year
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    year: pd.Series = records['year']
+    return (year.isna() | (year >= self.cutoff_year)).to_numpy(dtype=bool)
+
+  def params(self) -> dict:
+    return {'cutoff_year': self.cutoff_year}
+
+
+class LanguageStage(Stage):
+  '''
+  Stage that removes publications that their database labels as written in
+  another language. Databases without language metadata label every record
+  with the default of their `SourceMapping`.
+  '''
+
+  name: str = 'Language'
+  short: str = 'lang'
+
+  def __init__(self, languages: list = None):
+    self.languages: list = languages or ['English']
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    return records['language'].isin(self.languages).to_numpy(dtype=bool)
+
+  def params(self) -> dict:
+    return {'languages': self.languages}
+
+
+class PublicationTypeStage(Stage):
+  '''
+  Stage that removes collections of papers such as proceedings or books from
+  databases that provide an entry type. Records without entry type are kept.
+  '''
+
+  name: str = 'PublicationType'
+  short: str = 'pubtype'
+
+  def __init__(self, entry_types: list = None):
+    self.entry_types: list = entry_types or ['inproceedings', 'article',
+                                             'inbook', 'incollection']
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    entry_type: pd.Series = records['entry_type']
+    return (entry_type.isna()
+            | entry_type.isin(self.entry_types)).to_numpy(dtype=bool)
+
+  def params(self) -> dict:
+    return {'entry_types': self.entry_types}
+
+
+class ReviewStage(Stage):
+  '''
+  Stage that removes publications that resemble any type of review, i.e.
+  whose title contains one of the review keywords (case-insensitive). The
+  keywords are compiled once into a `KeywordIndex`, so further fields such
+  as the abstract can be screened at little extra cost. Which keyword was
+  found where in the last run is available as `hits`.
+  '''
+
+  name: str = 'Reviews'
+  short: str = 'rev'
+  default_keywords: list = ['Meta-Analysis', 'Systematic Literature Review',
+                            'Systematic Review', 'Literature Review',
+                            'Scoping Review', 'Rapid Review', 'Umbrella Review',
+                            'Narrative Review', 'Mapping Review',
+                            'Critical Review', 'Protocol', 'Meta-Review',
+                            'Analytic Review', 'Review and Analysis',
+                            'Analysis and Review']
+
+  def __init__(self, keywords: list = None, fields: list = None):
+    self.keywords: list = keywords or list(self.default_keywords)
+    self.fields: list = fields or ['title']
+    # like the notebook, keywords also match inside words ("Protocols")
+    self.index: KeywordIndex = KeywordIndex(self.keywords, whole_words=False)
+    self.hits: pd.DataFrame = None
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    self.hits = self.index.scan(records, self.fields)
+    matches: np.ndarray = np.zeros(len(records), dtype=bool)
+    matches[self.hits['row'].to_numpy()] = True
+    return ~matches
+
+  def params(self) -> dict:
+    return {'keywords': self.keywords, 'fields': self.fields}
+
+  def details(self) -> pd.DataFrame:
+    return self.hits
+
+  def restore(self, details: pd.DataFrame) -> None:
+    self.hits = details
+
+
+class DoiDeduplicationStage(Stage):
+  '''
+  Stage that keeps only the first of all records with an identical DOI, in
+  the priority order of the sources (PubMed, ACM, IEEE, WoS, APA, Google
+  Scholar by default) and of the records within each source. The decisions
+  of the last run, including which record was kept for each removed one, are
+  available as `result`.
+  '''
+
+  name: str = 'DoiDeduplication'
+  short: str = 'dedup'
+
+  def __init__(self, priority: list = None):
+    self.deduplicator: DoiDeduplicator = DoiDeduplicator(priority)
+    self.result: DeduplicationResult = None
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    self.result = self.deduplicator.deduplicate(records, alive)
+    return ~self.result.drop
+
+  def params(self) -> dict:
+    return {'priority': self.deduplicator.priority,
+            'min_length': self.deduplicator.min_length}
+
+  def details(self) -> DeduplicationResult:
+    return self.result
+
+  def restore(self, details: DeduplicationResult) -> None:
+    self.result = details
+
+
+class NearDuplicateStage(Stage):
+  '''
+  Stage that replaces the manual deduplication with Rayyan. It removes
+  publications whose title and abstract are almost identical to those of a
+  record of a database with higher priority, see `NearDuplicateDetector`.
+  The clusters of the last run, with the similarity of every removed record
+  to the kept one, are available as `result.clusters`.
+  '''
+
+  name: str = 'RayyanDeduplication'
+  short: str = 'neardup'
+
+  def __init__(self, threshold: float = 0.75, priority: list = None):
+    self.detector: NearDuplicateDetector = NearDuplicateDetector(threshold,
+                                                                 priority)
+    self.result: NearDuplicateResult = None
+
+  def mask(self, records: pd.DataFrame, alive: np.ndarray) -> np.ndarray:
+    self.result = self.detector.detect(records, alive)
+    return ~self.result.drop
+
+  def params(self) -> dict:
+    # every setting that changes the decisions, the cache keys depend on them
+    detector: NearDuplicateDetector = self.detector
+    return {'threshold': detector.threshold, 'priority': detector.priority,
+            'min_abstract_words': detector.min_abstract_words,
+            'title_threshold': detector.title_threshold,
+            'min_title_length': detector.min_title_length,
+            'min_author_similarity': detector.min_author_similarity,
+            'num_perm': detector.index.num_perm, 'bands': detector.index.bands,
+            'max_bucket': detector.index.max_bucket,
+            'seed': detector.index.seed}
+
+  def details(self) -> NearDuplicateResult:
+    return self.result
+
+  def restore(self, details: NearDuplicateResult) -> None:
+    self.result = details
+
+
+# the stages of the notebook in their original order and configuration,
+# followed by the automated Rayyan deduplication
+def default_stages(cutoff_year: int = 2009) -> list:
+  '''Returns the six pre-screening stages of the search strategy.'''
+  return [DateStage(cutoff_year), LanguageStage(), PublicationTypeStage(),
+          ReviewStage(), DoiDeduplicationStage(), NearDuplicateStage()]
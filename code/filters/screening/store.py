@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from .pipeline import ScreeningResult
+from .sources import DEFAULT_SOURCES, RecordSet
+from .stages import Stage
+
+
+class StageStore:
+  '''
+  Class that persists a `ScreeningResult` as a columnar snapshot instead of
+  one in and one out file per stage and database.
+
+  Every record is stored once in "records.parquet", together with a
+  membership bitmap: bit k is set if the record entered stage k and bit
+  len(stages) if it passed all stages. The exports of the databases are
+  stored once per source in "raw/{source}.parquet", the stages and sources
+  in "store.json". Loading reads only the requested columns and filters the
+  rows on the bitmap while scanning, so counts and plots never parse the
+  BibTeX, RIS or CSV files. The files of the notebook can still be written
+  on demand with `export`.
+
+  Attributes
+  ----------
+  directory: str
+    Directory of the store.
+
+  Methods
+  -------
+  save(result: ScreeningResult) -> None
+    Writes the result to the store, replacing its previous content.
+  stages() -> list[str]
+    Returns the names of the stored stages in order.
+  load(columns: list, stage: str, side: str, sources: list) -> pd.DataFrame
+    Returns the unified records of a stage.
+  summary() -> pd.DataFrame
+    Returns the number of records removed per source and stage.
+  result(sources: list) -> ScreeningResult
+    Rebuilds the screening result including the database exports.
+  export(directory: str, stages: list) -> None
+    Writes the in and out files of the stages like the notebook did.
+
+  Examples
+  --------
+  ```py
+  StageStore('./data/store').save(ScreeningPipeline().run(record_set))
+  store = StageStore('./data/store')
+  titles = store.load(['source', 'title'], stage='Reviews', side='out')
+  store.export('./data', stages=['DoiDeduplication'])
+  ```
+  '''
+
+  def __init__(self, directory: str = './data/store'):
+    self.logger = logging.getLogger('screening_logger')
+    self.directory: str = directory
+
+  def _path(self, *parts: str) -> str:
+    return os.path.join(self.directory, *parts)
+
+  def _meta(self) -> dict:
+    with open(self._path('store.json'), 'r', encoding='utf-8') as file:
+      return json.load(file)
+
+  def save(self, result: ScreeningResult) -> None:
+    '''Writes the result to the store, replacing its previous content.'''
+    os.makedirs(self._path('raw'), exist_ok=True)
+    n: int = len(result.stages)
+    if n > 31:
+      raise ValueError(f'The bitmap holds at most 31 stages, got {n}')
+    removed_at: np.ndarray = result.rejected_by.cat.codes.to_numpy()
+    removed_at = np.where(removed_at < 0, n, removed_at).astype(np.uint32)
+    records: pd.DataFrame = result.record_set.records.copy()
+    # bits 0..removed_at: the stages the record entered (and kept if all)
+    records['membership'] = (np.uint32(2) << removed_at) - np.uint32(1)
+    records.to_parquet(self._path('records.parquet'), index=False,
+                       compression='zstd')
+    json_columns: dict = {}
+    for mapping in result.record_set.sources:
+      raw: pd.DataFrame = result.record_set.raw[mapping.name]
+      json_columns[mapping.name] = [
+        column for column in raw.columns
+        if raw[column].map(lambda v: isinstance(v, dict)).any()]
+      raw = raw.copy()
+      for column in json_columns[mapping.name]:
+        raw[column] = raw[column].map(
+          lambda v: json.dumps(v) if isinstance(v, dict) else None)
+      raw.to_parquet(self._path('raw', f'{mapping.name}.parquet'),
+                     index=False, compression='zstd')
+    meta: dict = {
+      'stages': [{'name': stage.name, 'short': stage.short,
+                  'params': repr(stage)} for stage in result.stages],
+      'sources': [mapping.name for mapping in result.record_set.sources],
+      'json_columns': json_columns}
+    with open(self._path('store.json'), 'w', encoding='utf-8') as file:
+      json.dump(meta, file, indent=2)
+    self.logger.info(f'Saved {len(records)} records and {n} stages to '
+                     f'{self.directory}')
+
+  def stages(self) -> list[str]:
+    '''Returns the names of the stored stages in order.'''
+    return [stage['name'] for stage in self._meta()['stages']]
+
+  def load(self, columns: list = None, stage: str = None, side: str = 'in',
+           sources: list = None) -> pd.DataFrame:
+    '''
+    Returns the unified records with the given columns (default: all).
+
+    Parameters
+    ----------
+    columns: list
+      Columns to read, only these are loaded from disk.
+    stage: str
+      If given, only the records of this stage are returned: the ones that
+      passed it (side "in", like the "_in" files of the notebook) or the
+      ones it removed (side "out").
+    side: str
+      "in" or "out", see stage.
+    sources: list
+      If given, only the records of these sources are returned.
+    '''
+    dataset: ds.Dataset = ds.dataset(self._path('records.parquet'))
+    condition: ds.Expression = None
+    if stage is not None:
+      k: int = self.stages().index(stage)
+      membership: ds.Expression = ds.field('membership')
+      passed: ds.Expression = pc.bit_wise_and(
+        membership, pa.scalar(1 << (k + 1), pa.uint32())) != 0
+      if side == 'in':
+        condition = passed
+      elif side == 'out':
+        entered: ds.Expression = pc.bit_wise_and(
+          membership, pa.scalar(1 << k, pa.uint32())) != 0
+        condition = entered & ~passed
+      else:
+        raise ValueError(f'side must be "in" or "out", got "{side}"')
+    if sources is not None:
+      of_sources: ds.Expression = ds.field('source').isin(sources)
+      condition = of_sources if condition is None else condition & of_sources
+    table: pa.Table = dataset.to_table(columns=columns, filter=condition)
+    return table.to_pandas()
+
+  def summary(self) -> pd.DataFrame:
+    '''
+    Returns the table of `ScreeningResult.summary` computed from the source
+    and membership columns only.
+    '''
+    names: list = self.stages()
+    records: pd.DataFrame = self.load(['source', 'membership'])
+    summary: pd.DataFrame = pd.crosstab(
+      records['source'], self._rejected_by(records['membership'], names),
+      dropna=False)
+    summary = summary.reindex(columns=names, fill_value=0)
+    summary.insert(0, 'loaded', records.groupby('source', observed=False)
+                   .size())
+    summary['kept'] = summary['loaded'] - summary.iloc[:, 1:].sum(axis=1)
+    summary.columns.name = None
+    return summary
+
+  def result(self, sources: list = None) -> ScreeningResult:
+    '''
+    Rebuilds the screening result from the store, with the source mappings
+    of the stored sources taken from sources (default: DEFAULT_SOURCES).
+    The stages only carry their names and short names.
+    '''
+    meta: dict = self._meta()
+    mappings: dict = {mapping.name: mapping for mapping
+                      in (sources if sources is not None else DEFAULT_SOURCES)}
+    stored: list = [mappings[name] for name in meta['sources']]
+    raw: dict = {mapping.name: self._load_raw(
+      mapping.name, meta['json_columns'].get(mapping.name, []))
+      for mapping in stored}
+    record_set: RecordSet = RecordSet(stored, raw)
+    stages: list = []
+    for stored_stage in meta['stages']:
+      stage: Stage = Stage()
+      stage.name, stage.short = stored_stage['name'], stored_stage['short']
+      stages.append(stage)
+    rejected_by: pd.Series = pd.Series(self._rejected_by(
+      self.load(['membership'])['membership'],
+      [stage.name for stage in stages]))
+    return ScreeningResult(record_set, stages, rejected_by)
+
+  def export(self, directory: str = './data', stages: list = None,
+             sources: list = None) -> None:
+    '''
+    Writes the in and out files of the given stage names (default: all) to
+    directory, see `ScreeningResult.export`.
+    '''
+    self.result(sources).export(directory, stages)
+
+  def _rejected_by(self, membership: pd.Series,
+                   names: list) -> pd.Categorical:
+    '''Returns the name of the stage that removed each record, NaN if none.'''
+    # bits 0..k are set for a record removed by stage k, all for kept ones
+    removed_at: np.ndarray = np.log2(
+      membership.to_numpy().astype(np.float64) + 1).astype(int) - 1
+    return pd.Categorical.from_codes(
+      np.where(removed_at < len(names), removed_at, -1), categories=names)
+
+  def _load_raw(self, name: str, json_columns: list) -> pd.DataFrame:
+    '''Returns the stored export of a source with lists and dicts restored.'''
+    raw: pd.DataFrame = pd.read_parquet(self._path('raw', f'{name}.parquet'))
+    for column in raw.columns:
+      if column in json_columns:
+        raw[column] = raw[column].map(
+          lambda v: json.loads(v) if isinstance(v, str) else np.nan)
+      elif raw[column].dtype == object:
+        raw[column] = raw[column].map(
+          lambda v: v.tolist() if isinstance(v, np.ndarray)
+          else np.nan if v is None else v)
+    return raw
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from screening.dedup import DoiDeduplicator
+
+SOURCES: list = ['pubmed', 'acm', 'gs']
+
+
+def records(sources: list, dois: list) -> pd.DataFrame:
+  return pd.DataFrame({
+    'source': pd.Categorical(sources, categories=SOURCES),
+    'source_row': [sources[:i].count(source)
+                   for i, source in enumerate(sources)],
+    'doi': dois})
+
+
+@pytest.mark.parametrize('dois', [[None, None, None], ['', None, ''],
+                                  [None, 'abc', '10.1']])
+def test_records_without_doi(dois: list):
+  result = DoiDeduplicator().deduplicate(records(SOURCES, dois))
+  assert not result.keep.any() and not result.drop.any()
+  assert result.provenance.empty
+
+
+def test_no_alive_record_with_doi():
+  df: pd.DataFrame = records(SOURCES, ['10.1000/xyz', '10.1000/XYZ', None])
+  result = DoiDeduplicator().deduplicate(df, np.array([False, False, True]))
+  assert not result.keep.any() and not result.drop.any()
+
+
+def test_priority_across_sources():
+  df: pd.DataFrame = records(
+    ['gs', 'acm', 'pubmed', 'gs', 'acm'],
+    ['https://doi.org/10.1000/ABC', '10.1000/abc', 'doi:10.1000/abc',
+     '10.1000/other', '10.1000/other'])
+  result = DoiDeduplicator().deduplicate(df)
+  assert result.keep.tolist() == [False, False, True, False, True]
+  assert result.drop.tolist() == [True, True, False, True, False]
+  provenance: pd.DataFrame = result.provenance
+  assert provenance['record'].tolist() == [0, 1, 3]
+  assert provenance['kept_record'].tolist() == [2, 2, 4]
+  assert provenance['kept_source'].tolist() == ['pubmed', 'pubmed', 'acm']
+  # an explicit priority overrides the order of the categories
+  result = DoiDeduplicator(priority=['gs', 'acm']).deduplicate(df)
+  assert result.keep.tolist() == [True, False, False, True, False]
+  assert result.provenance['kept_record'].tolist() == [0, 0, 3]
+
+
+def test_earlier_rows_win_within_a_source():
+  df: pd.DataFrame = records(['acm', 'acm'], ['10.1000/abc', '10.1000/abc'])
+  result = DoiDeduplicator().deduplicate(df)
+  assert result.keep.tolist() == [True, False]
+  assert result.provenance['kept_source_row'].tolist() == [0]
@@ -0,0 +1,171 @@
+import os
+import pandas as pd
+import pytest
+from screening.formats import BibFile, RisFile
+
+BIB: str = '''@string{jmir = "J Med Internet Res"}
+@STRING{ema = {Ecological Momentary}}
+
+@Article{smith2020,
+  Title = ema # " Assessment of {Mood}",
+  journal = jmir,
+  month = jan,
+  year = 2020,
+  note = {Data on request: smith@example.org or
+          @smith on the forum},
+  title = {A second title},
+}
+@software{tool2022,
+  title = {Tool}
+}
+@comment{anything}
+@inproceedings{broken2019,
+  title = {Unbalanced {brace},
+  year = {2019}
+
+@book{jones2018,
+  title = {Momentary},
+  author = {Jones, A. and Lee, B.}
+}
+'''
+
+RIS: str = '''1.
+TY  - JOUR
+AU  - Smith, A.
+AU  - Lee, B.
+TI  - Ecological momentary
+assessment of mood
+KW  - ema
+KW  - apps
+PY  - 2020
+PY  - 2021
+UR  - https://a.org; https://b.org
+X1  - custom
+UK  - unknown
+ER  -
+
+2.
+TY  - CONF
+T2  - Proceedings
+A1  - Doe, J.
+ER  -
+'''
+
+
+def write(tmp_path, name: str, text: str) -> str:
+  file_path: str = os.path.join(tmp_path, name)
+  with open(file_path, 'w', encoding='utf-8') as file:
+    file.write(text)
+  return file_path
+
+
+def read(file_path: str) -> str:
+  with open(file_path, 'r', encoding='utf-8') as file:
+    return file.read()
+
+
+@pytest.fixture
+def bib(tmp_path) -> pd.DataFrame:
+  return BibFile().read(write(tmp_path, 'in.bib', BIB))
+
+
+@pytest.fixture
+def ris(tmp_path) -> pd.DataFrame:
+  return RisFile().read(write(tmp_path, 'in.ris', RIS))
+
+
+def test_bib_strings_and_concatenation(bib: pd.DataFrame):
+  smith: dict = bib.iloc[0].to_dict()
+  assert smith['title'] == 'Ecological Momentary Assessment of {Mood}'
+  assert smith['journal'] == 'J Med Internet Res'
+  assert smith['month'] == 'January' and smith['year'] == '2020'
+
+
+def test_bib_fields_types_and_at_signs(bib: pd.DataFrame):
+  # the first of duplicate fields wins, non-standard types are skipped
+  assert bib['ID'].tolist() == ['smith2020', 'jones2018']
+  assert bib['ENTRYTYPE'].tolist() == ['article', 'book']
+  # an "@" at the start of a line of a value does not start an entry
+  assert bib['note'][0] == ('Data on request: smith@example.org or\n'
+                            '@smith on the forum')
+  assert bib['author'][1] == 'Jones, A. and Lee, B.'
+  assert pd.isna(bib['note'][1])
+
+
+def test_bib_unbalanced_entry_is_skipped(tmp_path):
+  text: str = '@article{first,\n  title = {Open\n}\n' \
+    + BIB[BIB.index('@book'):] + '@misc{last, title = {Last}}\n'
+  df: pd.DataFrame = BibFile().read(write(tmp_path, 'in.bib', text))
+  assert df['ID'].tolist() == ['jones2018', 'last']
+
+
+def test_bib_batches(tmp_path):
+  file_path: str = write(tmp_path, 'in.bib', BIB)
+  batches: list = list(BibFile().iter_batches(file_path, batch_size=1))
+  assert [len(batch) for batch in batches] == [1, 1]
+  assert 'note' not in batches[1].columns
+
+
+def test_bib_write(tmp_path, bib: pd.DataFrame):
+  file_path: str = os.path.join(tmp_path, 'out.bib')
+  BibFile().write(bib[['ENTRYTYPE', 'ID', 'title', 'year']], file_path)
+  # sorted by ID, fields in alphabetical order, missing values left out
+  assert read(file_path) == (
+    '@book{jones2018,\n'
+    ' title = {Momentary}\n'
+    '}\n'
+    '\n'
+    '@article{smith2020,\n'
+    ' title = {Ecological Momentary Assessment of {Mood}},\n'
+    ' year = {2020}\n'
+    '}\n')
+  BibFile().write(bib[['ENTRYTYPE', 'ID', 'year']], file_path, na_rep='')
+  assert ' year = {}\n' in read(file_path)
+
+
+def test_ris_tags(ris: pd.DataFrame):
+  first: dict = ris.iloc[0].to_dict()
+  assert first['type_of_reference'] == 'JOUR'
+  assert first['authors'] == ['Smith, A.', 'Lee, B.']
+  # continued lines are joined, the first value of a single tag wins
+  assert first['title'] == 'Ecological momentary assessment of mood'
+  assert first['keywords'] == ['ema', 'apps'] and first['year'] == '2020'
+  assert first['urls'] == ['https://a.org', 'https://b.org']
+  assert first['unknown_tag'] == {'X1': ['custom'], 'UK': ['unknown']}
+  second: dict = ris.iloc[1].to_dict()
+  assert second['secondary_title'] == 'Proceedings'
+  assert second['first_authors'] == ['Doe, J.']
+  assert pd.isna(second['authors']) and pd.isna(second['unknown_tag'])
+
+
+def test_ris_write(tmp_path, ris: pd.DataFrame):
+  file_path: str = os.path.join(tmp_path, 'out.ris')
+  RisFile().write(ris[['type_of_reference', 'authors', 'title', 'urls',
+                       'unknown_tag']], file_path)
+  # missing values are empty lines of their tag, missing lists left out
+  assert read(file_path) == (
+    '1.\n'
+    'TY  - JOUR\n'
+    'AU  - Smith, A.\n'
+    'AU  - Lee, B.\n'
+    'TI  - Ecological momentary assessment of mood\n'
+    'UR  - https://a.org\n'
+    'UR  - https://b.org\n'
+    'X1  - custom\n'
+    'UK  - unknown\n'
+    'ER  - \n'
+    '\n'
+    '2.\n'
+    'TY  - CONF\n'
+    'TI  - \n'
+    'ER  - \n')
+  assert RisFile().read(file_path)['urls'][0] == ['https://a.org',
+                                                  'https://b.org']
+
+
+def test_empty_files(tmp_path):
+  assert BibFile().read(write(tmp_path, 'in.bib', '')).empty
+  assert RisFile().read(write(tmp_path, 'in.ris', '')).empty
+  BibFile().write(pd.DataFrame(columns=['ENTRYTYPE', 'ID']),
+                  os.path.join(tmp_path, 'out.bib'))
+  assert read(os.path.join(tmp_path, 'out.bib')) == ''
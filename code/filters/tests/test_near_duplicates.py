@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+from screening.dedup import source_ranks
+from screening.near_duplicates import NearDuplicateDetector
+
+# pairs of data/raw, the PubMed export has no abstracts
+DISTINCT: dict = {
+  'one word of the title differs': (
+    ('An Integrated mHealth App for Smoking Cessation in Black Smokers With '
+     'HIV: Protocol for a Randomized Controlled Trial',
+     'Bizier A, Jones A, Businelle M, Kezbers K, Hoeppner BB, Giordano TP, '
+     'Thai JM, Charles J, Montgomery A, Gallagher MW, Cheney MK, Zvolensky M, '
+     'Garey L.'),
+    ('An Integrated mHealth App for Smoking Cessation in Black Smokers With '
+     'Anxiety: Protocol for a Randomized Controlled Trial',
+     'Businelle MS, Garey L, Gallagher MW, Hébert ET, Vujanovic A, Alexander '
+     'A, Kezbers K, Matoska C, Robison J, Montgomery A, Zvolensky MJ.')),
+  'same authors, different condition': (
+    ('Effectiveness, reach, uptake, and feasibility of digital health '
+     'interventions for adults with type 2 diabetes: a systematic review and '
+     'meta-analysis of randomised controlled trials',
+     'Moschonis G, Siopis G, Jung J, Eweka E, Willems R, Kwasnicka D, '
+     'Asare BY, Kodithuwakku V, Verhaeghe N, Vedanthan R, Annemans L, '
+     'Oldenburg B, Manios Y; DigiCare4You Consortium.'),
+    ('Effectiveness, reach, uptake, and feasibility of digital health '
+     'interventions for adults with hypertension: a systematic review and '
+     'meta-analysis of randomised controlled trials',
+     'Siopis G, Moschonis G, Eweka E, Jung J, Kwasnicka D, Asare BY, '
+     'Kodithuwakku V, Willems R, Verhaeghe N, Annemans L, Vedanthan R, '
+     'Oldenburg B, Manios Y; DigiCare4You Consortium.')),
+  'correction notice': (
+    ('Mobile App-Based Interventions to Support Diabetes Self-Management: A '
+     'Systematic Review of Randomized Controlled Trials to Identify Functions '
+     'Associated with Glycemic Efficacy',
+     'Wu Y, Yao X, Vespasiani G, Nicolucci A, Dong Y, Kwong J, Li L, Sun X, '
+     'Tian H, Li S.'),
+    ('Correction: Mobile App-Based Interventions to Support Diabetes '
+     'Self-Management: A Systematic Review of Randomized Controlled Trials to '
+     'Identify Functions Associated with Glycemic Efficacy',
+     'Wu Y, Yao X, Vespasiani G, Nicolucci A, Dong Y, Kwong J, Li L, Sun X, '
+     'Tian H, Li S.'))}
+
+DUPLICATES: dict = {
+  'unicode dash': (
+    ('Standalone Smartphone Cognitive Behavioral Therapy-Based Ecological '
+     'Momentary Interventions to Increase Mental Health: Narrative Review',
+     'Marciniak MA, Shanahan L, Rohde J, Schulz A, Wackerhagen C, Kobylińska '
+     'D, Tuescher O, Binder H, Walter H, Kalisch R, Kleim B.'),
+    ('Standalone smartphone cognitive behavioral therapy–based ecological '
+     'momentary interventions to increase mental health: Narrative review',
+     'MA Marciniak, L Shanahan, J Rohde…')),
+  'truncated by Google Scholar': (
+    ('Wearable Sensor and Mobile App-Based mHealth Approach for Investigating '
+     'Substance Use and Related Factors in Daily Life: Protocol for an '
+     'Ecological Momentary Assessment Study',
+     'Takano A, Ono K, Nozawa K, Sato M, Onuki M, Sese J, Yumoto Y, '
+     'Matsushita S, Matsumoto T.'),
+    ('… Mobile App–Based mHealth Approach for Investigating Substance Use and '
+     'Related Factors in Daily Life: Protocol for an Ecological Momentary '
+     'Assessment …',
+     'A Takano, K Ono, K Nozawa, M Sato…')),
+  'dropped subtitle': (
+    ('[A decision framework for an adaptive behavioral intervention for '
+     'physical activity using hybrid model predictive control: illustration '
+     'with Just Walk]',
+     'Cevallos D, Martín CA, Mistiri ME, Rivera DE, Hekler E.'),
+    ('A decision framework for an adaptive behavioral intervention for '
+     'physical activity using hybrid model predictive control',
+     'Martin, Cesar A; Rivera, Daniel E; Hekler, Eric B'))}
+
+
+def records(pair: tuple) -> pd.DataFrame:
+  return pd.DataFrame({
+    'source': pd.Categorical(['pubmed', 'gs'], categories=['pubmed', 'gs']),
+    'source_row': [0, 0], 'title': [pair[0][0], pair[1][0]],
+    'abstract': [None, None], 'authors': [pair[0][1], pair[1][1]]})
+
+
+@pytest.mark.parametrize('pair', DISTINCT.values(), ids=DISTINCT.keys())
+def test_title_only_pairs_need_identical_titles(pair: tuple):
+  result = NearDuplicateDetector().detect(records(pair))
+  assert not result.drop.any()
+  assert result.clusters.empty
+
+
+@pytest.mark.parametrize('pair', DUPLICATES.values(), ids=DUPLICATES.keys())
+def test_title_only_duplicates(pair: tuple):
+  result = NearDuplicateDetector().detect(records(pair))
+  assert result.drop.tolist() == [False, True]
+
+
+def test_author_gate_only_for_title_only_pairs():
+  title: str = ('Combined Motivational Interviewing and Ecological Momentary '
+                'Intervention to Reduce Hazardous Alcohol Use')
+  abstract: str = ' '.join(f'word{i}' for i in range(60))
+  df: pd.DataFrame = records(((title, 'Lauckner C'), (title, 'Nicholson E')))
+  assert not NearDuplicateDetector().detect(df).drop.any()
+  df['abstract'] = abstract
+  assert NearDuplicateDetector().detect(df).drop.tolist() == [False, True]
+
+
+def test_source_ranks():
+  source: pd.Series = pd.Series(pd.Categorical(
+    ['gs', 'pubmed', 'acm'], categories=['pubmed', 'acm', 'gs']))
+  assert source_ranks(source).tolist() == [2, 0, 1]
+  assert source_ranks(source, ['acm', 'gs']).tolist() == [1, 2, 0]
+  assert source_ranks(source).dtype == np.int16
+
+
+def test_similarity_ignores_the_index():
+  title: str = ('Combined Motivational Interviewing and Ecological Momentary '
+                'Intervention to Reduce Hazardous Alcohol Use')
+  df: pd.DataFrame = pd.concat([
+    records(((title, 'Lauckner C'), (title, 'Nicholson E'))),
+    records((('Smartphone Apps for Alcohol Use', 'Crane D'),) * 2)[:1]])
+  df['abstract'] = [' '.join(f'word{i}' for i in range(60))] * 2 \
+    + [' '.join(f'other{i}' for i in range(60))]
+  expected: pd.DataFrame = NearDuplicateDetector().detect(
+    df.reset_index(drop=True)).pairs
+  assert expected['text_similarity'].max() == 1
+  # e.g. the records left after an earlier stage
+  df.index = [10, 20, 30]
+  pd.testing.assert_frame_equal(NearDuplicateDetector().detect(df).pairs,
+                                expected)
@@ -0,0 +1,85 @@
+import os
+import pandas as pd
+import pytest
+from screening.cache import StageCache
+from screening.pipeline import ScreeningPipeline, ScreeningResult
+from screening.sources import RecordSet
+from screening.stages import ReviewStage, default_stages
+
+TITLE: str = ('Ecological momentary interventions for smoking cessation in '
+              'young adults: a pilot study')
+
+
+@pytest.fixture
+def record_set(tmp_path) -> RecordSet:
+  pd.DataFrame({
+    'Title': [TITLE, TITLE.upper(), 'A systematic review of EMA apps',
+              'Mobile sensing of stress', 'Mobile sensing of stress',
+              'Old phone study'],
+    'Abstract': [None] * 6,
+    'Authors': ['A Smith, B Jones', 'A Smith, B Jones', 'C Brown', 'D Lee',
+                'D Lee', 'E Kim'],
+    'Year': [2015, 2015, 2018, 2020, 2020, 2005],
+    'DOI': [None, None, None, '10.1000/stress', '10.1000/STRESS', None]}) \
+    .to_csv(os.path.join(tmp_path, 'googlescholar_appended.csv'))
+  return RecordSet.load(str(tmp_path))
+
+
+def run(record_set: RecordSet, cache: StageCache,
+        keywords: list = None) -> ScreeningPipeline:
+  stages: list = default_stages()
+  stages[3] = ReviewStage(keywords)
+  pipeline: ScreeningPipeline = ScreeningPipeline(stages, cache)
+  pipeline.run(record_set)
+  return pipeline
+
+
+def test_changed_stage_reruns_with_its_successors(record_set: RecordSet,
+                                                  tmp_path):
+  cache: StageCache = StageCache(os.path.join(tmp_path, 'cache'))
+  first: ScreeningPipeline = run(record_set, cache)
+  assert not first.report['cached'].any()
+  assert first.report['removed'].tolist() == [1, 0, 0, 1, 1, 1]
+  again: ScreeningPipeline = run(record_set, cache)
+  assert again.report['cached'].all()
+  # only the review keywords change, the stages before stay cached
+  changed: ScreeningPipeline = run(record_set, cache, ['Pilot Study'])
+  assert changed.report['cached'].tolist() == [True, True, True,
+                                                False, False, False]
+  assert changed.report['removed'].tolist() == [1, 0, 0, 2, 1, 0]
+
+
+def test_cached_stages_keep_their_details(record_set: RecordSet, tmp_path):
+  cache: StageCache = StageCache(os.path.join(tmp_path, 'cache'))
+  first: ScreeningPipeline = run(record_set, cache)
+  # a new process, the stages have not run
+  again: ScreeningPipeline = run(record_set, StageCache(cache.directory))
+  assert again.report['cached'].all()
+  pd.testing.assert_frame_equal(again.stages[3].hits, first.stages[3].hits)
+  assert len(again.stages[3].hits) == 1
+  pd.testing.assert_frame_equal(again.stages[4].result.provenance,
+                                first.stages[4].result.provenance)
+  assert len(again.stages[4].result.provenance) == 1
+  pd.testing.assert_frame_equal(again.stages[5].result.clusters,
+                                first.stages[5].result.clusters)
+  assert len(again.stages[5].result.clusters) == 2
+
+
+def test_records_are_tagged_with_the_rejecting_stage(record_set: RecordSet,
+                                                     tmp_path):
+  result: ScreeningResult = ScreeningPipeline().run(record_set)
+  assert result.fingerprints is None
+  titles: dict = dict(zip(result.record_set.records['title'],
+                          result.rejected_by))
+  assert titles['Old phone study'] == 'Date'
+  assert titles['A systematic review of EMA apps'] == 'Reviews'
+  assert result.kept()['title'].tolist() == [TITLE, 'Mobile sensing of stress']
+  summary: pd.DataFrame = result.summary()
+  assert summary.loc['gs', 'loaded'] == 6 and summary.loc['gs', 'kept'] == 2
+  result.export(os.path.join(tmp_path, 'out'), stages=['Date'])
+  stage_dir: str = os.path.join(tmp_path, 'out', 'filter1_Date')
+  assert sorted(os.listdir(stage_dir)) == ['gs_filter_date_in.csv',
+                                           'gs_filter_date_out.csv']
+  out: pd.DataFrame = pd.read_csv(os.path.join(stage_dir,
+                                               'gs_filter_date_out.csv'))
+  assert out['Title'].tolist() == ['Old phone study']
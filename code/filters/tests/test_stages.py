@@ -0,0 +1,37 @@
+import pytest
+from screening.cache import StageCache
+from screening.near_duplicates import MinHashIndex
+from screening.stages import DoiDeduplicationStage, NearDuplicateStage
+
+
+def key(stage) -> str:
+  return StageCache('unused').stage_key('records', stage)
+
+
+@pytest.mark.parametrize('name, value', [
+  ('min_abstract_words', 10), ('title_threshold', 0.9),
+  ('min_title_length', 20), ('min_author_similarity', 0.8)])
+def test_detector_settings_change_the_key(name: str, value):
+  stage: NearDuplicateStage = NearDuplicateStage()
+  before: str = key(stage)
+  setattr(stage.detector, name, value)
+  assert key(stage) != before
+  assert key(NearDuplicateStage()) == before
+
+
+@pytest.mark.parametrize('name, value', [
+  ('num_perm', 64), ('bands', 16), ('max_bucket', 10), ('seed', 1)])
+def test_index_settings_change_the_key(name: str, value):
+  stage: NearDuplicateStage = NearDuplicateStage()
+  before: str = key(stage)
+  stage.detector.index = MinHashIndex(**{name: value})
+  assert key(stage) != before
+  stage.detector.index = MinHashIndex()
+  assert key(stage) == before
+
+
+def test_doi_min_length_changes_the_key():
+  stage: DoiDeduplicationStage = DoiDeduplicationStage()
+  before: str = key(stage)
+  stage.deduplicator.min_length = 8
+  assert key(stage) != before
@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+import pytest
+from screening.pipeline import ScreeningPipeline, ScreeningResult
+from screening.sources import RecordSet
+from screening.store import StageStore
+
+
+@pytest.fixture
+def result(tmp_path) -> ScreeningResult:
+  pd.DataFrame({
+    'Title': ['EMA for smoking cessation', 'EMA for smoking cessation',
+              'A systematic review of EMA apps', 'Mobile sensing of stress',
+              'Old phone study'],
+    'Abstract': [None] * 5,
+    'Authors': ['A Smith', 'A Smith', 'C Brown', 'D Lee', 'E Kim'],
+    'Year': [2015, 2015, 2018, 2020, 2005],
+    'DOI': [None, None, None, '10.1000/stress', None]}) \
+    .to_csv(os.path.join(tmp_path, 'googlescholar_appended.csv'))
+  return ScreeningPipeline().run(RecordSet.load(str(tmp_path)))
+
+
+def test_stages_load_from_the_bitmap(result: ScreeningResult, tmp_path):
+  store: StageStore = StageStore(os.path.join(tmp_path, 'store'))
+  store.save(result)
+  assert store.stages() == [stage.name for stage in result.stages]
+  pd.testing.assert_frame_equal(store.summary(), result.summary())
+  assert 0 < len(result.kept()) < len(result.record_set.records)
+  records: pd.DataFrame = result.record_set.records
+  for name in store.stages():
+    removed: pd.Series = records['title'][result.rejected_by == name]
+    out: pd.DataFrame = store.load(['title'], stage=name, side='out')
+    assert out['title'].tolist() == removed.tolist()
+  # the records that pass the last stage are the kept ones
+  kept: pd.DataFrame = store.load(['source', 'title'], stage=name)
+  assert kept['title'].tolist() == result.kept()['title'].tolist()
+  assert store.load(['title'], sources=['pubmed']).empty
+  with pytest.raises(ValueError):
+    store.load(stage=name, side='both')
+
+
+def test_exports_match_the_result(result: ScreeningResult, tmp_path):
+  store: StageStore = StageStore(os.path.join(tmp_path, 'store'))
+  store.save(result)
+  result.export(os.path.join(tmp_path, 'expected'))
+  store.export(os.path.join(tmp_path, 'exported'))
+  for stage_dir in os.listdir(os.path.join(tmp_path, 'expected')):
+    for file_name in os.listdir(os.path.join(tmp_path, 'expected',
+                                             stage_dir)):
+      paths: list = [os.path.join(tmp_path, side, stage_dir, file_name)
+                     for side in ('expected', 'exported')]
+      with open(paths[0], 'rb') as expected, open(paths[1], 'rb') as exported:
+        assert exported.read() == expected.read(), file_name
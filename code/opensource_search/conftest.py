@@ -0,0 +1,29 @@
+# pytest puts the directory of this file on sys.path, so the tests import the
+# gh_search package like the notebooks do. The package reads config/ relative
+# to the working directory: cd code/opensource_search && python -m pytest
+import logging
+import pytest
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.log import logger
+
+# keep the test runs out of data/logs/search.log
+for handler in logger.root.handlers[:]:
+  if isinstance(handler, logging.FileHandler):
+    logger.root.removeHandler(handler)
+    handler.close()
+
+
+@pytest.fixture
+def repositories() -> list:
+  return FakeGitHubAPI.generate_repositories(1500)
+
+
+@pytest.fixture
+def api(repositories: list) -> FakeGitHubAPI:
+  return FakeGitHubAPI(repositories)
+
+
+@pytest.fixture
+def api_url(api: FakeGitHubAPI) -> str:
+  with api as url:
+    yield url
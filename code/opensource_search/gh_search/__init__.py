@@ -1,3 +1,14 @@
 from .log import *
 from .language import *
-from .search import *
\ No newline at end of file
+from .rate_limit import *
+from .cache import *
+from .journal import *
+from .readme import *
+from .keywords import *
+from .schema import *
+from .metrics import *
+from .store import *
+from .langid import *
+from .filters import *
+from .search import *
+from .runner import *
\ No newline at end of file
@@ -0,0 +1,40 @@
+import argparse
+import os
+from datetime import datetime
+from .runner import *
+
+
+# runs all searches of a keyword file, e.g. from code/opensource_search:
+# GITHUB_TOKEN=... python -m gh_search --processes 4 --journal data/journal
+parser = argparse.ArgumentParser(
+  prog='python -m gh_search',
+  description='Runs the GitHub repository search of every line of a keyword '
+              'file concurrently and merges the results into one CSV file. '
+              'The tokens are read from the GITHUB_TOKEN environment variable, '
+              'multiple tokens are separated by commas.')
+parser.add_argument('--keywords', default='config/keywords.txt',
+                    help='keyword file, one search per line')
+parser.add_argument('--output', default='data/initial/data.csv',
+                    help='merged CSV file, existing rows are kept')
+parser.add_argument('--shards', default='data/initial',
+                    help='directory of the per-search CSV and qualifier files')
+parser.add_argument('--processes', type=int, default=4,
+                    help='number of concurrent worker processes')
+parser.add_argument('--until', type=datetime.fromisoformat, default=None,
+                    help='latest creation date to search (default: now)')
+parser.add_argument('--journal', default=None,
+                    help='journal directory to resume interrupted runs')
+parser.add_argument('--filter-non-programming', action='store_true',
+                    help='skip repositories with a non-programming language')
+parser.add_argument('--metrics', default=None,
+                    help='JSON file for the latency, bytes, retries and '
+                         'rate limit waits of the run')
+args = parser.parse_args()
+
+tokens: list = [token.strip()
+                for token in os.environ.get('GITHUB_TOKEN', '').split(',')
+                if token.strip()]
+CrawlRunner(tokens, args.keywords, args.output,
+            args.shards, args.processes, args.until, args.journal,
+            args.filter_non_programming,
+            metrics_path=args.metrics).run()
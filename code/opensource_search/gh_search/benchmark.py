@@ -0,0 +1,230 @@
+import json
+from datetime import datetime
+import pandas as pd
+from .fake_api import FakeGitHubAPI
+from .metrics import CrawlMetrics
+from .schema import RepositorySchema
+from .search import GitHubSearch
+
+
+class CrawlBenchmark:
+  '''
+  Class that replays a crawl of `GitHubSearch` against a `FakeGitHubAPI` to
+  measure its throughput without touching the real API, e.g. to catch
+  regressions of the date partitioning, the search pagination or the
+  enrichment.
+
+  The repositories served by the stand-in are fixtures: either synthetic ones
+  or the results of a recorded crawl such as data/initial/data.csv, so every
+  run replays the same searches. The latency of the network and the rate
+  limits are configurable. A run partitions the `created:` range of the
+  keywords, collects all search results and enriches the first repositories,
+  and reports the `CrawlMetrics` of every stage together with whether all
+  matching repositories were found.
+
+  Attributes
+  ----------
+  repositories: list
+    The fixtures, see `FakeGitHubAPI.generate_repositories` and
+    `load_fixtures`.
+  keywords: list
+    Keywords of the search, by default every repository matches.
+  tokens: int
+    Number of tokens the crawl spreads its requests over.
+  latency: float
+    Seconds every response of the stand-in is delayed.
+  search_limit: int
+    Number of searches per token and window.
+  core_limit: int
+    Number of other calls per token and window.
+  window: float
+    Length of a rate limit time frame in seconds.
+  max_workers: int
+    Number of concurrent enrichment threads.
+  enrich: int
+    Number of repositories that are enriched.
+  backend: str
+    Enrichment backend, "rest" or "graphql".
+  until: datetime
+    Latest creation date that is searched.
+  metrics: CrawlMetrics
+    The metrics of the last run.
+  results: dict
+    Number of ranges, found, expected and enriched repositories of the last
+    run.
+
+  Methods
+  -------
+  run() -> pd.DataFrame
+    Replays the crawl and returns one row per stage.
+  export(file_path: str) -> dict
+    Writes the configuration, results and metrics summary to a JSON file.
+  load_fixtures(file_path: str) -> list
+    Returns the repositories of a JSON fixture file or of a crawl CSV file.
+  save_fixtures(repositories: list, file_path: str) -> None
+    Writes repositories to a JSON fixture file.
+
+  Examples
+  --------
+  ```sh
+  cd code/opensource_search
+  python -m gh_search.benchmark --fixtures data/initial/data.csv \
+    --latency 0.01 --output data/benchmark.json
+  ```
+  '''
+
+  def __init__(self, repositories: list = None, keywords: list = None,
+               tokens: int = 2, latency: float = 0.005,
+               search_limit: int = 30, core_limit: int = 5000,
+               window: float = 2, max_workers: int = 8, enrich: int = 500,
+               until: datetime = datetime(2024, 12, 31),
+               backend: str = 'rest'):
+    self.repositories: list = repositories if repositories is not None \
+      else FakeGitHubAPI.generate_repositories(3000)
+    self.keywords: list = keywords or []
+    self.tokens: int = tokens
+    self.latency: float = latency
+    self.search_limit: int = search_limit
+    self.core_limit: int = core_limit
+    self.window: float = window
+    self.max_workers: int = max_workers
+    self.enrich: int = enrich
+    self.until: datetime = until
+    self.backend: str = backend
+    self.metrics: CrawlMetrics = None
+    self.results: dict = None
+
+  def run(self) -> pd.DataFrame:
+    '''Replays the crawl, see the class description.'''
+    self.metrics = CrawlMetrics()
+    tokens: list = [f'token{i}' for i in range(self.tokens)]
+    api: FakeGitHubAPI = FakeGitHubAPI(
+      self.repositories, tokens={token: True for token in tokens},
+      search_limit=self.search_limit, core_limit=self.core_limit,
+      window=self.window, latency=self.latency)
+    with api as url:
+      gh: GitHubSearch = GitHubSearch(tokens, self.max_workers, api_url=url,
+                                      metrics=self.metrics)
+      try:
+        qualifiers: list = gh.get_all_date_params(self.keywords, self.until)
+        frames: list = [gh.get_all_search_results(self.keywords + [qualifier],
+                                                  check_limit=False)
+                        for qualifier in qualifiers]
+        df: pd.DataFrame = pd.concat(frames, ignore_index=True) \
+          .drop_duplicates(subset='id')
+        enriched: pd.DataFrame = gh.get_additional_data(df.head(self.enrich),
+                                                        backend=self.backend)
+      finally:
+        gh.dispose()
+    expected, _ = api._search(' '.join(
+      self.keywords + [f'created:<={self.until:%Y-%m-%d}']), 1, 1)
+    self.results = {'ranges': len(qualifiers), 'found': len(df),
+                    'expected': expected,
+                    'enriched': int((enriched['num_issues'] >= 0).sum())}
+    rows: list = []
+    for stage, totals in self.metrics.summary()['stages'].items():
+      latency: dict = totals.pop('latency_ms')
+      rows.append({'stage': stage, **totals, 'p50_ms': latency['p50'],
+                   'p90_ms': latency['p90']})
+    return pd.DataFrame(rows)
+
+  def export(self, file_path: str) -> dict:
+    '''
+    Writes the configuration, the results and the `CrawlMetrics` summary of
+    the last run to a JSON file and returns them.
+    '''
+    summary: dict = {
+      'config': {'repositories': len(self.repositories),
+                 'keywords': self.keywords, 'tokens': self.tokens,
+                 'latency': self.latency, 'search_limit': self.search_limit,
+                 'core_limit': self.core_limit, 'window': self.window,
+                 'max_workers': self.max_workers, 'enrich': self.enrich,
+                 'until': self.until.isoformat(), 'backend': self.backend},
+      'results': self.results, 'metrics': self.metrics.summary()}
+    with open(file_path, 'w', encoding='utf-8') as file:
+      json.dump(summary, file, indent=2)
+    return summary
+
+  @staticmethod
+  def load_fixtures(file_path: str) -> list:
+    '''
+    Returns the repositories of a JSON file written by `save_fixtures` or of
+    a CSV file of a recorded crawl. READMEs, languages and counts of enriched
+    crawl files are replayed as well.
+    '''
+    if file_path.endswith('.json'):
+      with open(file_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+    df: pd.DataFrame = RepositorySchema().load(file_path)
+
+    def value(row: dict, column: str, default=None):
+      v = row.get(column, default)
+      return default if v is None or v is pd.NA or v != v else v
+    repositories: list = []
+    for row in df.to_dict(orient='records'):
+      language: str = value(row, 'main_language')
+      languages: list = value(row, 'languages') \
+        or ([language] if language else [])
+      repositories.append({
+        'id': int(row['id']), 'owner': row['owner'], 'name': row['name'],
+        'description': value(row, 'description'),
+        'created_at': pd.Timestamp(row['created_at'])
+        .strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'language': language,
+        'languages': {lang: 1 for lang in languages},
+        'readme': value(row, 'readme'),
+        'open_issues': int(value(row, 'num_issues', 0)),
+        'subscribers': int(value(row, 'num_subscribers', 0)),
+        'contributors': max(0, int(value(row, 'num_contributors', 0))),
+        'stars': int(value(row, 'num_stars', 0))})
+    return repositories
+
+  @staticmethod
+  def save_fixtures(repositories: list, file_path: str) -> None:
+    '''Writes repositories to a JSON fixture file for `load_fixtures`.'''
+    with open(file_path, 'w', encoding='utf-8') as file:
+      json.dump(repositories, file)
+
+
+if __name__ == '__main__':
+  import argparse
+  parser = argparse.ArgumentParser(
+    prog='python -m gh_search.benchmark',
+    description='Replays a crawl against a local stand-in of the GitHub API '
+                'and reports the metrics of every stage.')
+  parser.add_argument('--fixtures', default=None,
+                      help='JSON fixture file or CSV file of a crawl '
+                           '(default: synthetic repositories)')
+  parser.add_argument('--repositories', type=int, default=3000,
+                      help='number of synthetic repositories')
+  parser.add_argument('--keywords', nargs='*', default=[],
+                      help='keywords of the search')
+  parser.add_argument('--tokens', type=int, default=2)
+  parser.add_argument('--latency', type=float, default=0.005,
+                      help='seconds every response is delayed')
+  parser.add_argument('--search-limit', type=int, default=30)
+  parser.add_argument('--core-limit', type=int, default=5000)
+  parser.add_argument('--window', type=float, default=2,
+                      help='seconds of a rate limit time frame')
+  parser.add_argument('--workers', type=int, default=8)
+  parser.add_argument('--enrich', type=int, default=500,
+                      help='number of repositories that are enriched')
+  parser.add_argument('--backend', choices=['rest', 'graphql'],
+                      default='rest', help='enrichment backend')
+  parser.add_argument('--output', default=None,
+                      help='JSON file for the configuration, results and '
+                           'metrics summary')
+  args = parser.parse_args()
+  benchmark: CrawlBenchmark = CrawlBenchmark(
+    CrawlBenchmark.load_fixtures(args.fixtures) if args.fixtures
+    else FakeGitHubAPI.generate_repositories(args.repositories),
+    args.keywords, args.tokens, args.latency, args.search_limit,
+    args.core_limit, args.window, args.workers, args.enrich,
+    backend=args.backend)
+  pd.set_option('display.width', 200)
+  pd.set_option('display.max_columns', 20)
+  results: pd.DataFrame = benchmark.run()
+  print(results.round(3).to_string(index=False))
+  print(f'\n{benchmark.results}')
+  if args.output:
+    benchmark.export(args.output)
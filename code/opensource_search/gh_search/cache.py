@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class ResponseCache:
+  '''
+  Class that stores successful GitHub API responses on disk in a SQLite
+  database together with their `ETag` and `Last-Modified` headers.
+
+  Cached entries are replayed as `If-None-Match` / `If-Modified-Since`
+  headers. GitHub answers those with 304 if nothing changed, which does not
+  count against the rate limit, and the body is then taken from the cache.
+  Entries older than `ttl` seconds are evicted, and if the stored bodies
+  exceed `max_bytes`, the least recently used entries are evicted until they
+  fit again. In offline mode no requests are sent at all and every request is
+  answered from the cache only. Entries are keyed by url and `Accept` header,
+  as the same url can return different media types.
+
+  Attributes
+  ----------
+  file_path: str
+    String path to the SQLite database file. Missing directories are created.
+  ttl: float
+    Number of seconds an entry is kept after it was stored or revalidated.
+    None keeps entries forever.
+  max_bytes: int
+    Maximum summed up size of all stored bodies. None means unlimited.
+  offline: bool
+    Flag that states if responses are only replayed from the cache.
+
+  Methods
+  -------
+  lookup(request: requests.PreparedRequest) -> dict
+    Returns the cached entry of the request or None.
+  conditional_headers(entry: dict) -> dict
+    Returns the headers that revalidate the given entry.
+  store(response: requests.Response) -> None
+    Stores a successful or empty response.
+  revalidated(entry: dict, response: requests.Response) -> requests.Response
+    Returns the cached response for a 304 response and refreshes the entry.
+  replay(request: requests.PreparedRequest) -> requests.Response
+    Returns the cached response of the request or a 504 response if there is
+    none.
+  close() -> None
+    Closes the database connection.
+
+  Examples
+  --------
+  ```py
+  cache = ResponseCache('cache/github.sqlite', ttl=7 * 24 * 3600)
+  gh = GitHubSearch(pat, cache=cache)
+  ```
+  '''
+
+  def __init__(self, file_path: str = 'cache/github.sqlite', ttl: float = None,
+               max_bytes: int = None, offline: bool = False):
+    self.logger = logging.getLogger('search_logger')
+    self.file_path: str = file_path
+    self.ttl: float = ttl
+    self.max_bytes: int = max_bytes
+    self.offline: bool = offline
+    directory: str = os.path.dirname(file_path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self._lock: threading.Lock = threading.Lock()
+    self._db: sqlite3.Connection = sqlite3.connect(file_path,
+                                                   check_same_thread=False)
+    self._db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                     'key TEXT PRIMARY KEY, url TEXT, status INTEGER, '
+                     'headers TEXT, '
+                     'body BLOB, etag TEXT, last_modified TEXT, '
+                     'stored_at REAL, accessed_at REAL)')
+    self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed '
+                     'ON responses (accessed_at)')
+    self._db.commit()
+    self._size: int = 0  # summed up size of all stored bodies
+    self._evict()
+
+  def _key(self, request: requests.PreparedRequest) -> str:
+    return f'{request.headers.get("Accept", "")} {request.url}'
+
+  def lookup(self, request: requests.PreparedRequest) -> dict:
+    '''
+    Returns the cached entry of the request as dict with the keys "key",
+    "url", "status", "headers", "body", "etag" and "last_modified", or None if
+    the request is not cached or its entry expired.
+    '''
+    with self._lock:
+      row: tuple = self._db.execute(
+        'SELECT key, url, status, headers, body, etag, last_modified, '
+        'stored_at FROM responses WHERE key = ?',
+        (self._key(request),)).fetchone()
+    if row is None:
+      return None
+    if self.ttl is not None and row[7] < time.time() - self.ttl:
+      return None
+    return {'key': row[0], 'url': row[1], 'status': row[2],
+            'headers': json.loads(row[3]), 'body': row[4], 'etag': row[5],
+            'last_modified': row[6]}
+
+  def conditional_headers(self, entry: dict) -> dict:
+    '''Returns the headers that make a request conditional on the entry.'''
+    headers: dict = {}
+    if entry is None:
+      return headers
+    if entry['etag']:
+      headers['If-None-Match'] = entry['etag']
+    if entry['last_modified']:
+      headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+  def store(self, response: requests.Response) -> None:
+    '''
+    Stores a successful (200) or empty (204) response, every other response
+    is ignored.
+    '''
+    if response.status_code not in (200, 204):
+      return
+    now: float = time.time()
+    body: bytes = response.content
+    key: str = self._key(response.request)
+    with self._lock:
+      old: tuple = self._db.execute(
+        'SELECT LENGTH(body) FROM responses WHERE key = ?', (key,)).fetchone()
+      self._db.execute(
+        'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (key, response.url, response.status_code,
+         json.dumps(dict(response.headers)), body,
+         response.headers.get('ETag'), response.headers.get('Last-Modified'),
+         now, now))
+      self._db.commit()
+      self._size += len(body) - (old[0] if old else 0)
+    if self.max_bytes is not None and self._size > self.max_bytes:
+      self._evict()
+
+  def revalidated(self, entry: dict,
+                  response: requests.Response) -> requests.Response:
+    '''
+    Returns the cached response of an entry that GitHub confirmed with a 304
+    response. The headers of the 304 response (e.g. the rate limit headers)
+    replace the cached ones, and the entry counts as freshly stored.
+    '''
+    now: float = time.time()
+    with self._lock:
+      self._db.execute('UPDATE responses SET stored_at = ?, accessed_at = ? '
+                       'WHERE key = ?', (now, now, entry['key']))
+      self._db.commit()
+    headers: dict = dict(entry['headers'])
+    headers.update(response.headers)
+    return self._to_response(entry, headers, response.request)
+
+  def replay(self, request: requests.PreparedRequest) -> requests.Response:
+    '''
+    Returns the cached response of the request without sending it. If the
+    request is not cached, this returns a 504 response like an HTTP cache in
+    "only-if-cached" mode would.
+    '''
+    entry: dict = self.lookup(request)
+    if entry is None:
+      self.logger.warning(f'Offline cache miss for {request.url}')
+      response: requests.Response = requests.Response()
+      response.status_code = 504
+      response.url = request.url
+      response.request = request
+      response._content = b''
+      return response
+    with self._lock:
+      self._db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?',
+                       (time.time(), entry['key']))
+      self._db.commit()
+    return self._to_response(entry, entry['headers'], request)
+
+  def _to_response(self, entry: dict, headers: dict,
+                   request: requests.PreparedRequest = None
+                   ) -> requests.Response:
+    response: requests.Response = requests.Response()
+    response.status_code = entry['status']
+    response.url = entry['url']
+    response.headers = CaseInsensitiveDict(headers)
+    # bodies are stored decoded, the transfer headers would be wrong now
+    response.headers.pop('Content-Encoding', None)
+    response.headers.pop('Transfer-Encoding', None)
+    response._content = entry['body']
+    response.encoding = requests.utils.get_encoding_from_headers(
+      response.headers)
+    response.request = request
+    return response
+
+  def _evict(self) -> None:
+    '''
+    Removes expired entries and, if the stored bodies are still too large,
+    the least recently used ones until they fit into max_bytes.
+    '''
+    with self._lock:
+      if self.ttl is not None:
+        self._db.execute('DELETE FROM responses WHERE stored_at < ?',
+                         (time.time() - self.ttl,))
+      if self.max_bytes is not None:
+        rows: list = self._db.execute(
+          'SELECT key, LENGTH(body) FROM responses '
+          'ORDER BY accessed_at DESC').fetchall()
+        total: int = 0
+        evicted: list = []
+        for key, size in rows:
+          total += size
+          if total > self.max_bytes:
+            evicted.append((key,))
+        self._db.executemany('DELETE FROM responses WHERE key = ?', evicted)
+      self._db.commit()
+      self._size = self._db.execute(
+        'SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses').fetchone()[0]
+
+  def close(self) -> None:
+    '''Closes the database connection. Do not use this object afterwards.'''
+    self._db.close()
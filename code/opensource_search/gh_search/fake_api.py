@@ -0,0 +1,504 @@
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+class FakeGitHubAPI:
+  '''
+  Class that serves a local stand-in of the parts of the GitHub REST API that
+  `GitHubSearch` uses, e.g. to test the crawler or to measure its throughput
+  without touching the real API.
+
+  The stand-in enforces rate limits per token and resource like GitHub does
+  and sends the same rate limit headers. Tokens that are unknown or marked as
+  revoked are answered with 401. Searches match a repository if any plain
+  keyword of the query occurs in its name, description or README, and honour
+  the `created:` qualifier, pagination and the cap of 1000 results.
+
+  Successful REST responses (200 and 204) carry an `ETag` (a hash of the
+  body) and a `Last-Modified` header. Requests whose `If-None-Match` or,
+  without it, `If-Modified-Since` header still match are answered with 304
+  and no body, and like on GitHub they do not count against the rate limit.
+
+  Served endpoints: `/rate_limit`, `/search/repositories`,
+  `/repos/{owner}/{name}` with `/languages`, `/contributors`, `/readme` and
+  `/contents`, and `POST /graphql` for the repository queries of the GraphQL
+  enrichment. Queries are not parsed in general, the `repository` aliases
+  and the `object(expression: ...)` tree and README aliases that
+  `GitHubSearch` sends are answered from the same repositories as the REST
+  endpoints. Like GitHub, both report languages by size, largest first, and
+  count open pull requests as part of the open issues of the REST API. The
+  README of a repository lies at its "readme_path" (default "README.md",
+  e.g. "docs/README.md"), `/readme` finds it anywhere like on GitHub.
+
+  Attributes
+  ----------
+  repositories: list
+    List of repositories as dicts, see `generate_repositories`.
+  tokens: dict
+    Maps every known token to whether it is valid. None accepts every token.
+  search_limit: int
+    Number of searches per token and window. Default is 30 like GitHub.
+  core_limit: int
+    Number of other calls per token and window. Default is 5000 like GitHub.
+  window: float
+    Length of a rate limit time frame in seconds.
+  latency: float
+    Seconds every response is delayed to imitate the network.
+  last_modified: str
+    HTTP date sent as `Last-Modified`, by default the time of creation.
+  calls: dict
+    Number of answered calls per token, including 304 responses.
+  not_modified: dict
+    Number of 304 responses per token.
+  rejected: dict
+    Number of rejected calls per status.
+
+  Methods
+  -------
+  start() -> str
+    Starts serving in a background thread and returns the base url.
+  stop() -> None
+    Stops serving.
+  generate_repositories(n: int, seed: int) -> list
+    Returns n synthetic repositories.
+
+  Examples
+  --------
+  ```py
+  with FakeGitHubAPI(FakeGitHubAPI.generate_repositories(500),
+                     tokens={'a': True, 'b': True}) as url:
+    gh = GitHubSearch(['a', 'b'], api_url=url)
+    df = gh.get_all_search_results(['ema'])
+  ```
+  '''
+
+  def __init__(self, repositories: list = None, tokens: dict = None,
+               search_limit: int = 30, core_limit: int = 5000,
+               window: float = 60, latency: float = 0):
+    self.repositories: list = repositories if repositories is not None \
+      else self.generate_repositories(100)
+    self.tokens: dict = tokens
+    self.search_limit: int = search_limit
+    self.core_limit: int = core_limit
+    self.window: float = window
+    self.latency: float = latency
+    self.last_modified: str = formatdate(usegmt=True)
+    self._by_name: dict = {(repo['owner'], repo['name']): repo
+                           for repo in self.repositories}
+    self._lock: threading.Lock = threading.Lock()
+    self._buckets: dict = {}  # (token, resource) -> [remaining, reset]
+    # number of answered calls and of 304 responses per token, and of
+    # rejected calls per status
+    self.calls: dict = {}
+    self.not_modified: dict = {}
+    self.rejected: dict = {}
+    self._server: ThreadingHTTPServer = None
+
+  @staticmethod
+  def generate_repositories(n: int, seed: int = 0,
+                            keywords: list = None) -> list:
+    '''
+    Returns n synthetic repositories created between 2010 and 2024, each
+    mentioning one of the keywords (default "ema") in its description.
+    '''
+    rng: random.Random = random.Random(seed)
+    keywords = keywords or ['ema']
+    languages: list = ['Python', 'Java', 'Kotlin', 'TypeScript', 'R', 'TeX']
+    start: datetime = datetime(2010, 1, 1)
+    repositories: list = []
+    for i in range(n):
+      keyword: str = keywords[i % len(keywords)]
+      created: datetime = start + timedelta(seconds=rng.random() * 14 * 365
+                                            * 24 * 3600)
+      repositories.append({
+        'id': 1000 + i, 'owner': f'owner{i % 97}', 'name': f'repo{i}',
+        'description': f'An {keyword} app number {i}',
+        'created_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'language': rng.choice(languages),
+        'languages': {lang: rng.randint(100, 10000)
+                      for lang in rng.sample(languages, 2)},
+        'readme': f'# repo{i}\n\nThis app supports {keyword} studies.\n',
+        'open_issues': rng.randint(0, 50), 'subscribers': rng.randint(0, 20),
+        'contributors': rng.randint(0, 30), 'stars': rng.randint(0, 500)})
+    return repositories
+
+  # region server
+  def start(self) -> str:
+    '''Starts serving in a background thread and returns the base url.'''
+    handler: type = type('Handler', (_FakeHandler,), {'api': self})
+    self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=self._server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{self._server.server_port}'
+
+  def stop(self) -> None:
+    '''Stops serving.'''
+    if self._server is not None:
+      self._server.shutdown()
+      self._server.server_close()
+      self._server = None
+
+  def __enter__(self) -> str:
+    return self.start()
+
+  def __exit__(self, *args) -> None:
+    self.stop()
+  # endregion
+
+  # region rate limits
+  def _authenticate(self, authorization: str) -> tuple[bool, str]:
+    '''Returns whether the request is authorized and its token.'''
+    if not authorization:
+      return True, None
+    token: str = authorization.split()[-1]
+    if self.tokens is None:
+      return True, token
+    return self.tokens.get(token, False), token
+
+  def _limit(self, token: str, resource: str) -> int:
+    limit: int = self.search_limit if resource == 'search' \
+      else self.core_limit
+    # GitHub grants unauthenticated clients a third of the searches and a
+    # small fraction of the other calls
+    if token is None:
+      return max(1, limit // 3) if resource == 'search' \
+        else max(1, limit // 83)
+    return limit
+
+  def _take(self, token: str, resource: str) -> tuple[bool, dict]:
+    '''
+    Takes one call from the bucket of the token and resource. Returns whether
+    that was possible and the rate limit headers of the response.
+    '''
+    with self._lock:
+      now: float = time.time()
+      limit: int = self._limit(token, resource)
+      bucket: list = self._buckets.get((token, resource))
+      if bucket is None or bucket[1] <= now:
+        bucket = [limit, int(now + self.window)]
+        self._buckets[(token, resource)] = bucket
+      allowed: bool = bucket[0] > 0
+      if allowed:
+        bucket[0] -= 1
+      headers: dict = {'X-RateLimit-Limit': str(limit),
+                       'X-RateLimit-Remaining': str(bucket[0]),
+                       'X-RateLimit-Used': str(limit - bucket[0]),
+                       'X-RateLimit-Reset': str(bucket[1]),
+                       'X-RateLimit-Resource': resource}
+      return allowed, headers
+
+  def _refund(self, token: str, resource: str, headers: dict) -> None:
+    '''
+    Gives back the call of a 304 response and updates its rate limit headers.
+    '''
+    with self._lock:
+      bucket: list = self._buckets[(token, resource)]
+      bucket[0] += 1
+      headers['X-RateLimit-Remaining'] = str(bucket[0])
+      headers['X-RateLimit-Used'] = str(int(headers['X-RateLimit-Limit'])
+                                        - bucket[0])
+
+  def _resources(self, token: str) -> dict:
+    with self._lock:
+      now: float = time.time()
+      resources: dict = {}
+      for resource in ('core', 'search', 'graphql'):
+        limit: int = self._limit(token, resource)
+        bucket: list = self._buckets.get((token, resource))
+        if bucket is None or bucket[1] <= now:
+          bucket = [limit, int(now + self.window)]
+        resources[resource] = {'limit': limit, 'remaining': bucket[0],
+                               'used': limit - bucket[0], 'reset': bucket[1]}
+      return resources
+
+  def _count(self, table: dict, key) -> None:
+    with self._lock:
+      table[key] = table.get(key, 0) + 1
+  # endregion
+
+  # region endpoints
+  def _search(self, query: str, per_page: int, page: int) -> tuple[int, list]:
+    '''Returns the total count and the repositories of a search page.'''
+    start, end = self._created_range(query)
+    terms: list = [term.lower() for term in re.findall(r'"([^"]+)"|(\S+)',
+                                                       query)
+                   for term in term if term]
+    terms = [term for term in terms
+             if ':' not in term and term not in ('or', 'not', 'and')]
+    hits: list = []
+    for repo in self.repositories:
+      text: str = f'{repo["name"]} {repo.get("description") or ""} ' \
+                  f'{repo.get("readme") or ""}'.lower()
+      created: str = repo['created_at']
+      if (not terms or any(term in text for term in terms)) \
+         and start <= created <= end:
+        hits.append(repo)
+    capped: list = hits[:1000]
+    return len(hits), capped[(page - 1) * per_page:page * per_page]
+
+  def _created_range(self, query: str) -> tuple[str, str]:
+    '''Returns the `created:` qualifier of a query as ISO string range.'''
+    match = re.search(r'created:(\S+)', query)
+    if match is None:
+      return '', '~'
+
+    def bound(value: str, end: bool) -> str:
+      if 'T' in value:
+        return value
+      return f'{value}T23:59:59Z' if end else f'{value}T00:00:00Z'
+    value: str = match.group(1)
+    if value.startswith('<='):
+      return '', bound(value[2:], True)
+    if value.startswith('>='):
+      return bound(value[2:], False), '~'
+    first, last = value.split('..')
+    return bound(first, False), bound(last, True)
+
+  def _languages(self, repo: dict) -> dict:
+    '''Returns the languages of a repository by size, largest first.'''
+    languages: dict = repo.get('languages') or {}
+    return dict(sorted(languages.items(), key=lambda item: -item[1]))
+
+  def _graphql(self, query: str, remaining: int, reset: int) -> dict:
+    '''
+    Returns the response body of a GraphQL query of `GitHubSearch`, with one
+    entry per `repository` alias and null for unknown repositories.
+    '''
+    string: str = r'"(?:[^"\\]|\\.)*"'
+    repositories: list = re.findall(
+      rf'(\w+): repository\(owner: ({string}), name: ({string})\)', query)
+    if not repositories:
+      return {'errors': [{'message': 'Unsupported query'}]}
+    # object aliases of the fragment, e.g. f0 -> README.md, root -> ''
+    objects: dict = {alias: json.loads(expression).removeprefix('HEAD:')
+                     for alias, expression in re.findall(
+                       rf'(\w+): object\(expression: ({string})\)', query)}
+    data: dict = {'rateLimit': {
+      'cost': 1, 'remaining': remaining,
+      'resetAt': datetime.fromtimestamp(reset, timezone.utc)
+      .strftime('%Y-%m-%dT%H:%M:%SZ')}}
+    errors: list = []
+    for alias, owner, name in repositories:
+      repo: dict = self._by_name.get((json.loads(owner), json.loads(name)))
+      if repo is None:
+        data[alias] = None
+        errors.append({'type': 'NOT_FOUND', 'path': [alias],
+                       'message': f'Could not resolve to a Repository with '
+                                  f'the name {json.loads(owner)}/'
+                                  f'{json.loads(name)}.'})
+        continue
+      node: dict = {
+        'issues': {'totalCount': repo.get('open_issues', 0)},
+        'pullRequests': {'totalCount': 0},
+        'watchers': {'totalCount': repo.get('subscribers', 0)},
+        'languages': {'nodes': [{'name': language} for language
+                                in self._languages(repo)]}}
+      for object_alias, path in objects.items():
+        node[object_alias] = self._object(repo, path)
+      data[alias] = node
+    body: dict = {'data': data}
+    if errors:
+      body['errors'] = errors
+    return body
+
+  def _object(self, repo: dict, path: str) -> dict:
+    '''
+    Returns the GraphQL tree or blob at a path of the default branch of a
+    repository, which only contains its README, or None if there is none.
+    '''
+    readme: str = repo.get('readme')
+    if readme is None:
+      return {'entries': []} if path == '' else None
+    readme_path: str = repo.get('readme_path') or 'README.md'
+    directory, _, file_name = readme_path.rpartition('/')
+    if path == readme_path:
+      return {'text': readme, 'isBinary': False}
+    if path == directory:
+      return {'entries': [{'name': file_name}]}
+    if path == '':
+      return {'entries': [{'name': directory.split('/')[0]}]}
+    return None
+
+  def _search_item(self, repo: dict, base: str) -> dict:
+    return {'id': repo['id'], 'name': repo['name'],
+            'html_url': f'https://github.com/{repo["owner"]}/{repo["name"]}',
+            'url': f'{base}/repos/{repo["owner"]}/{repo["name"]}',
+            'description': repo.get('description'),
+            'owner': {'login': repo['owner'], 'type': 'User',
+                      'avatar_url': None},
+            'created_at': repo['created_at'], 'updated_at': repo['created_at'],
+            'homepage': None, 'size': 100, 'license': None,
+            'stargazers_count': repo.get('stars', 0), 'forks_count': 0,
+            'fork': False, 'topics': [], 'archived': False,
+            'default_branch': 'main', 'language': repo.get('language'),
+            'has_projects': True, 'has_wiki': True, 'has_pages': False,
+            'has_discussions': False, 'has_issues': True}
+  # endregion
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+  '''Request handler of `FakeGitHubAPI`, bound to it by the api attribute.'''
+  api: FakeGitHubAPI = None
+  protocol_version: str = 'HTTP/1.1'
+  # headers and body are written separately, without TCP_NODELAY every
+  # keep-alive response would wait for the delayed ACK of the client
+  disable_nagle_algorithm: bool = True
+
+  # (token, resource) the current GET request was charged to
+  _charged: tuple = None
+
+  def log_message(self, *args) -> None:
+    pass  # the crawler logs its requests itself
+
+  def _not_modified(self, etag: str) -> bool:
+    '''Returns whether the conditional headers of the request still match.'''
+    if 'If-None-Match' in self.headers:
+      tags: list = [tag.strip() for tag
+                    in self.headers['If-None-Match'].split(',')]
+      return etag in tags or '*' in tags
+    if 'If-Modified-Since' in self.headers:
+      try:
+        return parsedate_to_datetime(self.api.last_modified) \
+          <= parsedate_to_datetime(self.headers['If-Modified-Since'])
+      except (TypeError, ValueError):
+        return False
+    return False
+
+  def _send(self, status: int, body, headers: dict = None,
+            raw: bool = False) -> None:
+    data: bytes = body if raw else json.dumps(body).encode('utf-8')
+    headers = dict(headers or {})
+    if status in (200, 204) and self._charged is not None:
+      headers['ETag'] = f'"{hashlib.sha1(data).hexdigest()}"'
+      headers['Last-Modified'] = self.api.last_modified
+      if self._not_modified(headers['ETag']):
+        self.api._refund(*self._charged, headers)
+        self.api._count(self.api.not_modified, self._charged[0])
+        self.send_response(304)
+        for key, value in headers.items():
+          self.send_header(key, value)
+        self.end_headers()
+        return
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/vnd.github.raw'
+                     if raw else 'application/json; charset=utf-8')
+    self.send_header('Content-Length', str(len(data)))
+    for key, value in headers.items():
+      self.send_header(key, value)
+    self.end_headers()
+    self.wfile.write(data)
+
+  def do_GET(self) -> None:
+    api: FakeGitHubAPI = self.api
+    self._charged = None
+    if api.latency:
+      time.sleep(api.latency)
+    url = urlparse(self.path)
+    query: dict = {key: values[0]
+                   for key, values in parse_qs(url.query).items()}
+    base: str = f'http://{self.headers["Host"]}'
+    authorized, token = api._authenticate(self.headers.get('Authorization'))
+    if not authorized:
+      api._count(api.rejected, 401)
+      return self._send(401, {'message': 'Bad credentials'})
+    if url.path == '/rate_limit':
+      resources: dict = api._resources(token)
+      return self._send(200, {'resources': resources,
+                              'rate': resources['core']})
+    resource: str = 'search' if url.path.startswith('/search/') else 'core'
+    allowed, headers = api._take(token, resource)
+    if not allowed:
+      api._count(api.rejected, 403)
+      return self._send(403, {'message': 'API rate limit exceeded'}, headers)
+    api._count(api.calls, token)
+    self._charged = (token, resource)
+    if url.path == '/search/repositories':
+      per_page: int = min(int(query.get('per_page', 30)), 100)
+      page: int = int(query.get('page', 1))
+      total, repos = api._search(query.get('q', ''), per_page, page)
+      if page * per_page < min(total, 1000):
+        next_query: str = urlencode({'q': query.get('q', ''),
+                                     'per_page': per_page, 'page': page + 1})
+        headers['Link'] = f'<{base}{url.path}?{next_query}>; rel="next"'
+      return self._send(200, {'total_count': total, 'incomplete_results': False,
+                              'items': [api._search_item(repo, base)
+                                        for repo in repos]}, headers)
+    parts: list = url.path.strip('/').split('/')
+    repo: dict = api._by_name.get(tuple(parts[1:3])) \
+      if parts[0] == 'repos' and len(parts) >= 3 else None
+    if repo is None:
+      return self._send(404, {'message': 'Not Found'}, headers)
+    repo_url: str = f'{base}/repos/{repo["owner"]}/{repo["name"]}'
+    rest: list = parts[3:]
+    if not rest:
+      return self._send(200, {'id': repo['id'], 'name': repo['name'],
+                              'open_issues': repo.get('open_issues', 0),
+                              'subscribers_count': repo.get('subscribers', 0),
+                              'languages_url': f'{repo_url}/languages',
+                              'contributors_url': f'{repo_url}/contributors'},
+                        headers)
+    if rest == ['languages']:
+      return self._send(200, api._languages(repo), headers)
+    if rest == ['contributors']:
+      n: int = repo.get('contributors', 0)
+      if n == 0:
+        return self._send(204, b'', headers, raw=True)
+      per_page: int = int(query.get('per_page', 30))
+      page: int = int(query.get('page', 1))
+      last: int = (n + per_page - 1) // per_page
+      if last > 1:
+        headers['Link'] = (f'<{repo_url}/contributors?per_page={per_page}'
+                           f'&page={last}>; rel="last"')
+      count: int = max(0, min(per_page, n - (page - 1) * per_page))
+      return self._send(200, [{'login': f'user{i}'} for i in range(count)],
+                        headers)
+    readme: str = repo.get('readme')
+    in_root: bool = readme is not None \
+      and '/' not in (repo.get('readme_path') or 'README.md')
+    if rest == ['readme'] or rest == ['contents', 'README.md']:
+      if readme is None or (rest[0] == 'contents' and not in_root):
+        return self._send(404, {'message': 'Not Found'}, headers)
+      content: bytes = readme.encode('utf-8')
+      if 'raw' in self.headers.get('Accept', '') and rest == ['readme']:
+        return self._send(200, content, headers, raw=True)
+      return self._send(200, {'name': 'README.md', 'encoding': 'base64',
+                              'content': base64.b64encode(content).decode()},
+                        headers)
+    if rest == ['contents']:
+      files: list = [] if not in_root else [
+        {'name': 'README.md', 'url': f'{repo_url}/contents/README.md'}]
+      return self._send(200, files, headers)
+    return self._send(404, {'message': 'Not Found'}, headers)
+
+  def do_POST(self) -> None:
+    api: FakeGitHubAPI = self.api
+    self._charged = None
+    if api.latency:
+      time.sleep(api.latency)
+    body: bytes = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+    if urlparse(self.path).path != '/graphql':
+      return self._send(404, {'message': 'Not Found'})
+    authorized, token = api._authenticate(self.headers.get('Authorization'))
+    if not authorized or token is None:
+      api._count(api.rejected, 401)
+      return self._send(401, {'message': 'This endpoint requires you to be '
+                                         'authenticated.'})
+    allowed, headers = api._take(token, 'graphql')
+    if not allowed:
+      api._count(api.rejected, 403)
+      return self._send(403, {'message': 'API rate limit exceeded'}, headers)
+    api._count(api.calls, token)
+    try:
+      query: str = json.loads(body)['query']
+    except (ValueError, KeyError, TypeError):
+      return self._send(400, {'message': 'Problems parsing JSON'}, headers)
+    self._send(200, api._graphql(query, int(headers['X-RateLimit-Remaining']),
+                                 int(headers['X-RateLimit-Reset'])), headers)
@@ -0,0 +1,165 @@
+import time
+import pandas as pd
+from .langid import LanguageDetector
+from .language import LinguistData
+from .log import logger
+
+
+# filters of the repositories found by the search, as used to create the files
+# of data/initial and data/appended in visualization.ipynb. Every filter takes
+# and returns a DataFrame and logs how many repositories it removed, so they
+# can be chained in any order, e.g. with apply_filters
+
+# non-programming main languages of front-end code that are accepted anyway
+ACCEPTED_NON_PROGRAMMING_LANGUAGES: list = ['CSS', 'Mermaid', 'Prisma', 'Riot',
+                                            'Svelte', 'Vue']
+
+
+def fill_na_values(df: pd.DataFrame) -> pd.DataFrame:
+  '''
+  Fills missing descriptions and homepage urls with "", licenses with
+  "UNLICENSED" and main languages with "NONE".
+  '''
+  df = df.copy()
+  for column, value in (('description', ''), ('homepage_url', ''),
+                        ('license', 'UNLICENSED'), ('main_language', 'NONE')):
+    if isinstance(df[column].dtype, pd.CategoricalDtype) \
+       and value not in df[column].cat.categories:
+      df[column] = df[column].cat.add_categories([value])
+    df[column] = df[column].fillna(value)
+  logger.info('Filled N/A values for "description", "homepage_url", '
+              '"license" and "main_language" with base values')
+  return df
+
+
+def filter_out_nocode(df: pd.DataFrame, min_size_kb: int = 50) \
+    -> pd.DataFrame:
+  '''
+  Removes repositories without main language and with less than min_size_kb
+  of content.
+  '''
+  n: int = df.shape[0]
+  df = df[df['main_language'] != 'NONE']
+  num_removed_lang: int = n - df.shape[0]
+  df = df[df['repo_size_kb'] >= min_size_kb]
+  num_removed_size: int = n - df.shape[0] - num_removed_lang
+  logger.info(f'Removed {num_removed_lang}/{n} repos due not having a '
+              'recognized programming language as main language on GitHub')
+  logger.info(f'Removed {num_removed_size}/{n - num_removed_lang} repos due '
+              f'not having >= {min_size_kb} kB of content')
+  return df
+
+
+def filter_out_nodesc(df: pd.DataFrame) -> pd.DataFrame:
+  '''Removes repositories with an empty description.'''
+  n: int = df.shape[0]
+  df = df[df['description'] != '']
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due to not having a '
+              'description')
+  return df
+
+
+def filter_out_nonprog(df: pd.DataFrame, lang: LinguistData = None) \
+    -> pd.DataFrame:
+  '''
+  Removes repositories whose main language is no programming language
+  according to GitHub, except for `ACCEPTED_NON_PROGRAMMING_LANGUAGES`. Every
+  distinct language is looked up once.
+  '''
+  n: int = df.shape[0]
+  lang = lang if lang is not None else LinguistData()
+  accepted: dict = {language: (language in ACCEPTED_NON_PROGRAMMING_LANGUAGES
+                               or lang.is_programming_language(language))
+                    for language in df['main_language'].dropna().unique()}
+  df = df[df['main_language'].astype(object).map(accepted).eq(True)]
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due to not being written '
+              'in a programming language recognized by GitHub')
+  return df
+
+
+def filter_out_archived(df: pd.DataFrame) -> pd.DataFrame:
+  '''Removes archived repositories.'''
+  n: int = df.shape[0]
+  df = df[df['is_archived'] == False]  # noqa: E712, NA are removed as well
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due to being archived')
+  return df
+
+
+def filter_out_notupdated(df: pd.DataFrame, years: int = 5,
+                          now: pd.Timestamp = None) -> pd.DataFrame:
+  '''
+  Removes repositories that were not updated in the given number of years
+  before now (default: today).
+  '''
+  n: int = df.shape[0]
+  now = now if now is not None else pd.Timestamp.today(tz='UTC')
+  df = df[pd.to_datetime(df['updated_at'], utc=True)
+          >= now - pd.Timedelta(days=365 * years)]
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due to not being updated '
+              f'in the last {years} years')
+  return df
+
+
+def filter_out_noreadme(df: pd.DataFrame) -> pd.DataFrame:
+  '''Removes repositories without README.'''
+  n: int = df.shape[0]
+  df = df.dropna(subset=['readme'])
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due having no Readme')
+  return df
+
+
+def filter_out_emptyreadme(df: pd.DataFrame) -> pd.DataFrame:
+  '''
+  Removes repositories whose README is the one generated by GitHub, i.e.
+  only the heading "# {name}" and at most one more line.
+  '''
+  n: int = df.shape[0]
+  generated: list = [isinstance(readme, str)
+                     and readme.startswith(f'# {name}')
+                     and len(readme.split('\n')) <= 2
+                     for name, readme in zip(df['name'], df['readme'])]
+  df = df[[not g for g in generated]]
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due to having the '
+              'generated README format')
+  return df
+
+
+def filter_out_nonenglish(df: pd.DataFrame, detector: LanguageDetector = None,
+                          column: str = 'description') -> pd.DataFrame:
+  '''
+  Removes repositories whose description (or other text column) is not
+  English according to the detector (default: an in-memory one). Texts
+  whose language can not be detected are kept if they are a url.
+  '''
+  import validators  # only needed by this filter
+  n: int = df.shape[0]
+  detector = detector if detector is not None \
+    else LanguageDetector(file_path=None)
+  languages: list = detector.detect(df[column].tolist())
+  english: list = []
+  for text, language in zip(df[column], languages):
+    if language is None and isinstance(text, str):
+      logger.info(f'Unable to detect language of "{text}"')
+      # validators returns a failure object instead of False
+      english.append(validators.url(text.strip()) is True)
+    else:
+      english.append(language == 'en')
+  df = df[english]
+  logger.info(f'Removed {n - df.shape[0]}/{n} repos due not having an English '
+              f'{column} text')
+  return df
+
+
+def apply_filters(df: pd.DataFrame, filters: list) -> pd.DataFrame:
+  '''
+  Applies the filters in order and logs the seconds each one took. Filters
+  with arguments are given as (filter, kwargs), e.g.
+  `(filter_out_nonenglish, {'detector': detector})`.
+  '''
+  for entry in filters:
+    func, kwargs = entry if isinstance(entry, tuple) else (entry, {})
+    start: float = time.perf_counter()
+    df = func(df, **kwargs)
+    logger.info(f'{func.__name__}: {df.shape[0]} repos left after '
+                f'{time.perf_counter() - start:.2f}s')
+  return df
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import Iterator
+from .schema import *
+
+
+class CrawlJournal:
+  '''
+  Class that records the progress of keyword searches page by page, so an
+  interrupted crawl can resume from the last completed page instead of
+  starting the search over.
+
+  Every completed page is committed in two steps: its parsed rows are spilled
+  to a Parquet file first, then the page is recorded in a SQLite journal
+  together with the url of the next page. A page only counts as committed once
+  its journal entry exists, so a crash in between just repeats that page.
+
+  Attributes
+  ----------
+  directory: str
+    String path to the directory containing the journal database and the
+    spilled pages. Missing directories are created.
+
+  Methods
+  -------
+  resume_point(keywords: list) -> tuple[int, str, bool]
+    Returns the number of committed pages, the url of the next page and
+    whether the search is finished.
+  commit(keywords: list, page: int, next_url: str, df: pd.DataFrame) -> None
+    Spills the rows of a completed page and records it in the journal.
+  load(keywords: list) -> pd.DataFrame
+    Returns all committed rows of a search or of all searches.
+  iter_pages(keywords: list) -> Iterator[list[dict]]
+    Yields the committed rows of a search page by page as records.
+  merge_into(csv_path: str) -> pd.DataFrame
+    Appends all committed rows to a CSV file, deduplicated on the repo id.
+
+  Examples
+  --------
+  ```py
+  journal = CrawlJournal('data/journal')
+  gh = GitHubSearch(pat, journal=journal)
+  for qualifier in gh.get_all_date_params(keywords):
+    gh.get_all_search_results(keywords + [qualifier])
+  journal.merge_into('data/initial/data.csv')
+  ```
+  '''
+
+  def __init__(self, directory: str = 'data/journal'):
+    self.logger = logging.getLogger('search_logger')
+    self.directory: str = directory
+    os.makedirs(os.path.join(directory, 'pages'), exist_ok=True)
+    self._lock: threading.Lock = threading.Lock()
+    self._schema: RepositorySchema = RepositorySchema()
+    self._db: sqlite3.Connection = sqlite3.connect(
+      os.path.join(directory, 'journal.sqlite'), check_same_thread=False)
+    self._db.execute('CREATE TABLE IF NOT EXISTS pages ('
+                     'query TEXT, keywords TEXT, qualifier TEXT, '
+                     'page INTEGER, next_url TEXT, num_rows INTEGER, '
+                     'spill_file TEXT, committed_at REAL, '
+                     'PRIMARY KEY (query, page))')
+    self._db.commit()
+
+  def _split_query(self, keywords: list) -> tuple[str, str, str]:
+    '''Returns the query, its plain keywords and its `created:` qualifier.'''
+    qualifier: str = ' '.join(k for k in keywords if k.startswith('created:'))
+    plain: str = ' '.join(k for k in keywords if not k.startswith('created:'))
+    return ' '.join(keywords), plain, qualifier
+
+  def resume_point(self, keywords: list) -> tuple[int, str, bool]:
+    '''
+    Returns where the search for the keywords has to continue.
+
+    Returns
+    -------
+    int
+      Number of pages that are already committed.
+    str
+      The url of the next page to request or None if no page is committed.
+    bool
+      True if the last page of the search is committed already.
+    '''
+    query, _, _ = self._split_query(keywords)
+    with self._lock:
+      row: tuple = self._db.execute(
+        'SELECT page, next_url FROM pages WHERE query = ? '
+        'ORDER BY page DESC LIMIT 1', (query,)).fetchone()
+    if row is None:
+      return 0, None, False
+    return row[0], row[1], row[1] is None
+
+  def commit(self, keywords: list, page: int, next_url: str,
+             df: pd.DataFrame) -> None:
+    '''
+    Commits a completed page of the search for the keywords.
+
+    Parameters
+    ----------
+    keywords: list
+      The keywords of the search including all qualifiers.
+    page: int
+      Number of the page, starting at 1.
+    next_url: str
+      The url of the following page or None if this was the last page.
+    df: pd.DataFrame
+      The parsed rows of this page.
+    '''
+    query, plain, qualifier = self._split_query(keywords)
+    digest: str = hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+    spill_file: str = os.path.join(self.directory, 'pages',
+                                   f'{digest}_{page:05d}.parquet')
+    # write to a temporary file first, so no half written page is picked up
+    df.to_parquet(f'{spill_file}.tmp', index=False)
+    os.replace(f'{spill_file}.tmp', spill_file)
+    with self._lock:
+      self._db.execute('INSERT OR REPLACE INTO pages VALUES '
+                       '(?, ?, ?, ?, ?, ?, ?, ?)',
+                       (query, plain, qualifier, page, next_url, len(df),
+                        spill_file, time.time()))
+      self._db.commit()
+
+  def load(self, keywords: list = None) -> pd.DataFrame:
+    '''
+    Returns all committed rows of the search for the keywords in page order,
+    or of all recorded searches if no keywords are given, typed by
+    `RepositorySchema`.
+    '''
+    with self._lock:
+      if keywords is None:
+        rows: list = self._db.execute(
+          'SELECT spill_file FROM pages ORDER BY committed_at').fetchall()
+      else:
+        query, _, _ = self._split_query(keywords)
+        rows: list = self._db.execute(
+          'SELECT spill_file FROM pages WHERE query = ? ORDER BY page',
+          (query,)).fetchall()
+    frames: list = [pd.read_parquet(spill_file) for spill_file, in rows]
+    frames = [df for df in frames if len(df) > 0]
+    if not frames:
+      return pd.DataFrame()
+    return self._schema.apply(pd.concat(frames, axis=0, ignore_index=True))
+
+  def iter_pages(self, keywords: list) -> Iterator[list[dict]]:
+    '''
+    Yields the committed rows of the search for the keywords page by page as
+    records, in the same form `GitHubSearch.iter_search_pages` yields them.
+    '''
+    query, _, _ = self._split_query(keywords)
+    with self._lock:
+      rows: list = self._db.execute(
+        'SELECT spill_file FROM pages WHERE query = ? ORDER BY page',
+        (query,)).fetchall()
+    for spill_file, in rows:
+      yield pq.read_table(spill_file).to_pylist()
+
+  def merge_into(self, csv_path: str = 'data/initial/data.csv') -> pd.DataFrame:
+    '''
+    Appends all committed rows to the CSV file at csv_path. Rows with a repo
+    id that is already in the file, or that occurs multiple times across the
+    searches, are only kept once (the first occurrence wins).
+
+    Returns
+    -------
+    pd.DataFrame
+      The merged contents written to csv_path.
+    '''
+    df_new: pd.DataFrame = self.load()
+    if os.path.exists(csv_path):
+      df_old: pd.DataFrame = self._schema.load(csv_path)
+      df_new = df_new[~df_new['id'].isin(df_old['id'])] if len(df_new) \
+        else df_new
+      df: pd.DataFrame = pd.concat([df_old, df_new], axis=0,
+                                   ignore_index=True)
+    else:
+      df: pd.DataFrame = df_new
+    n: int = len(df)
+    # categories of both frames are merged by applying the schema again
+    df = self._schema.apply(df.drop_duplicates(subset='id', keep='first',
+                                               ignore_index=True))
+    self.logger.info(f'Merged {len(df_new)} journaled rows into {csv_path}, '
+                     f'dropped {n - len(df)} duplicates')
+    self._schema.save(df, csv_path)
+    return df
+
+  def close(self) -> None:
+    '''Closes the journal database. Do not use this object afterwards.'''
+    self._db.close()
@@ -0,0 +1,184 @@
+import importlib.util
+import logging
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+
+
+def _load_keyword_index() -> type:
+  '''
+  Returns `KeywordIndex` of code/filters/screening/keywords.py, the single
+  implementation shared with the literature screening. Only that file is
+  loaded, not the screening package, which imports the BibTeX and RIS
+  libraries. It is registered as "screening.keywords", so the screening
+  package reuses it if it is imported later and both use the same class.
+  '''
+  name: str = 'screening.keywords'
+  if name not in sys.modules:
+    spec = importlib.util.spec_from_file_location(name, os.path.join(
+      os.path.dirname(os.path.abspath(__file__)), '..', '..', 'filters',
+      'screening', 'keywords.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+      spec.loader.exec_module(module)
+    except BaseException:
+      del sys.modules[name]
+      raise
+  return sys.modules[name].KeywordIndex
+
+
+class KeywordQuery:
+  '''
+  Class that holds one line of the keyword file, i.e. one GitHub repository
+  search, in a form that can be checked against repositories that are
+  already downloaded.
+
+  Quoted phrases and plain words are terms. Terms next to each other or
+  joined by AND must all occur, OR separates alternatives (AND binds
+  stronger) and NOT excludes the next term. `in:` qualifiers name the fields
+  that are searched, all other qualifiers (e.g. `created:`) are ignored.
+
+  Attributes
+  ----------
+  query: str
+    The line of the keyword file.
+  groups: list[list[str]]
+    Alternatives of terms that must occur together, case folded.
+  excluded: list[str]
+    Terms that must not occur, case folded.
+  fields: list[str]
+    Columns of the repository frame that are searched, by default the name,
+    description and topics like on GitHub.
+
+  Methods
+  -------
+  terms() -> list[str]
+    Returns all terms of the query.
+  '''
+
+  field_names: dict = {'name': 'name', 'description': 'description',
+                       'readme': 'readme', 'topics': 'topics'}
+
+  def __init__(self, query: str):
+    self.query: str = query
+    self.groups: list = [[]]
+    self.excluded: list = []
+    self.fields: list = []
+    negate: bool = False
+    for quoted, word in re.findall(r'"([^"]*)"|(\S+)', query):
+      if word in ('OR', 'AND', 'NOT'):
+        if word == 'OR' and self.groups[-1]:
+          self.groups.append([])
+        negate = word == 'NOT'
+        continue
+      if word and ':' in word:
+        qualifier, _, value = word.partition(':')
+        if qualifier == 'in' and value.lower() in self.field_names:
+          self.fields.append(self.field_names[value.lower()])
+        continue
+      term: str = (quoted or word).casefold()
+      if negate:
+        self.excluded.append(term)
+      else:
+        self.groups[-1].append(term)
+      negate = False
+    self.groups = [group for group in self.groups if group]
+    self.fields = self.fields or ['name', 'description', 'topics']
+
+  def terms(self) -> list[str]:
+    '''Returns all terms of the query, positive and excluded ones.'''
+    return [term for group in self.groups for term in group] + self.excluded
+
+  def __repr__(self) -> str:
+    return f'KeywordQuery({self.query!r})'
+
+
+class RelevanceScreen:
+  '''
+  Class that checks downloaded repositories against all searches of the
+  keyword file at once, e.g. to see which searches a repository would still
+  be found by after its README was fetched, or to screen full READMEs.
+
+  The terms of all queries are compiled into one `KeywordIndex`, so every
+  field is scanned once, no matter how many queries and terms there are.
+  Terms match case-insensitively as whole words.
+
+  Attributes
+  ----------
+  queries: list[KeywordQuery]
+    The searches, in keyword file order.
+  index: KeywordIndex
+    The compiled terms of all queries, see code/filters/screening/keywords.py.
+  hits: pd.DataFrame
+    All term occurrences of the last screening, see `KeywordIndex.scan`.
+
+  Methods
+  -------
+  from_file(file_path: str) -> RelevanceScreen
+    Returns the screen of all lines of a keyword file.
+  screen(df: pd.DataFrame) -> pd.DataFrame
+    Returns for every repository which queries it matches.
+
+  Examples
+  --------
+  ```py
+  screen = RelevanceScreen.from_file('config/keywords.txt')
+  matches = screen.screen(df)
+  df = df[matches['hits'] > 0]
+  ```
+  '''
+
+  def __init__(self, queries: list):
+    self.logger = logging.getLogger('search_logger')
+    self.queries: list = [query if isinstance(query, KeywordQuery)
+                          else KeywordQuery(query) for query in queries]
+    terms: list = list(dict.fromkeys(term for query in self.queries
+                                     for term in query.terms()))
+    # loaded on first use, see _load_keyword_index
+    self.index = _load_keyword_index()(terms, whole_words=True)
+    self.hits: pd.DataFrame = None
+
+  @classmethod
+  def from_file(cls, file_path: str = 'config/keywords.txt') \
+      -> 'RelevanceScreen':
+    '''Returns the screen of all non-empty lines of a keyword file.'''
+    with open(file_path, 'r', encoding='utf-8') as file:
+      return cls([line.strip() for line in file if line.strip()])
+
+  def screen(self, df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Returns a frame with the index of df that has one boolean column per
+    query (named by its line in the keyword file) stating whether the
+    repository matches it, and the column "hits" with the number of matched
+    queries. Fields that are missing in df are skipped.
+    '''
+    fields: list = [field for field in
+                    dict.fromkeys(f for q in self.queries for f in q.fields)
+                    if field in df.columns]
+    texts: pd.DataFrame = df[fields].copy()
+    if 'topics' in texts.columns:
+      texts['topics'] = texts['topics'].map(
+        lambda topics: ' '.join(topics)
+        if isinstance(topics, (list, np.ndarray)) else topics)
+    self.hits = self.index.scan(texts, fields)
+    n: int = len(df)
+    result: pd.DataFrame = pd.DataFrame(index=df.index)
+    for i, query in enumerate(self.queries):
+      found: pd.DataFrame = self.hits[self.hits['field'].isin(query.fields)]
+      rows: dict = {term: np.zeros(n, dtype=bool) for term in query.terms()}
+      for term, group in found.groupby('keyword', observed=True)['row']:
+        if term in rows:
+          rows[term][group.to_numpy()] = True
+      matches: np.ndarray = np.zeros(n, dtype=bool)
+      for group in query.groups:
+        matches |= np.logical_and.reduce([rows[term] for term in group])
+      for term in query.excluded:
+        matches &= ~rows[term]
+      result[i] = matches
+    result['hits'] = result.sum(axis=1)
+    self.logger.info(f'{(result["hits"] > 0).sum()}/{n} repos match at least '
+                     f'one of {len(self.queries)} searches')
+    return result
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class LanguageDetector:
+  '''
+  Class that detects the language of many texts (e.g. descriptions or
+  READMEs of repositories) with langdetect, in parallel and only once per
+  text.
+
+  Only the first max_chars characters of a text are used, which is enough
+  for langdetect and bounds the time per text. The results are stored in a
+  SQLite database keyed by the SHA-256 of that prefix, so texts that were
+  already detected in an earlier session are never detected again. langdetect
+  is seeded, which makes its results deterministic and the cache valid. The
+  remaining texts are split into batches that run in a pool of worker
+  processes, small amounts in the calling process.
+
+  Attributes
+  ----------
+  file_path: str
+    String path to the SQLite database file. Missing directories are created.
+    None keeps the results in memory only.
+  max_chars: int
+    Number of leading characters of a text that are used for detection.
+  seed: int
+    Seed of langdetect.
+  processes: int
+    Number of worker processes, None for one per CPU.
+  batch_size: int
+    Number of texts per task of a worker.
+  stats: dict
+    Number of texts, cache hits, detected texts and seconds of the last
+    call of `detect`.
+
+  Methods
+  -------
+  detect(texts: list) -> list[str]
+    Returns the language code of every text, None if it has none.
+  close() -> None
+    Closes the database connection.
+
+  Examples
+  --------
+  ```py
+  detector = LanguageDetector('cache/languages.sqlite')
+  df['description_language'] = detector.detect(df['description'].tolist())
+  ```
+  '''
+
+  def __init__(self, file_path: str = 'cache/languages.sqlite',
+               max_chars: int = 1000, seed: int = 0, processes: int = None,
+               batch_size: int = 256):
+    self.logger = logging.getLogger('search_logger')
+    self.file_path: str = file_path
+    self.max_chars: int = max_chars
+    self.seed: int = seed
+    self.processes: int = processes
+    self.batch_size: int = batch_size
+    self.stats: dict = {}
+    if file_path is not None and os.path.dirname(file_path):
+      os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    self._db: sqlite3.Connection = sqlite3.connect(
+      file_path if file_path is not None else ':memory:')
+    self._db.execute('CREATE TABLE IF NOT EXISTS languages ('
+                     'key TEXT PRIMARY KEY, language TEXT)')
+
+  def _key(self, prefix: str) -> str:
+    return hashlib.sha256(f'{self.seed}\0{prefix}'.encode('utf-8')) \
+      .hexdigest()
+
+  def detect(self, texts: list) -> list[str]:
+    '''
+    Returns the language code ("en", "de", ...) of every text in order.
+    Texts that are not strings or that langdetect can not classify (e.g.
+    urls or emojis only) get None.
+    '''
+    start: float = time.perf_counter()
+    prefixes: list = [text.strip()[:self.max_chars]
+                      if isinstance(text, str) else None for text in texts]
+    keys: list = [self._key(p) if p is not None else None for p in prefixes]
+    known: dict = {}
+    unique: list = list(dict.fromkeys(key for key in keys if key is not None))
+    # the number of variables of a SQLite statement is limited
+    for i in range(0, len(unique), 500):
+      chunk: list = unique[i:i + 500]
+      known.update(self._db.execute(
+        f'SELECT key, language FROM languages WHERE key IN '
+        f'({",".join("?" * len(chunk))})', chunk).fetchall())
+    missing: dict = {}
+    for key, prefix in zip(keys, prefixes):
+      if key is not None and key not in known:
+        missing[key] = prefix
+    if missing:
+      detected: list = self._detect_all(list(missing.values()))
+      known.update(zip(missing, detected))
+      with self._db:
+        self._db.executemany('INSERT OR REPLACE INTO languages VALUES (?, ?)',
+                             zip(missing, detected))
+    self.stats = {'texts': len(texts), 'cached': len(unique) - len(missing),
+                  'detected': len(missing),
+                  'seconds': time.perf_counter() - start}
+    self.logger.info(f'Detected the language of {len(missing)} texts, '
+                     f'{self.stats["cached"]} were cached '
+                     f'({self.stats["seconds"]:.2f}s)')
+    return [known[key] if key is not None else None for key in keys]
+
+  def _detect_all(self, prefixes: list) -> list:
+    '''Returns the languages of the prefixes, in batches in worker processes.'''
+    batches: list = [prefixes[i:i + self.batch_size]
+                     for i in range(0, len(prefixes), self.batch_size)]
+    if len(batches) == 1 or self.processes == 1:
+      return [language for batch in batches
+              for language in LanguageDetector._detect_batch(
+                {'texts': batch, 'seed': self.seed})]
+    with ProcessPoolExecutor(max_workers=self.processes) as executor:
+      results = executor.map(LanguageDetector._detect_batch,
+                             [{'texts': batch, 'seed': self.seed}
+                              for batch in batches])
+      return [language for batch in results for language in batch]
+
+  @staticmethod
+  def _detect_batch(task: dict) -> list:
+    '''Returns the languages of a batch of texts in a worker process.'''
+    # imported here, so the crawler does not depend on langdetect
+    from langdetect import DetectorFactory, detect
+    from langdetect.lang_detect_exception import LangDetectException
+    # every detection draws from a generator seeded with this value
+    DetectorFactory.seed = task['seed']
+    languages: list = []
+    for text in task['texts']:
+      try:
+        languages.append(detect(text))
+      except LangDetectException:  # no letters, e.g. urls or emojis only
+        languages.append(None)
+    return languages
+
+  def close(self) -> None:
+    '''Closes the database connection.'''
+    self._db.close()
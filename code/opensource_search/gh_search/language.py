@@ -1,4 +1,8 @@
+import hashlib
+import json
 import logging
+import os
+import threading
 import yaml
 
 
@@ -11,6 +15,11 @@ class LinguistData:
   file was downloaded from the official [github-linguist](https://github.com/github-linguist/)
   account on 2024-01-30.
 
+  Parsing the YAML file is slow, so the compiled lookup tables are written to
+  a JSON sidecar file next to it (`<file_path>.cache.json`) that is keyed on
+  the hash of the YAML file. The tables are also shared by all instances of
+  this class within a process and are only loaded on first use.
+
   Attributes
   ----------
   file_path: str
@@ -18,17 +27,22 @@ class LinguistData:
   lookup_table: dict
     Dictionary containing information about every supported language of GitHub
     and whether GitHub considers that language a programming language or not.
+    Every language is found by its name, its lower-cased name and its aliases.
 
   Methods
   -------
   _read_linguist_data() -> dict
     Reads the specified language file and returns its contents as a dict.
   _build_loopuk_table() -> dict
-    Builds a dict that contains each supported language string as key and
-    states if that language is a programming language as bool value.
+    Builds the dicts that map each supported language string, alias and file
+    extension to the data of the corresponding language.
   is_programming_language(language: str) -> bool
-    Returns true if the given language tag (as used by GitHub, case-sensitive)
-    is categorized as programming language.
+    Returns true if the given language tag (as used by GitHub) is categorized
+    as programming language.
+  canonical_name(language: str) -> str
+    Returns the name GitHub uses for a language tag, alias or lower-cased name.
+  language_for_extension(extension: str) -> str
+    Returns the name of the language a file extension belongs to.
 
   Examples
   --------
@@ -38,29 +52,99 @@ class LinguistData:
   lang = LinguistData()
   print(lang.is_programming_language('TeX'))  # False, TeX is a markup language
   print(lang.is_programming_language('Kotlin'))  # True
+  print(lang.canonical_name('cpp'))  # C++
+  print(lang.language_for_extension('.kt'))  # Kotlin
   ```
   '''
 
+  # absolute file path -> compiled tables, shared by all instances
+  _tables: dict = {}
+  _tables_lock: threading.Lock = threading.Lock()
+
   def __init__(self, file_path: str = 'config/languages.yaml'):
     self._file_path: str = file_path
-    self._lookup_table: dict = self._build_loopuk_table()
+    self._missing: set = set()  # languages that were already warned about
+
+  @property
+  def _lookup_table(self) -> dict:
+    return self._load_tables()['names']
+
+  def _load_tables(self) -> dict:
+    '''
+    Returns the compiled tables of the language file. They are built once per
+    process, either from the sidecar file or, if that is missing or outdated,
+    from the YAML file itself.
+    '''
+    key: str = os.path.abspath(self._file_path)
+    tables: dict = LinguistData._tables.get(key)
+    if tables is not None:
+      return tables
+    with LinguistData._tables_lock:
+      if key not in LinguistData._tables:
+        LinguistData._tables[key] = self._load_or_build_sidecar()
+    return LinguistData._tables[key]
+
+  def _load_or_build_sidecar(self) -> dict:
+    with open(self._file_path, 'rb') as file:
+      digest: str = hashlib.sha256(file.read()).hexdigest()
+    sidecar_path: str = f'{self._file_path}.cache.json'
+    try:
+      with open(sidecar_path, 'r', encoding='utf-8') as file:
+        sidecar: dict = json.load(file)
+      if sidecar.get('sha256') == digest:
+        return sidecar
+    except (OSError, ValueError):
+      pass  # missing or broken sidecar, build it again
+    tables: dict = self._build_loopuk_table()
+    tables['sha256'] = digest
+    try:
+      with open(sidecar_path, 'w', encoding='utf-8') as file:
+        json.dump(tables, file)
+    except OSError as e:
+      logging.getLogger('search_logger').warning(
+        f'Could not write language cache "{sidecar_path}": {e}')
+    return tables
 
   def _read_linguist_data(self) -> dict:
     '''Reads the languages.yaml file and returns the contents as dict.'''
     with open(self._file_path, 'r', encoding='utf-8') as file:
-      linguist_data: dict = yaml.safe_load(file)
+      linguist_data: dict = yaml.load(file, Loader=getattr(yaml, 'CSafeLoader',
+                                                           yaml.SafeLoader))
     return linguist_data
 
   def _build_loopuk_table(self) -> dict:
     '''
-    Builds a dict that contains each supported language string as key and
-    states if that language is a programming language as bool value.
+    Builds the lookup tables of the language file.
+
+    "names" maps each supported language string, its lower-cased version and
+    all of its aliases to whether it is a programming language, "canonical"
+    maps them to the language string itself, and "extensions" maps every file
+    extension to the language string it belongs to. Extensions used by
+    multiple languages belong to the first language that lists it as its
+    primary extension, or else to the first language that lists it at all.
     '''
     raw: dict = self._read_linguist_data()
-    lookup_table: dict = {}
+    names: dict = {}
+    canonical: dict = {}
+    extensions: dict = {}
     for lang in raw.keys():
-      lookup_table.update({lang: raw[lang]['type'] == 'programming'})
-    return lookup_table
+      is_programming: bool = raw[lang]['type'] == 'programming'
+      keys: list = ([lang, lang.lower()]
+                    + [alias.lower() for alias in raw[lang].get('aliases', [])])
+      for key in keys:
+        # exact names always win over aliases of other languages
+        if key not in names or key == lang:
+          names[key] = is_programming
+          canonical[key] = lang
+    primary: dict = {}  # extensions that are the first one of a language
+    for lang in raw.keys():
+      for position, extension in enumerate(raw[lang].get('extensions', [])):
+        extension = extension.lower()
+        if position == 0:
+          primary.setdefault(extension, lang)
+        extensions.setdefault(extension, lang)
+    extensions.update(primary)
+    return {'names': names, 'canonical': canonical, 'extensions': extensions}
 
   def is_programming_language(self, language: str) -> bool:
     '''
@@ -71,8 +155,8 @@ class LinguistData:
     ----------
     language: str
       The language tag as used by GitHub on their website or in their API
-      responses e.g. C++ has the tag "C++", using "cpp" or "c++" will result in
-      a False even though C++ is a supported language.
+      responses e.g. C++ has the tag "C++". Lower-cased tags ("c++") and the
+      aliases of the language file ("cpp") are accepted as well.
 
     Returns
     -------
@@ -81,8 +165,33 @@ class LinguistData:
       classifies as programming language. False if the language is not supported
       or is a non-programming language e.g. markup languages.
     '''
-    if language not in self._lookup_table.keys():
-      logging.getLogger('search_logger').warning(f'"{language}" not found in '
-                                                 'GitHub languages file')
+    is_programming: bool = self._lookup_table.get(language)
+    if is_programming is None and isinstance(language, str):
+      is_programming = self._lookup_table.get(language.lower())
+    if is_programming is None:
+      # only warn once per unknown language
+      if language is not None and language not in self._missing:
+        self._missing.add(language)
+        logging.getLogger('search_logger').warning(f'"{language}" not found '
+                                                   'in GitHub languages file')
       return False
-    return self._lookup_table[language]
+    return is_programming
+
+  def canonical_name(self, language: str) -> str:
+    '''
+    Returns the language string GitHub uses for a language tag, lower-cased
+    tag or alias e.g. "C++" for "cpp", or None if the language is unknown.
+    '''
+    canonical: dict = self._load_tables()['canonical']
+    return canonical.get(language, canonical.get(str(language).lower()))
+
+  def language_for_extension(self, extension: str) -> str:
+    '''
+    Returns the language string of the language a file extension (with or
+    without leading dot, case-insensitive) belongs to, or None if it is
+    unknown.
+    '''
+    extension = extension.lower()
+    if not extension.startswith('.'):
+      extension = f'.{extension}'
+    return self._load_tables()['extensions'].get(extension)
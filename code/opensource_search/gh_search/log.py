@@ -1,11 +1,22 @@
 import logging
+import os
 
 
-# basic logger that prints to std:out and to a file called 'search.log'
+# basic logger that prints to std:out and to the file 'data/logs/search.log'
+# of code/opensource_search, wherever the package is imported from
 # use logger.(debug|info|warning|error|critical)() when calling
+LOG_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                             'data', 'logs', 'search.log')
+os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
 logger = logging.getLogger('search_logger')
 logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s - (%(process)d) %(levelname)s: '
                            '%(message)s',
-                    handlers=[logging.FileHandler('search.log'),
-                              logging.StreamHandler()])
\ No newline at end of file
+                    # the file is only created once something is logged
+                    handlers=[logging.FileHandler(LOG_PATH, delay=True),
+                              logging.StreamHandler()])
+
+# keep the debug output of plotting libraries (e.g. font matching) used in
+# the notebooks out of the search log
+logging.getLogger('matplotlib').setLevel(logging.WARNING)
+logging.getLogger('PIL').setLevel(logging.WARNING)
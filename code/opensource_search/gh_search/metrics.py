@@ -0,0 +1,213 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import urlparse
+import numpy as np
+import pandas as pd
+
+
+class CrawlMetrics:
+  '''
+  Class that records where the time of a crawl goes, e.g. to catch throughput
+  regressions or to see whether a crawl is stuck on its quota, on the network
+  or on parsing.
+
+  `GitHubSearch` records one entry per API call (including all its retries)
+  with the seconds spent on the network, waiting for a rate limit reset and
+  backing off after failures, the received body bytes, the number of attempts
+  and the final status. Crawl steps such as the date partitioning, the search
+  pagination and the enrichment are recorded as stages with their wall time,
+  and every call is attributed to the innermost stage that was active when it
+  finished.
+
+  The object is thread-safe and shared by all worker threads of a search.
+  Worker processes record into their own objects, which can be combined with
+  `merge` afterwards.
+
+  Attributes
+  ----------
+  requests: list
+    One tuple per recorded call, see `REQUEST_COLUMNS`.
+  stages: list
+    One (stage, start, seconds) tuple per finished stage.
+
+  Methods
+  -------
+  record(url, resource, status, ...) -> None
+    Records a finished API call.
+  stage(name: str) -> contextmanager
+    Records the wall time of the enclosed block as stage.
+  merge(other: CrawlMetrics) -> None
+    Appends the calls and stages of another object.
+  frame() -> pd.DataFrame
+    Returns the recorded calls as DataFrame.
+  summary() -> dict
+    Returns the totals, latency percentiles, endpoints and stages as dict.
+  export(file_path: str) -> dict
+    Writes the summary to a JSON file and returns it.
+
+  Examples
+  --------
+  ```py
+  metrics = CrawlMetrics()
+  gh = GitHubSearch(pat, metrics=metrics)
+  df = gh.get_all_search_results(['ema'])
+  metrics.export('data/metrics.json')
+  ```
+  '''
+
+  REQUEST_COLUMNS: list = ['stage', 'endpoint', 'resource', 'status',
+                           'attempts', 'bytes', 'seconds', 'network_seconds',
+                           'rate_limit_seconds', 'backoff_seconds', 'cached']
+
+  def __init__(self):
+    self._lock: threading.Lock = threading.Lock()
+    self.requests: list = []
+    self.stages: list = []
+    self._active: list = []  # names of the entered stages, innermost last
+
+  def __getstate__(self) -> dict:
+    # objects are returned from worker processes, locks can not be pickled
+    state: dict = self.__dict__.copy()
+    del state['_lock']
+    return state
+
+  def __setstate__(self, state: dict) -> None:
+    self.__dict__.update(state)
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def endpoint(url: str) -> str:
+    '''
+    Returns the path of an API url with the repository replaced by a
+    placeholder, e.g. "/repos/{repo}/languages".
+    '''
+    return re.sub(r'/repos/[^/]+/[^/]+', '/repos/{repo}',
+                  urlparse(url).path) or '/'
+
+  def record(self, url: str, resource: str, status: int, attempts: int = 1,
+             num_bytes: int = 0, seconds: float = 0,
+             network_seconds: float = 0, rate_limit_seconds: float = 0,
+             backoff_seconds: float = 0, cached: bool = False) -> None:
+    '''
+    Records a finished API call.
+
+    Parameters
+    ----------
+    url: str
+      The requested url, query parameters are ignored.
+    resource: str
+      Rate limit resource of the call, e.g. "search" or "core".
+    status: int
+      HTTP status of the last response, None if no response was received.
+    attempts: int
+      Number of requests that were sent, i.e. 1 + the number of retries.
+    num_bytes: int
+      Received body bytes of all attempts.
+    seconds: float
+      Wall time of the whole call.
+    network_seconds: float
+      Seconds spent sending requests and receiving responses.
+    rate_limit_seconds: float
+      Seconds spent waiting for a token, i.e. for a rate limit reset.
+    backoff_seconds: float
+      Seconds spent sleeping before retrying failed attempts.
+    cached: bool
+      Flag that states if the body was answered by the response cache.
+    '''
+    with self._lock:
+      self.requests.append((self._active[-1] if self._active else None,
+                            self.endpoint(url), resource, status, attempts,
+                            num_bytes, seconds, network_seconds,
+                            rate_limit_seconds, backoff_seconds, cached))
+
+  @contextmanager
+  def stage(self, name: str) -> Iterator[None]:
+    '''Records the wall time of the enclosed block as stage called name.'''
+    with self._lock:
+      self._active.append(name)
+    start: float = time.time()
+    try:
+      yield
+    finally:
+      seconds: float = time.time() - start
+      with self._lock:
+        self._active.remove(name)
+        self.stages.append((name, start, seconds))
+
+  def merge(self, other: 'CrawlMetrics') -> None:
+    '''Appends the calls and stages of other, e.g. of a worker process.'''
+    with self._lock:
+      self.requests.extend(other.requests)
+      self.stages.extend(other.stages)
+
+  def frame(self) -> pd.DataFrame:
+    '''Returns one row per recorded call with `REQUEST_COLUMNS`.'''
+    with self._lock:
+      requests: list = list(self.requests)
+    return pd.DataFrame.from_records(requests, columns=self.REQUEST_COLUMNS)
+
+  def summary(self) -> dict:
+    '''
+    Returns a JSON serializable summary of the recorded calls and stages.
+
+    "totals" sums up all calls and gives the network latency percentiles in
+    milliseconds, "status" counts the final status codes (-1 for calls
+    without response), "endpoints" and "stages" break the totals down.
+    Stages of the same name are summed up. Their "other_seconds" are the
+    wall seconds not spent on calls (e.g. parsing), which is only meaningful
+    for stages that send their calls one after another, as calls of
+    concurrent workers overlap.
+    '''
+    df: pd.DataFrame = self.frame()
+    stages: pd.DataFrame = pd.DataFrame.from_records(
+      self.stages, columns=['stage', 'start', 'wall_seconds'])
+    summary: dict = {'totals': self._totals(df),
+                     'status': {str(status): int(n) for status, n in
+                                df['status'].fillna(-1).astype(int)
+                                .value_counts().sort_index().items()},
+                     'endpoints': {}, 'stages': {}}
+    for endpoint, group in df.groupby('endpoint', sort=True):
+      summary['endpoints'][endpoint] = self._totals(group)
+    for name, group in stages.groupby('stage', sort=False):
+      totals: dict = self._totals(df[df['stage'] == name])
+      wall: float = float(group['wall_seconds'].sum())
+      totals['wall_seconds'] = wall
+      totals['runs'] = len(group)
+      totals['other_seconds'] = max(0.0, wall - totals['network_seconds']
+                                    - totals['rate_limit_seconds']
+                                    - totals['backoff_seconds'])
+      totals['requests_per_second'] = totals['requests'] / wall \
+        if wall > 0 else 0.0
+      summary['stages'][name] = totals
+    return summary
+
+  def _totals(self, df: pd.DataFrame) -> dict:
+    latency: np.ndarray = df.loc[~df['cached'].astype(bool),
+                                 'network_seconds'].to_numpy(dtype=float)
+    percentiles: list = np.percentile(latency, [50, 90, 99]).tolist() \
+      if len(latency) else [0.0, 0.0, 0.0]
+    return {'requests': len(df), 'attempts': int(df['attempts'].sum()),
+            'retries': int((df['attempts'] - 1).clip(lower=0).sum()),
+            'errors': int((df['status'].isna() | (df['status'] >= 400)).sum()),
+            'cached': int(df['cached'].astype(bool).sum()),
+            'bytes': int(df['bytes'].sum()),
+            'seconds': float(df['seconds'].sum()),
+            'network_seconds': float(df['network_seconds'].sum()),
+            'rate_limit_seconds': float(df['rate_limit_seconds'].sum()),
+            'backoff_seconds': float(df['backoff_seconds'].sum()),
+            'latency_ms': {'p50': percentiles[0] * 1000,
+                           'p90': percentiles[1] * 1000,
+                           'p99': percentiles[2] * 1000,
+                           'max': float(latency.max()) * 1000
+                           if len(latency) else 0.0}}
+
+  def export(self, file_path: str) -> dict:
+    '''Writes the `summary` to a JSON file and returns it.'''
+    summary: dict = self.summary()
+    with open(file_path, 'w', encoding='utf-8') as file:
+      json.dump(summary, file, indent=2)
+    return summary
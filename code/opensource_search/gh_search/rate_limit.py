@@ -0,0 +1,371 @@
+import logging
+import random
+import threading
+import time
+import requests
+
+
+class RateLimitGovernor:
+  '''
+  Class that keeps track of the GitHub API rate limits locally by reading the
+  rate limit headers of every response instead of polling `/rate_limit`.
+
+  Every resource (`search`, `core`, ...) gets its own bucket holding the
+  remaining calls of the current time frame, its size and the timestamp of its
+  reset. Before a request is sent, `acquire` takes one call from the bucket
+  and only sleeps if the bucket is empty, and then exactly until its reset.
+  After a response arrives, `update` syncs the bucket with the headers GitHub
+  sent along. Secondary rate limits (`Retry-After` or 403/429 responses that
+  are not caused by an empty bucket) block all resources until they are over.
+
+  The object is thread-safe and can be shared by multiple worker threads. If
+  it is created with a `multiprocessing.Manager`, its state lives in the
+  manager process and the object can also be shared by multiple worker
+  processes, so they all draw from the same budget.
+
+  Attributes
+  ----------
+  max_backoff: float
+    Upper bound in seconds for a single backoff wait of a failed request.
+  manager: multiprocessing.managers.SyncManager
+    Optional started manager that holds the state shared between processes.
+
+  Methods
+  -------
+  acquire(resource: str) -> float
+    Takes one call from the bucket of the resource, waiting for its reset if
+    it is empty. Returns the number of seconds spent sleeping.
+  try_acquire(resource: str) -> float
+    Takes one call from the bucket of the resource if it is not empty and
+    returns 0, otherwise returns the number of seconds to wait.
+  update(response: requests.Response, resource: str) -> None
+    Updates the bucket of the resource using the headers of the response.
+  backoff(response: requests.Response, attempt: int) -> float
+    Returns the number of seconds to wait before retrying a failed request.
+  remaining(resource: str) -> int
+    Returns the locally known number of remaining calls of the resource.
+  seed(resources: dict) -> None
+    Seeds the buckets with the contents of a `/rate_limit` response.
+
+  Examples
+  --------
+  ```py
+  governor = RateLimitGovernor()
+  governor.acquire('search')
+  r = session.get('https://api.github.com/search/repositories?q=ema')
+  governor.update(r, 'search')
+
+  # shared by a pool of worker processes
+  with multiprocessing.Manager() as manager:
+    governor = RateLimitGovernor(manager=manager)
+  ```
+  '''
+
+  def __init__(self, max_backoff: float = 300, manager=None):
+    self.logger = logging.getLogger('search_logger')
+    self.max_backoff: float = max_backoff
+    # resource -> {'remaining': int?, 'limit': int?, 'reset': float}
+    # `remaining` is None as long as no response for the resource was seen.
+    # "blocked_until" of _state is set by secondary rate limits
+    if manager is None:
+      self._lock = threading.Lock()
+      self._buckets: dict = {}
+      self._state: dict = {'blocked_until': 0}
+    else:
+      self._lock = manager.Lock()
+      self._buckets: dict = manager.dict()
+      self._state: dict = manager.dict({'blocked_until': 0})
+
+  def _bucket(self, resource: str) -> dict:
+    '''
+    Returns the bucket of a resource. Changes only take effect once the
+    bucket is passed to `_store`, as shared buckets are copies.
+    '''
+    bucket: dict = self._buckets.get(resource)
+    if bucket is None:
+      bucket = {'remaining': None, 'limit': None, 'reset': 0}
+    return bucket
+
+  def _store(self, resource: str, bucket: dict) -> None:
+    self._buckets[resource] = bucket
+
+  def acquire(self, resource: str = 'core') -> float:
+    '''
+    Takes one call from the bucket of the given resource. If the bucket is
+    empty or a secondary rate limit is active, this sleeps exactly until the
+    bucket resets or the secondary rate limit is over.
+
+    Parameters
+    ----------
+    resource: str
+      Name of the rate limit resource the next request is counted against,
+      e.g. "search" for keyword searches and "core" for everything else.
+
+    Returns
+    -------
+    float
+      Number of seconds this call spent sleeping.
+    '''
+    slept: float = 0
+    while True:
+      wait: float = self.try_acquire(resource)
+      if wait <= 0:
+        return slept
+      self.logger.info(f'Rate limit of "{resource}" reached, waiting '
+                       f'{wait:.1f}s...')
+      time.sleep(wait)
+      slept += wait
+
+  def try_acquire(self, resource: str = 'core') -> float:
+    '''
+    Takes one call from the bucket of the given resource without waiting.
+    Returns 0 if a call was taken, otherwise the number of seconds until the
+    bucket resets or the secondary rate limit is over.
+    '''
+    with self._lock:
+      bucket: dict = self._bucket(resource)
+      now: float = time.time()
+      wait: float = self._state['blocked_until'] - now
+      if wait <= 0 and bucket['remaining'] is not None \
+         and bucket['remaining'] <= 0:
+        if bucket['reset'] > now:
+          wait = bucket['reset'] - now + 1  # reset is a full second
+        else:
+          # a new time frame has started, its size is known from headers
+          bucket['remaining'] = bucket['limit']
+      if wait > 0:
+        return wait
+      if bucket['remaining'] is not None:
+        bucket['remaining'] -= 1
+        self._store(resource, bucket)
+      return 0
+
+  def update(self, response: requests.Response,
+             resource: str = 'core') -> None:
+    '''
+    Updates the bucket of a resource using the `X-RateLimit-*` and
+    `Retry-After` headers of a response.
+
+    Parameters
+    ----------
+    response: requests.Response
+      Any response received from the GitHub API.
+    resource: str
+      Name of the resource the request was counted against. This is only used
+      if the response does not name the resource itself.
+    '''
+    headers = response.headers
+    resource = headers.get('X-RateLimit-Resource', resource)
+    with self._lock:
+      bucket: dict = self._bucket(resource)
+      if 'X-RateLimit-Remaining' in headers:
+        remaining: int = int(headers['X-RateLimit-Remaining'])
+        reset: float = float(headers.get('X-RateLimit-Reset', 0))
+        if 'X-RateLimit-Limit' in headers:
+          bucket['limit'] = int(headers['X-RateLimit-Limit'])
+        if reset != bucket['reset'] or bucket['remaining'] is None:
+          # first response of a new time frame
+          bucket['remaining'] = remaining
+          bucket['reset'] = reset
+        else:
+          # responses of concurrent requests may arrive out of order, the
+          # smaller value is always the more recent one
+          bucket['remaining'] = min(bucket['remaining'], remaining)
+        self._store(resource, bucket)
+      if 'Retry-After' in headers:
+        until: float = time.time() + float(headers['Retry-After'])
+        self._state['blocked_until'] = max(self._state['blocked_until'],
+                                           until)
+
+  def backoff(self, response: requests.Response = None,
+              attempt: int = 0) -> float:
+    '''
+    Returns the number of seconds to wait before retrying a failed request.
+
+    Waits that are caused by empty buckets or `Retry-After` headers are
+    handled by `acquire` and result in 0 here. Secondary rate limits without
+    `Retry-After` wait at least one minute as recommended by GitHub, every
+    other error backs off exponentially with jitter.
+
+    Parameters
+    ----------
+    response: requests.Response
+      The failed response or None if the request did not get a response at
+      all e.g. due to a connection error.
+    attempt: int
+      Number of failed attempts of this request before this one.
+
+    Returns
+    -------
+    float
+      Seconds to sleep before trying again.
+    '''
+    if response is not None:
+      if 'Retry-After' in response.headers:
+        return 0  # acquire waits for it
+      if response.status_code in (403, 429):
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+          return 0  # acquire waits for the reset of the bucket
+        # secondary rate limit without instructions
+        return min(60 * 2 ** attempt, self.max_backoff)
+    return min(2 ** attempt + random.random(), self.max_backoff)
+
+  def remaining(self, resource: str = 'core') -> int:
+    '''
+    Returns the locally known number of remaining calls of a resource in the
+    current time frame or None if no response of that resource was seen yet.
+    '''
+    with self._lock:
+      return self._bucket(resource)['remaining']
+
+  def seed(self, resources: dict) -> None:
+    '''
+    Seeds the buckets with the "resources" dict of a `/rate_limit` response.
+    '''
+    with self._lock:
+      for resource, values in resources.items():
+        bucket: dict = self._bucket(resource)
+        bucket['remaining'] = values.get('remaining')
+        bucket['limit'] = values.get('limit')
+        bucket['reset'] = float(values.get('reset', 0))
+        self._store(resource, bucket)
+
+
+class TokenPool:
+  '''
+  Class that spreads GitHub API requests over a pool of credentials.
+
+  Every credential gets its own `RateLimitGovernor`, as GitHub counts the
+  rate limits per token. Each request is scheduled to the credential with the
+  most calls left in the bucket of its resource, credentials without known
+  state first. Only if every bucket is empty, the pool waits for the earliest
+  reset. Credentials that GitHub rejects as invalid (401) are revoked and no
+  longer scheduled, as long as another credential is left.
+
+  The object is thread-safe. If it is created with a `multiprocessing.Manager`,
+  it can also be shared by multiple worker processes.
+
+  Attributes
+  ----------
+  tokens: list
+    List of personal access tokens. None stands for unauthenticated access.
+  max_backoff: float
+    Upper bound in seconds for a single backoff wait, see `RateLimitGovernor`.
+  manager: multiprocessing.managers.SyncManager
+    Optional started manager that holds the state shared between processes.
+
+  Methods
+  -------
+  acquire(resource: str) -> int
+    Takes one call of the resource from the credential with the most calls
+    left and returns its index, waiting if every credential is exhausted.
+  headers(index: int) -> dict
+    Returns the authorization headers of a credential.
+  update(response: requests.Response, index: int, resource: str) -> None
+    Updates the rate limit state of a credential using a response.
+  backoff(response: requests.Response, attempt: int, index: int) -> float
+    Returns the number of seconds to wait before retrying a failed request.
+  revoke(index: int) -> bool
+    Stops scheduling a rejected credential unless it is the last one.
+  remaining(resource: str) -> int
+    Returns the summed up remaining calls of all active credentials.
+  seed(resources: dict, index: int) -> None
+    Seeds the state of a credential with a `/rate_limit` response.
+
+  Examples
+  --------
+  ```py
+  pool = TokenPool(['ghp_first...', 'ghp_second...'])
+  gh = GitHubSearch(tokens=pool)
+  ```
+  '''
+
+  def __init__(self, tokens: list, max_backoff: float = 300, manager=None):
+    self.logger = logging.getLogger('search_logger')
+    self.tokens: list = list(tokens) or [None]
+    self._governors: list = [RateLimitGovernor(max_backoff, manager)
+                             for _ in self.tokens]
+    self._revoked: dict = {} if manager is None else manager.dict()
+    self._lock = threading.Lock() if manager is None else manager.Lock()
+
+  @property
+  def size(self) -> int:
+    return len(self.tokens)
+
+  def _active(self) -> list[int]:
+    return [i for i in range(len(self.tokens)) if i not in self._revoked]
+
+  def acquire(self, resource: str = 'core') -> int:
+    '''
+    Takes one call of the given resource from the active credential with the
+    most calls left and returns its index. If every credential is exhausted,
+    this sleeps until the first one resets.
+    '''
+    while True:
+      # unknown states (None) first, then the fullest bucket
+      candidates: list = sorted(
+        self._active(), key=lambda i: -float('inf')
+        if self._governors[i].remaining(resource) is None
+        else -self._governors[i].remaining(resource))
+      waits: list = []
+      for i in candidates:
+        wait: float = self._governors[i].try_acquire(resource)
+        if wait <= 0:
+          return i
+        waits.append(wait)
+      wait: float = min(waits)
+      self.logger.info(f'Rate limit of "{resource}" reached for all '
+                       f'{len(candidates)} tokens, waiting {wait:.1f}s...')
+      time.sleep(wait)
+
+  def headers(self, index: int) -> dict:
+    '''Returns the headers that authenticate a request with a credential.'''
+    token: str = self.tokens[index]
+    return {} if token is None else {'Authorization': f'Bearer {token}'}
+
+  def update(self, response: requests.Response, index: int,
+             resource: str = 'core') -> None:
+    '''See `RateLimitGovernor.update`.'''
+    self._governors[index].update(response, resource)
+
+  def backoff(self, response: requests.Response = None, attempt: int = 0,
+              index: int = 0) -> float:
+    '''
+    See `RateLimitGovernor.backoff`. Exhausted credentials do not cause a
+    wait, the next `acquire` picks another credential or waits for a reset.
+    '''
+    return self._governors[index].backoff(response, attempt)
+
+  def revoke(self, index: int) -> bool:
+    '''
+    Stops scheduling the credential at index, e.g. after GitHub answered 401
+    for it. The last active credential is never revoked.
+
+    Returns
+    -------
+    bool
+      True if the credential was revoked.
+    '''
+    with self._lock:
+      active: list = self._active()
+      if index not in active or len(active) <= 1:
+        return False
+      self._revoked[index] = time.time()
+    self.logger.error(f'Token {index} of the pool was rejected, '
+                      f'{len(active) - 1} tokens left')
+    return True
+
+  def remaining(self, resource: str = 'core') -> int:
+    '''
+    Returns the summed up remaining calls of the resource of all active
+    credentials, or None if no response of the resource was seen yet for any
+    of them.
+    '''
+    values: list = [self._governors[i].remaining(resource)
+                    for i in self._active()]
+    values = [value for value in values if value is not None]
+    return sum(values) if values else None
+
+  def seed(self, resources: dict, index: int = 0) -> None:
+    '''See `RateLimitGovernor.seed`.'''
+    self._governors[index].seed(resources)
@@ -0,0 +1,59 @@
+import codecs
+import chardet
+
+
+class ReadmeDecoder:
+  '''
+  Class that turns the raw bytes of a README file into text at bounded cost.
+
+  Most READMEs are UTF-8 (or plain ASCII), so a strict UTF-8 decode is tried
+  first. Only if that fails, the encoding is detected by chardet on a sampled
+  prefix of the file instead of the whole file, as chardet gets very slow on
+  large inputs. READMEs are expected to be cut off after `max_bytes` bytes by
+  the download already, a multi-byte character that was cut in half at the
+  end is dropped.
+
+  Attributes
+  ----------
+  max_bytes: int
+    Maximum number of bytes of a README that are downloaded and decoded.
+  sample_bytes: int
+    Number of leading bytes chardet sees if the README is not UTF-8.
+
+  Methods
+  -------
+  decode(data: bytes) -> str
+    Returns the text of the given README bytes.
+
+  Examples
+  --------
+  ```py
+  decoder = ReadmeDecoder(max_bytes=256 * 1024)
+  print(decoder.decode('# Título'.encode('latin-1')))  # # Título
+  ```
+  '''
+
+  def __init__(self, max_bytes: int = 512 * 1024,
+               sample_bytes: int = 32 * 1024):
+    self.max_bytes: int = max_bytes
+    self.sample_bytes: int = sample_bytes
+
+  def decode(self, data: bytes) -> str:
+    '''
+    Returns the text of the given README bytes. Bytes beyond max_bytes are
+    ignored. If no encoding could be detected, this returns "Invalid Encoding".
+    '''
+    data = data[:self.max_bytes]
+    try:
+      # not final, the download may have cut the last character in half
+      return codecs.getincrementaldecoder('utf-8-sig')().decode(data,
+                                                                 final=False)
+    except UnicodeDecodeError:
+      pass
+    encoding: str = chardet.detect(data[:self.sample_bytes]).get('encoding')
+    if not encoding:
+      return 'Invalid Encoding'
+    try:
+      return data.decode(encoding, 'ignore')
+    except LookupError:  # chardet may name codecs Python does not know
+      return 'Invalid Encoding'
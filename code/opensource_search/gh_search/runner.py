@@ -0,0 +1,242 @@
+import logging
+import multiprocessing
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from .rate_limit import *
+from .journal import *
+from .metrics import *
+from .search import *
+
+
+class CrawlRunner:
+  '''
+  Class that runs the keyword searches of a keyword file without supervision.
+
+  Every line of the keyword file is one search. The searches run concurrently
+  in a pool of worker processes that all draw from the rate limit budget of
+  one `TokenPool` shared through a `multiprocessing.Manager`. Each search
+  writes its results to the shard `data_<line>.csv` and its `created:`
+  qualifiers to `data_<line>_qualifiers.txt`, like the manual runs did.
+  Afterwards the shards are merged into one CSV file chunk by chunk, keeping
+  every repo id only once (the first occurrence wins, rows already in the
+  file are kept).
+  The `CrawlMetrics` of all searches are merged into one summary.
+
+  Attributes
+  ----------
+  pat: str | list
+    Personal access token or list of tokens that are used together.
+  keywords_path: str
+    String path to the keyword file, one search per line.
+  output_path: str
+    String path to the merged CSV file. Existing rows are kept.
+  shard_dir: str
+    String path to the directory of the shards and qualifier files.
+  processes: int
+    Number of concurrent worker processes.
+  until: datetime
+    Only repositories created until this date are searched.
+  journal_dir: str
+    Optional directory of a `CrawlJournal`, so an interrupted run continues
+    where it stopped when it is started again.
+  filter_out_non_programming: bool
+    Flag that states if repositories with a non-programming main language are
+    skipped.
+  api_url: str
+    Base url of the GitHub API, see `GitHubSearch`.
+  metrics_path: str
+    Optional JSON file the `CrawlMetrics` summary of the run is written to.
+  metrics: CrawlMetrics
+    The merged metrics of all searches of the last run.
+
+  Methods
+  -------
+  run() -> list[dict]
+    Runs all searches, merges their shards and returns their statistics.
+  merge_shards(shard_paths: list) -> int
+    Appends the shards to the output file and returns the new rows.
+
+  Examples
+  --------
+  ```py
+  runner = CrawlRunner(pat, 'config/keywords.txt', processes=4)
+  stats = runner.run()
+  ```
+  Or from the command line: `python -m gh_search --processes 4`
+  '''
+
+  def __init__(self, pat: str | list = None,
+               keywords_path: str = 'config/keywords.txt',
+               output_path: str = 'data/initial/data.csv',
+               shard_dir: str = 'data/initial', processes: int = 4,
+               until: datetime = None, journal_dir: str = None,
+               filter_out_non_programming: bool = False,
+               api_url: str = 'https://api.github.com',
+               metrics_path: str = None):
+    self.logger = logging.getLogger('search_logger')
+    self._pats: list = pat if isinstance(pat, list) else [pat]
+    self.keywords_path: str = keywords_path
+    self.output_path: str = output_path
+    self.shard_dir: str = shard_dir
+    self.processes: int = processes
+    self.until: datetime = until or datetime.now()
+    self.journal_dir: str = journal_dir
+    self.filter_out_non_programming: bool = filter_out_non_programming
+    self.api_url: str = api_url
+    self.metrics_path: str = metrics_path
+    self.metrics: CrawlMetrics = None
+
+  def _read_keywords(self) -> list[str]:
+    with open(self.keywords_path, 'r', encoding='utf-8') as file:
+      return [line.strip() for line in file if line.strip()]
+
+  def run(self) -> list[dict]:
+    '''
+    Runs the searches of all keyword lines, merges the shards of the
+    successful ones into the output file and logs the throughput of every
+    search.
+
+    Returns
+    -------
+    list[dict]
+      Statistics of every search in keyword file order with the keys
+      "index", "keywords", "ok", "windows", "pages", "rows" and "seconds".
+    '''
+    keywords: list = self._read_keywords()
+    os.makedirs(self.shard_dir, exist_ok=True)
+    stats: list = [None] * len(keywords)
+    start: float = time.time()
+    with multiprocessing.Manager() as manager:
+      tokens: TokenPool = TokenPool(self._pats, manager=manager)
+      with ProcessPoolExecutor(max_workers=self.processes) as executor:
+        futures: dict = {
+          executor.submit(CrawlRunner._crawl_keyword, {
+            'index': i, 'keywords': keyword, 'tokens': tokens,
+            'shard_dir': self.shard_dir,
+            'until': self.until, 'journal_dir': self.journal_dir,
+            'filter': self.filter_out_non_programming,
+            'api_url': self.api_url}): i
+          for i, keyword in enumerate(keywords)}
+        for future in as_completed(futures):
+          i: int = futures[future]
+          try:
+            stats[i] = future.result()
+          except Exception as e:  # keep the other searches on failure
+            self.logger.error(f'Search {i} "{keywords[i]}" failed: {e}')
+            stats[i] = {'index': i, 'keywords': keywords[i], 'ok': False,
+                        'windows': 0, 'pages': 0, 'rows': 0, 'seconds': 0}
+    self.metrics = CrawlMetrics()
+    for s in stats:
+      if 'metrics' in s:
+        self.metrics.merge(s.pop('metrics'))
+    # the shards of failed searches may be incomplete and are left out
+    shards: list = [os.path.join(self.shard_dir, f'data_{s["index"]}.csv')
+                    for s in stats if s['ok']]
+    with self.metrics.stage('merge'):
+      new_rows: int = self.merge_shards(shards)
+    self._report(stats, new_rows, time.time() - start)
+    if self.metrics_path is not None:
+      self.metrics.export(self.metrics_path)
+      self.logger.info(f'Wrote crawl metrics to {self.metrics_path}')
+    return stats
+
+  @staticmethod
+  def _crawl_keyword(task: dict) -> dict:
+    '''
+    Runs the search of one keyword line in a worker process and streams its
+    pages into its shard.
+    '''
+    start: float = time.time()
+    journal: CrawlJournal = CrawlJournal(task['journal_dir']) \
+      if task['journal_dir'] else None
+    metrics: CrawlMetrics = CrawlMetrics()
+    gh: GitHubSearch = GitHubSearch(journal=journal, api_url=task['api_url'],
+                                    tokens=task['tokens'], metrics=metrics)
+    keywords: list = [task['keywords']]
+    prefix: str = os.path.join(task['shard_dir'], f'data_{task["index"]}')
+    try:
+      qualifiers: list = gh.get_all_date_params(keywords, task['until'])
+      with open(f'{prefix}_qualifiers.txt', 'w', encoding='utf-8') as file:
+        file.write('\n'.join(qualifiers))
+      _, fields_of_interest = gh._create_empty_df_of_interest()
+      # the shard is written from scratch, resumed pages come from the journal
+      pd.DataFrame(columns=fields_of_interest).to_csv(f'{prefix}.csv',
+                                                      index=False)
+      pages: int = 0
+      rows: int = 0
+      with metrics.stage('search'):
+        for qualifier in qualifiers:
+          for records in gh.iter_search_pages(keywords + [qualifier],
+                                              task['filter'],
+                                              check_limit=False):
+            pd.DataFrame.from_records(records, columns=fields_of_interest) \
+              .to_csv(f'{prefix}.csv', mode='a', header=False, index=False)
+            pages += 1
+            rows += len(records)
+    finally:
+      gh.dispose()
+    return {'index': task['index'], 'keywords': task['keywords'], 'ok': True,
+            'windows': len(qualifiers), 'pages': pages, 'rows': rows,
+            'seconds': time.time() - start, 'metrics': metrics}
+
+  def merge_shards(self, shard_paths: list, chunksize: int = 10000) -> int:
+    '''
+    Appends the rows of the given shards to the output file in the given
+    order without loading them into memory at once. Rows whose repo id is
+    already in the output file or in an earlier shard are skipped. All values
+    are copied as they are written in the shards.
+
+    Returns
+    -------
+    int
+      Number of rows that were appended.
+    '''
+    seen: set = set()
+    columns: list = None
+    if os.path.exists(self.output_path) \
+       and os.path.getsize(self.output_path) > 0:
+      columns = list(pd.read_csv(self.output_path, nrows=0).columns)
+      for chunk in pd.read_csv(self.output_path, usecols=['id'], dtype=str,
+                               chunksize=chunksize):
+        seen.update(chunk['id'])
+    appended: int = 0
+    for shard_path in shard_paths:
+      for chunk in pd.read_csv(shard_path, dtype=str, keep_default_na=False,
+                               chunksize=chunksize):
+        chunk = chunk[~chunk['id'].isin(seen)].drop_duplicates(subset='id')
+        seen.update(chunk['id'])
+        if columns is None:
+          columns = list(chunk.columns)
+          chunk.iloc[:0].to_csv(self.output_path, index=False)
+        chunk.reindex(columns=columns).to_csv(self.output_path, mode='a',
+                                              header=False, index=False)
+        appended += len(chunk)
+    self.logger.info(f'Merged {len(shard_paths)} shards into '
+                     f'{self.output_path}, appended {appended} new rows')
+    return appended
+
+  def _report(self, stats: list, new_rows: int, seconds: float) -> None:
+    self.logger.info('Search throughput per keyword line:')
+    for s in stats:
+      rate: float = s['rows'] / s['seconds'] if s['seconds'] > 0 else 0
+      self.logger.info(f'  [{s["index"]:2d}] {"ok" if s["ok"] else "FAILED"} '
+                       f'{s["rows"]:6d} rows, {s["pages"]:4d} pages, '
+                       f'{s["windows"]:3d} windows in {s["seconds"]:7.1f}s '
+                       f'({rate:.1f} rows/s) "{s["keywords"]}"')
+    total: int = sum(s['rows'] for s in stats)
+    self.logger.info(f'Done: {total} rows ({new_rows} new) from '
+                     f'{len(stats)} searches in {seconds:.1f}s')
+    failed: list = [s['index'] for s in stats if not s['ok']]
+    if failed:
+      self.logger.error(f'{len(failed)} searches failed and were not merged, '
+                        f'run them again: {failed}')
+    totals: dict = self.metrics.summary()['totals']
+    self.logger.info(f'{totals["requests"]} API calls with '
+                     f'{totals["retries"]} retries, '
+                     f'{totals["bytes"] / 2**20:.1f} MiB received, '
+                     f'{totals["network_seconds"]:.1f}s on the network, '
+                     f'{totals["rate_limit_seconds"]:.1f}s waiting for rate '
+                     f'limits, {totals["backoff_seconds"]:.1f}s backing off')
@@ -0,0 +1,178 @@
+import ast
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class RepositorySchema:
+  '''
+  Class that declares the column types of the repository DataFrames, i.e. the
+  search results of `GitHubSearch` and the columns added by its enrichment.
+
+  Repeating strings (owner types, languages, licenses, branch names) are
+  stored as categoricals, counts and flags as nullable integers and booleans,
+  timestamps as UTC datetimes and topics and languages as native list columns
+  backed by Arrow. Compared to object columns this takes a fraction of the
+  memory and allows vectorized filters e.g. `df['topics'].list.len() > 0`.
+
+  The types survive Parquet files as they are. CSV files can only hold
+  strings, so lists are written as Python list literals and timestamps in the
+  format of the GitHub API, which is how the existing CSV files look, and
+  `load` parses them back.
+
+  Attributes
+  ----------
+  columns: dict
+    Maps each column of the search results to its dtype, in column order.
+  enrichment_columns: dict
+    Maps each column added by `GitHubSearch.get_additional_data` to its dtype.
+
+  Methods
+  -------
+  empty(columns: list) -> pd.DataFrame
+    Returns an empty DataFrame with typed columns.
+  apply(df: pd.DataFrame) -> pd.DataFrame
+    Returns df with every known column converted to its dtype.
+  save(df: pd.DataFrame, file_path: str) -> None
+    Writes df to a Parquet or CSV file.
+  load(file_path: str) -> pd.DataFrame
+    Reads a Parquet or CSV file and applies the schema.
+
+  Examples
+  --------
+  ```py
+  schema = RepositorySchema()
+  df = schema.load('data/initial/data.csv')
+  print(df[df['main_language'] == 'Kotlin']['topics'].list.len().mean())
+  schema.save(df, 'data/initial/data.parquet')
+  ```
+  '''
+
+  list_dtype: pd.ArrowDtype = pd.ArrowDtype(pa.list_(pa.string()))
+  string_dtype: pd.StringDtype = pd.StringDtype('pyarrow')
+  timestamp_format: str = '%Y-%m-%dT%H:%M:%SZ'
+
+  columns: dict = {
+    'id': 'Int64', 'url': 'string', 'name': 'string', 'description': 'string',
+    'owner': 'string', 'owner_type': 'category', 'owner_image_url': 'string',
+    'created_at': 'timestamp', 'updated_at': 'timestamp',
+    'homepage_url': 'string', 'repo_size_kb': 'Int64', 'license': 'category',
+    'num_stars': 'Int32', 'num_forks': 'Int32', 'is_fork': 'boolean',
+    'topics': 'list', 'is_archived': 'boolean', 'default_branch': 'category',
+    'main_language': 'category', 'has_projects': 'boolean',
+    'has_wiki': 'boolean', 'has_pages': 'boolean',
+    'has_discussions': 'boolean', 'has_issues': 'boolean',
+    'info_url': 'string'}
+  enrichment_columns: dict = {
+    'num_issues': 'Int32', 'num_subscribers': 'Int32',
+    'num_contributors': 'Int32', 'languages': 'list', 'readme': 'string'}
+
+  def _dtype_of(self, column: str) -> str:
+    return self.columns.get(column, self.enrichment_columns.get(column))
+
+  def empty(self, columns: list = None) -> pd.DataFrame:
+    '''
+    Returns an empty DataFrame with the given columns (default: all search
+    result columns) in their declared types.
+    '''
+    columns = columns if columns is not None else list(self.columns.keys())
+    return self.apply(pd.DataFrame({column: pd.Series([], dtype=object)
+                                    for column in columns}))
+
+  def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Returns a copy of df with every column of the schema converted to its
+    declared type. Values may be given as parsed Python objects (e.g. API
+    records) or as the strings of a CSV file. Other columns are kept as they
+    are.
+    '''
+    df = df.copy()
+    for column in df.columns:
+      dtype: str = self._dtype_of(column)
+      if dtype is not None:
+        df[column] = self._convert(df[column], dtype)
+    return df
+
+  def _convert(self, s: pd.Series, dtype: str) -> pd.Series:
+    if dtype == 'list':
+      if s.dtype == self.list_dtype:
+        return s
+      return pd.Series(pd.array([self._parse_list(v) for v in s],
+                                dtype=self.list_dtype), index=s.index)
+    if dtype == 'timestamp':
+      return pd.to_datetime(s, utc=True, errors='coerce', format='ISO8601')
+    if dtype == 'boolean':
+      if s.dtype == object:
+        s = s.map(lambda v: {'true': True, 'false': False}.get(v.lower())
+                  if isinstance(v, str) else v)
+      return s.astype('boolean')
+    if dtype == 'category':
+      if isinstance(s.dtype, pd.CategoricalDtype):
+        # e.g. categoricals of a Parquet file have object categories
+        if s.cat.categories.dtype != self.string_dtype:
+          return s.cat.set_categories(
+            s.cat.categories.astype(self.string_dtype), rename=True)
+        return s
+      return s.astype(self.string_dtype).astype('category')
+    if dtype == 'string':
+      return s.astype(self.string_dtype)
+    # nullable integers
+    return pd.to_numeric(s, errors='coerce').astype(dtype)
+
+  def _parse_list(self, value) -> list:
+    '''Returns a list value or a list literal of a CSV file as list.'''
+    if isinstance(value, (list, tuple, np.ndarray)):
+      return [str(v) for v in value]
+    if not isinstance(value, str):
+      return None  # NaN, None or NA
+    if value == '':
+      return None
+    try:
+      parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+      try:
+        parsed = json.loads(value)
+      except json.JSONDecodeError:
+        return None  # e.g. a list broken by a manual edit
+    if isinstance(parsed, str):
+      return self._parse_list(parsed)  # list literal written to CSV twice
+    if not isinstance(parsed, (list, tuple)):
+      return None  # e.g. numbers of manual edits
+    return [str(v) for v in parsed]
+
+  def save(self, df: pd.DataFrame, file_path: str) -> None:
+    '''
+    Writes df to file_path. Files ending with ".parquet" keep all types,
+    every other file is written as CSV readable by `load` and by the
+    notebooks.
+    '''
+    if file_path.endswith('.parquet'):
+      df.to_parquet(file_path, index=False)
+      return
+    df = df.copy()
+    for column in df.columns:
+      dtype: str = self._dtype_of(column)
+      if dtype == 'list':
+        df[column] = [None if v is None or v is pd.NA else str(list(v))
+                      for v in df[column]]
+      elif dtype == 'timestamp' \
+           and pd.api.types.is_datetime64_any_dtype(df[column]):
+        df[column] = df[column].dt.strftime(self.timestamp_format)
+    df.to_csv(file_path, index=False)
+
+  def load(self, file_path: str) -> pd.DataFrame:
+    '''
+    Reads a Parquet or CSV file written by `save` (or by any earlier run)
+    and returns its contents with the schema applied.
+    '''
+    if file_path.endswith('.parquet'):
+      # the Arrow types are converted by apply, the pandas metadata of list
+      # columns can not be read back by pandas itself
+      df: pd.DataFrame = pq.read_table(file_path).to_pandas(
+        ignore_metadata=True)
+    else:
+      df: pd.DataFrame = pd.read_csv(file_path, dtype=str,
+                                     keep_default_na=False, na_values=[''])
+    return self.apply(df)
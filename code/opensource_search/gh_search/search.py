@@ -1,38 +1,86 @@
 import logging
 from .language import *
+from .rate_limit import *
+from .cache import *
+from .journal import *
+from .readme import *
+from .schema import *
+from .metrics import *
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta, time as dt_time
 import time
 from urllib.parse import urlencode
 import pandas as pd
+from typing import Iterator
+from contextlib import nullcontext
 import re
-import base64
-import chardet
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 
 class GitHubSearch:
   '''
   Class that is responsible for the GitHub API search of repositories.
+
+  Responses can be kept in a `ResponseCache` to revalidate them on the next
+  run instead of downloading them again. Keyword searches can be recorded in
+  a `CrawlJournal` to resume them after an interruption. `api_url` can point
+  to a local stand-in of the GitHub API e.g. for testing. READMEs are capped
+  and decoded by the given `ReadmeDecoder`.
+
+  `pat` can be a single token or a list of tokens. Requests are spread over
+  all tokens by a `TokenPool`, so each token adds its own rate limits. Objects
+  in different worker processes can share one rate limit budget by passing
+  them the same `TokenPool` created with a `multiprocessing.Manager`.
+
+  With a `CrawlMetrics` object, the latency, bytes, retries and rate limit
+  waits of every API call and the wall time of the partitioning, search and
+  enrichment stages are recorded.
   '''
 
-  def __init__(self, pat: str = None):
+  def __init__(self, pat: str | list = None, max_workers: int = 8,
+               cache: ResponseCache = None, journal: CrawlJournal = None,
+               api_url: str = 'https://api.github.com',
+               readme_decoder: ReadmeDecoder = None,
+               tokens: TokenPool = None, metrics: CrawlMetrics = None):
     self.logger = logging.getLogger('search_logger')
-    self.is_authenticated: bool = (pat is not None)
+    # rate limits per token and resource, tracked from response headers and
+    # shared by all worker threads
+    self._tokens: TokenPool = tokens or TokenPool(
+      pat if isinstance(pat, list) else [pat])
+    self.is_authenticated: bool = any(token is not None
+                                      for token in self._tokens.tokens)
     self._lang: LinguistData = LinguistData()
+    self._schema: RepositorySchema = RepositorySchema()
     # set up urls for the 2 needed endpoints
-    self._repo_path: str = 'https://api.github.com/search/repositories'
-    self._rate_limit_path: str = 'https://api.github.com/rate_limit'
+    self._api_url: str = api_url.rstrip('/')
+    self._repo_path: str = f'{self._api_url}/search/repositories'
+    self._rate_limit_path: str = f'{self._api_url}/rate_limit'
+    self._cache: ResponseCache = cache
+    self._journal: CrawlJournal = journal
+    self._readme_decoder: ReadmeDecoder = readme_decoder or ReadmeDecoder()
+    # repositories can not be created before GitHub went online in 2007
+    self._github_epoch: datetime = datetime(2007, 10, 1)
+    self._count_cache: dict = {}  # query -> total_count
+    self._max_workers: int = max_workers
+    self.metrics: CrawlMetrics = metrics
     # set up keep-alive session for the HTTP connection
-    self._session = self._create_session(pat)
+    self._session = self._create_session()
 
   # region session
-  def _create_session(self, pat: str = None) -> requests.Session:
+  def _create_session(self) -> requests.Session:
+    # the Authorization header is set per request by the token pool
     session_headers: dict = {'Accept': 'application/vnd.github+json',
                              'X-GitHub-Api-Version': '2022-11-28'}
-    if pat is not None:
-      session_headers['Authorization'] = f'Bearer {pat}'
     session: requests.Session = requests.Session()
     session.headers.update(session_headers)
+    # one pooled connection per worker so concurrent enrichment calls reuse
+    # their keep-alive connections instead of opening new ones
+    adapter: HTTPAdapter = HTTPAdapter(pool_connections=1,
+                                       pool_maxsize=self._max_workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
     self.logger.info('Session opened')
     return session
 
@@ -42,16 +90,39 @@ class GitHubSearch:
     method is called.
     '''
     self._session.close()
+    if self._cache is not None:
+      self._cache.close()
+    if self._journal is not None:
+      self._journal.close()
     self.logger.info('Session closed')
   # endregion
 
+  # region metrics
+  def _stage(self, name: str):
+    '''Returns a context that records a stage if metrics are set.'''
+    return self.metrics.stage(name) if self.metrics is not None \
+      else nullcontext()
+
+  def _record(self, url: str, resource: str, r: requests.Response,
+              call: dict, start: float) -> None:
+    '''Records a finished call of `_request` if metrics are set.'''
+    if self.metrics is not None:
+      self.metrics.record(url, resource,
+                          r.status_code if r is not None else None,
+                          call['attempts'], call['bytes'],
+                          time.perf_counter() - start, call['network'],
+                          call['rate_limit'], call['backoff'], call['cached'])
+  # endregion
+
   # region rate limit
   def get_repo_rate_limit(self, resource: str = 'search') -> tuple[int, float]:
     '''
     Returns the remaining searches on the repositories endpoints of the current
     time frame as well as the time left until the next time frame begins.
 
-    This call does not use up any rate limits.
+    This call does not use up any rate limits. With multiple tokens, the
+    remaining calls of all tokens are summed up and the time until the first
+    of them starts a new time frame is returned.
 
     In case of an error, this assumes 0 tries are left and a wait time of 60
     seconds until the next frame begins.
@@ -71,36 +142,183 @@ class GitHubSearch:
       frame as first component, and the seconds until the next time frame starts
       as last component.
     '''
-    # API call
-    r: requests.Response = self._session.get(self._rate_limit_path)
-    # response parsing
-    if r.status_code == 200 or r.status_code == 304:
-      body: dict = r.json()
-      n_tries: int = body.get('resources').get(resource).get('remaining')
-      reset_timestamp: int = body.get('resources').get(resource).get('reset')
-      now_timestamp: int = datetime.timestamp(datetime.now())
-      return n_tries, reset_timestamp - now_timestamp
-    else:
+    n_tries: int = 0
+    waits: list = []
+    for index in range(self._tokens.size):
+      # API call
+      start: float = time.perf_counter()
+      r: requests.Response = self._session.get(
+        self._rate_limit_path, headers=self._tokens.headers(index))
+      seconds: float = time.perf_counter() - start
+      self._record(self._rate_limit_path, 'rate_limit', r,
+                   {'attempts': 1, 'bytes': len(r.content), 'network': seconds,
+                    'rate_limit': 0.0, 'backoff': 0.0, 'cached': False}, start)
+      # response parsing
+      if r.status_code == 200 or r.status_code == 304:
+        body: dict = r.json()
+        self._tokens.seed(body.get('resources'), index)
+        n_tries += body.get('resources').get(resource).get('remaining')
+        reset_timestamp: int = body.get('resources').get(resource).get('reset')
+        now_timestamp: int = datetime.timestamp(datetime.now())
+        waits.append(reset_timestamp - now_timestamp)
+      else:
+        self.logger.error(f'HTTP {r.status_code} on rate limit of token '
+                          f'{index}')
+    if not waits:
       # if something went wrong, assume no tries are left and wait 1 minute
-      self.logger.error(f'HTTP {r.status_code} assume 0 tries are left and '
-                        'wait 60 seconds.')
+      self.logger.error('Assume 0 tries are left and wait 60 seconds.')
       return 0, 60
+    return n_tries, min(waits)
 
-  def _handle_rate_limit(self, min_limit: int = 0,
-                         resource: str = 'search') -> int:
-    n, waits = self.get_repo_rate_limit(resource)
-    refreshed: bool = False
-    if n <= min_limit:
-      self.logger.info(f'Waiting {waits}s...')
-      time.sleep(int(waits) + 1)
-      n = 30 if self.is_authenticated else 10  # rate limits of GitHub REST API
-    msg: str = f'Remaining searches = {n}'
-    if not refreshed:
-      msg += f', next window starts in {waits}s'
-    else:
-      msg += f', new window has started'
-    self.logger.debug(msg)
-    return n
+  def _check_rate_limit(self, resource: str = 'search') -> None:
+    '''
+    Requests the rate limit of the given resource once if the token pool has
+    not seen any response of it yet. Afterwards the response headers suffice.
+    '''
+    if self._tokens.remaining(resource) is None:
+      n, waits = self.get_repo_rate_limit(resource)
+      self.logger.debug(f'Remaining calls of "{resource}" = {n}, next window '
+                        f'starts in {waits}s')
+
+  def _request(self, url: str, resource: str = 'core', params=None,
+               max_retries: int = 5, json_body: dict = None,
+               headers: dict = None, max_bytes: int = None
+               ) -> requests.Response:
+    '''
+    Sends a GET request through the keep-alive session while respecting the
+    rate limits of the given resource.
+
+    The rate limit state is read from the headers of every response, so no
+    extra call to `/rate_limit` is needed. Every attempt is sent with the
+    token of the pool that has the most calls left. Failed requests (5xx,
+    secondary rate limits, connection errors) are retried with backoff,
+    exhausted or rejected (401) tokens are replaced by another token of the
+    pool, all other responses are returned as they are.
+
+    If a cache is set, cached responses are revalidated using conditional
+    headers and a 304 response is answered with the cached body. In offline
+    mode, the cache answers without sending anything. Every call is recorded
+    in the metrics, if set.
+
+    Parameters
+    ----------
+    url: str
+      The url to request.
+    resource: str
+      Name of the rate limit resource the request counts against. "search"
+      for keyword searches, "core" for everything else.
+    params: dict | str
+      Optional query parameters of the request.
+    max_retries: int
+      Number of retries until the last failed response is returned.
+    json_body: dict
+      Optional JSON body. If given, the request is sent as POST request and
+      is never cached.
+    headers: dict
+      Optional headers that replace the session headers for this request.
+    max_bytes: int
+      Optional maximum number of body bytes of a successful response. The
+      body is streamed and the download stops after max_bytes bytes.
+
+    Returns
+    -------
+    requests.Response
+      The last response received. If no response could be received at all,
+      the last connection error is raised.
+    '''
+    method: str = 'GET' if json_body is None else 'POST'
+    request: requests.PreparedRequest = self._session.prepare_request(
+      requests.Request(method, url, params=params, json=json_body,
+                       headers=headers))
+    # seconds and bytes of all attempts, see `CrawlMetrics.record`
+    call: dict = {'attempts': 0, 'bytes': 0, 'network': 0.0,
+                  'rate_limit': 0.0, 'backoff': 0.0, 'cached': False}
+    start: float = time.perf_counter()
+    r: requests.Response = None
+    try:
+      entry: dict = None
+      if self._cache is not None and method == 'GET':
+        if self._cache.offline:
+          call['cached'] = True
+          r = self._cache.replay(request)
+          return r
+        entry = self._cache.lookup(request)
+        request.headers.update(self._cache.conditional_headers(entry))
+      settings: dict = self._session.merge_environment_settings(
+        request.url, {}, max_bytes is not None, None, None)
+      attempt: int = 0
+      while True:
+        waited: float = time.perf_counter()
+        index: int = self._tokens.acquire(resource)
+        call['rate_limit'] += time.perf_counter() - waited
+        request.headers.pop('Authorization', None)
+        request.headers.update(self._tokens.headers(index))
+        call['attempts'] += 1
+        sent: float = time.perf_counter()
+        r = None
+        try:
+          r = self._session.send(request, **settings)
+        except requests.RequestException as e:
+          call['network'] += time.perf_counter() - sent
+          if attempt >= max_retries:
+            raise
+          wait: float = self._tokens.backoff(None, attempt, index)
+          self.logger.warning(f'{type(e).__name__} on {url}, retrying in '
+                              f'{wait:.1f}s...')
+          time.sleep(wait)
+          call['backoff'] += wait
+          attempt += 1
+          continue
+        call['network'] += time.perf_counter() - sent
+        # streamed bodies are not read yet and counted once they are
+        call['bytes'] += len(r._content or b'')
+        self._tokens.update(r, index, resource)
+        if r.status_code == 401 and self._tokens.revoke(index):
+          r.close()
+          continue  # fail over to the next token without counting an attempt
+        if r.status_code == 304 and entry is not None:
+          call['cached'] = True
+          return self._cache.revalidated(entry, r)
+        if r.status_code < 500 and r.status_code not in (403, 429):
+          if max_bytes is not None:
+            sent = time.perf_counter()
+            self._read_capped(r, max_bytes)
+            call['network'] += time.perf_counter() - sent
+            call['bytes'] += len(r.content)
+          if self._cache is not None and method == 'GET':
+            self._cache.store(r)
+          return r
+        if r.status_code == 403 and 'rate limit' not in r.text.lower() \
+           and 'Retry-After' not in r.headers:
+          return r  # plain permission error, retrying does not help
+        if attempt >= max_retries:
+          self.logger.error(f'HTTP {r.status_code} on {r.url}, giving up '
+                            f'after {attempt + 1} tries')
+          return r
+        wait: float = self._tokens.backoff(r, attempt, index)
+        self.logger.warning(f'HTTP {r.status_code} on {r.url}, retrying in '
+                            f'{wait:.1f}s...')
+        r.close()
+        time.sleep(wait)
+        call['backoff'] += wait
+        attempt += 1
+    finally:
+      self._record(url, resource, r, call, start)
+
+  def _read_capped(self, r: requests.Response, max_bytes: int) -> None:
+    '''
+    Reads at most max_bytes bytes of the streamed body of r into r.content and
+    drops the connection if the body is longer.
+    '''
+    chunks: list = []
+    size: int = 0
+    for chunk in r.iter_content(chunk_size=16 * 1024):
+      chunks.append(chunk)
+      size += len(chunk)
+      if size >= max_bytes:
+        break
+    r._content = b''.join(chunks)[:max_bytes]
+    r.close()
   # endregion
 
   # region keyword search
@@ -111,6 +329,10 @@ class GitHubSearch:
     Returns all parsable search results from the API search using the provided
     keywords.
 
+    This collects the pages of `iter_search_pages` and builds the resulting
+    DataFrame once at the end. A page that can not be retrieved raises a
+    RuntimeError.
+
     Parameters
     ----------
     keywords: list
@@ -118,8 +340,10 @@ class GitHubSearch:
       qualifiers as well as operators and the concatenated string must not
       exceed 255 characters (excluding length of qualifiers and operators).
     check_limit: bool
-      Flag that states if rate limit checking is to be done before doint the
-      initial search. Default value is True.
+      Flag that states if the rate limit is to be requested from `/rate_limit`
+      before doing the initial search in case no response has been seen yet.
+      Afterwards the rate limit is tracked from the response headers. Default
+      value is True.
     filter_out_non_programming: bool
       Flag that states if repositories in the search that are labeled as using
       a non-programming language as main content language are to be skipped
@@ -131,48 +355,102 @@ class GitHubSearch:
     -------
     pd.DataFrame
       DataFrame containing all results as feature vector row. The columns of
-      this DataFrame are set by _create_empty_df_of_interest.
+      this DataFrame are set by _create_empty_df_of_interest, their types by
+      `RepositorySchema`.
+    '''
+    records: list = []
+    with self._stage('search'):
+      for batch in self.iter_search_pages(keywords,
+                                          filter_out_non_programming,
+                                          check_limit):
+        records.extend(batch)
+    _, fields_of_interest = self._create_empty_df_of_interest()
+    df_search = self._schema.apply(
+      pd.DataFrame.from_records(records, columns=fields_of_interest))
+    self.logger.info(f'Done searching, got {len(df_search)} results')
+    return df_search
+
+  def iter_search_pages(self, keywords: list,
+                        filter_out_non_programming: bool = False,
+                        check_limit: bool = True) -> Iterator[list[dict]]:
+    '''
+    Yields the parsed search results of the provided keywords page by page as
+    soon as each page arrives, so the results can be processed while the next
+    pages are still being requested.
+
+    If a journal is set, every completed page is committed to it and a search
+    that was interrupted before continues after its last committed page. The
+    already committed pages are yielded from the journal first.
+
+    A page that can not be retrieved (after the retries of every request)
+    raises a RuntimeError, as ending the search there would silently return
+    an incomplete result.
+
+    Parameters
+    ----------
+    keywords: list
+      List of string keywords to use for the search, see
+      `get_all_search_results`.
+    filter_out_non_programming: bool
+      Flag that states if repositories with a non-programming main language
+      are to be skipped, see `get_all_search_results`. Default is False.
+    check_limit: bool
+      Flag that states if the rate limit is to be requested from `/rate_limit`
+      before doing the initial search, see `get_all_search_results`. Default
+      value is True.
+
+    Yields
+    ------
+    list[dict]
+      The repositories of one page as records with the keys set by
+      _create_empty_df_of_interest.
     '''
     # creating search string and setting up max pagination
     query: str = ' '.join(keywords)
     params: dict = {'q': query, 'per_page': 100}
     params_str: str = urlencode(params, safe=':+"')
-    # wait for reset if remaining searches = 0 before request
+    # seed the local rate limit state if nothing is known about it yet
     if check_limit:
-      n: int = self._handle_rate_limit()
+      self._check_rate_limit('search')
     # request loop
     url: str = self._repo_path
     cont: bool = True
-    df_search, _ = self._create_empty_df_of_interest()
-    error_count: int = 0
-    max_error_count: int = 10
+    page: int = 0
+    if self._journal is not None:
+      page, next_url, finished = self._journal.resume_point(keywords)
+      if page > 0:
+        self.logger.info(f'Resuming "{query}" after {page} committed pages')
+        yield from self._journal.iter_pages(keywords)
+        cont = not finished
+        url = next_url
     while cont:
-      if n > 0:
-        r: requests.Response = self._session.get(url, params=params_str)
-        n = n - 1
-        self.logger.debug(f'API call done, {n} remaining searches this window')
-        # handling data
-        if r.status_code == 200:
-          df = self._parse_page(r.json(), filter_out_non_programming)
-          df_search = pd.concat([df_search, df], axis=0, ignore_index=True)
-          # handling pagination
-          if 'next' not in r.links.keys():
-            cont = False
-            self.logger.debug('Reached last page')
-          else:
-            url = r.links.get('next').get('url')  # set up url for next iter
+      # the next urls already contain the query parameters
+      r: requests.Response = self._request(
+        url, 'search', params_str if url == self._repo_path else None)
+      self.logger.debug('API call done, '
+                        f'{self._tokens.remaining("search")} remaining '
+                        'searches this window')
+      # handling data
+      if r.status_code == 200:
+        records: list = self._parse_page_records(r.json(),
+                                                 filter_out_non_programming)
+        page += 1
+        # handling pagination
+        if 'next' not in r.links.keys():
+          cont = False
+          self.logger.debug('Reached last page')
         else:
-          error_count += 1
-          self.logger.error(f'HTTP {r.status_code}, retrying...')
-          if error_count >= max_error_count:
-            error_count = 0
-            cont = False
-            self.logger.error(f'Tried {max_error_count} times without'
-                                 'success. Skipping page')
+          url = r.links.get('next').get('url')  # set up url for next iter
+        if self._journal is not None:
+          _, fields_of_interest = self._create_empty_df_of_interest()
+          self._journal.commit(keywords, page, url if cont else None,
+                               pd.DataFrame.from_records(
+                                 records, columns=fields_of_interest))
+        yield records
       else:
-        n = self._handle_rate_limit()
-    self.logger.info(f'Done searching, got {len(df_search)} results')
-    return df_search
+        # the pages so far stay committed, a resumed search continues here
+        raise RuntimeError(f'HTTP {r.status_code} on page {page + 1} of '
+                           f'"{query}", the remaining pages are missing')
 
   def _create_empty_df_of_interest(self) -> tuple[pd.DataFrame, list]:
     fields_of_interest: list = ['id', 'url', 'name', 'description',
@@ -184,13 +462,21 @@ class GitHubSearch:
                                 'main_language', 'has_projects', 'has_wiki',
                                 'has_pages', 'has_discussions', 'has_issues',
                                 'info_url']
-    df = pd.DataFrame(columns=fields_of_interest)
+    df = self._schema.empty(fields_of_interest)
     return df, fields_of_interest
 
   def _parse_page(self, page_body: dict,
                   filter_out_non_programming: bool = False) -> pd.DataFrame:
-    df, _ = self._create_empty_df_of_interest()
-    i: int = 0
+    _, fields_of_interest = self._create_empty_df_of_interest()
+    records: list = self._parse_page_records(page_body,
+                                             filter_out_non_programming)
+    return pd.DataFrame.from_records(records, columns=fields_of_interest)
+
+  def _parse_page_records(self, page_body: dict,
+                          filter_out_non_programming: bool = False
+                          ) -> list[dict]:
+    _, fields_of_interest = self._create_empty_df_of_interest()
+    records: list = []
     items: list = page_body.get('items')
     for repo in items:
       # filter out all non-programming related repositories
@@ -229,9 +515,8 @@ class GitHubSearch:
       # tmp for number of subscribers (int), open issues (int),
       # contributors (int), commits (int) and languages ([str])
       vector.append(repo.get('url'))
-      df.loc[i] = vector
-      i += 1
-    return df
+      records.append(dict(zip(fields_of_interest, vector)))
+    return records
 
   def get_result_count(self, keywords: list, check_limit: bool = True) -> int:
     '''
@@ -260,16 +545,16 @@ class GitHubSearch:
       greater than 1000 the search must be split up into smaller sub-searches.
       In case of error this returns -1.
     '''
-    # creating search string and setting up max pagination
+    # only total_count is read, a single item keeps the response small
     query: str = ' '.join(keywords)
-    params: dict = {'q': query, 'per_page': 100}
+    params: dict = {'q': query, 'per_page': 1}
     params_str: str = urlencode(params, safe=':+"')
     # wait for reset if remaining searches = 0 before request
     if check_limit:
-      _ = self._handle_rate_limit()
+      self._check_rate_limit('search')
     # do initial search
     url: str = self._repo_path
-    r: requests.Response = self._session.get(url, params=params_str)
+    r: requests.Response = self._request(url, 'search', params_str)
     if r.status_code == 200:
       return r.json().get('total_count')
     else:
@@ -279,12 +564,83 @@ class GitHubSearch:
   def _datetime_to_github_str(self, date: datetime) -> str:
     return str(date).split(' ')[0]
 
+  def _created_qualifier(self, start: datetime, end: datetime) -> str:
+    '''
+    Returns the `created:` qualifier for the inclusive range [start, end]. Full
+    days are written as dates, everything else as UTC datetimes. A range that
+    starts at or before the founding of GitHub is written as `created:<=end`.
+    '''
+    whole_days: bool = (start.time() == dt_time(0, 0, 0)
+                        and end.time() == dt_time(23, 59, 59))
+    if whole_days:
+      start_str: str = self._datetime_to_github_str(start)
+      end_str: str = self._datetime_to_github_str(end)
+    else:
+      start_str: str = start.strftime('%Y-%m-%dT%H:%M:%SZ')
+      end_str: str = end.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if start <= self._github_epoch:
+      return f'created:<={end_str}'
+    return f'created:{start_str}..{end_str}'
+
+  def _get_cached_result_count(self, keywords: list) -> int:
+    '''
+    Returns `get_result_count` of the keywords, but only asks the API once
+    per query for the lifetime of this object. Failed counts are not cached.
+    '''
+    query: str = ' '.join(keywords)
+    if query not in self._count_cache:
+      num_results: int = self.get_result_count(keywords, False)
+      if num_results < 0:
+        return num_results
+      self._count_cache[query] = num_results
+    return self._count_cache[query]
+
+  def _count_windows(self, keywords: list, windows: list,
+                     parallel: bool = False) -> list:
+    '''
+    Returns the number of results for each (start, end) window in windows.
+    Sibling windows are counted concurrently if parallel is set.
+    '''
+    queries: list = [keywords + [self._created_qualifier(start, end)]
+                     for start, end in windows]
+    if parallel and len(queries) > 1:
+      with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+        return list(executor.map(self._get_cached_result_count, queries))
+    return [self._get_cached_result_count(query) for query in queries]
+
+  def _split_window(self, start: datetime,
+                    end: datetime) -> tuple[tuple, tuple]:
+    '''
+    Splits the inclusive range [start, end] into two halves. Ranges of more
+    than two days are split at midnight so both halves stay whole days, below
+    that the split happens at second granularity.
+    '''
+    mid: datetime = start + (end - start) / 2
+    if end - start >= timedelta(days=2):
+      mid = mid.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+      mid = mid.replace(microsecond=0) + timedelta(seconds=1)
+    return (start, mid - timedelta(seconds=1)), (mid, end)
+
+  def _day_end(self, date: datetime) -> datetime:
+    '''Returns the last second of the day of a date that has no time set.'''
+    if date.time() == dt_time(0, 0, 0):
+      return date.replace(hour=23, minute=59, second=59)
+    return date.replace(microsecond=0)
+
   def get_date_params(self, keywords: list, check_limit: bool = True,
-                      start_date: datetime = None) -> tuple[int, str]:
+                      start_date: datetime = None,
+                      max_results: int = 1000) -> tuple[int, str]:
     '''
-    Finds the number of results for the first search qualifier that results in
-    an API response with less than 1000 elements in it together with the
-    qualifier string itself.
+    Finds the largest `created:` range ending at start_date that results in
+    an API response with at most max_results elements, together with its
+    number of results.
+
+    The beginning of the range is found by bisection, first in whole days and
+    then down to the second. Counts are cached, so asking for the same range
+    again does not use up any searches. A range that can not be counted
+    (after the retries of every request) raises a RuntimeError, as taking the
+    failure for too many results would silently narrow the range.
 
     Parameters
     ----------
@@ -295,92 +651,146 @@ class GitHubSearch:
     check_limit: bool
       Flag that states if rate limit checking is to be done before doint the
       initial search. Default value is True.
+    start_date: datetime
+      The (inclusive) end of the range. Dates without a time include the whole
+      day. Default is now.
+    max_results: int
+      Maximum number of results per range. Default is 1000, which is the most
+      the GitHub API returns for a single search.
 
     Returns
     -------
     int
       Number of repositories that are found for the given keywords with the
-      first found sub 1000 results creating qualifier.
+      found qualifier. If this is greater than max_results, even a single
+      second has too many results and an error is logged.
     str
       The qualifier as string that results in a sub-search for the keywords
-      with less than 1000 results.
+      with at most max_results results.
     '''
-    if start_date is None:
-      start_date = datetime.now()
-    # rate limit check
     if check_limit:
-      n = self._handle_rate_limit()
-    # from here on n must always be >0 (that's given if check_limit == True)
-    max_results: int = 1000
-    start_year: datetime = start_date - pd.DateOffset(years=1)  # last year
-    start_month: datetime = start_date - pd.DateOffset(months=1)  # last month
-    start_week: datetime = start_date - pd.DateOffset(weeks=1)  # last week
-    start_day: datetime = start_date - pd.DateOffset(days=1)  # yesterday
-    # create qualifiers for the creation date using the ranges
-    # all repositories until start_date, start_date to start_date - 1 year,
-    # start_date to start_date - 1 month, start_date to start_date - 1 week,
-    # and start_date to start_date - 1 day
-    # e.g. 'created:2023.01.01..2024.01.01'
-    created_qualifiers: list = [
-      f'created:<={self._datetime_to_github_str(start_date)}',
-      f'created:{self._datetime_to_github_str(start_year)}..{
-          self._datetime_to_github_str(start_date)}',
-      f'created:{self._datetime_to_github_str(start_month)}..{
-          self._datetime_to_github_str(start_date)}',
-      f'created:{self._datetime_to_github_str(start_week)}..{
-          self._datetime_to_github_str(start_date)}',
-      f'created:{self._datetime_to_github_str(start_day)}..{
-          self._datetime_to_github_str(start_date)}'
-    ]
-    # each qualifier is then used to get the repository count
-    iter: int = 0  # current iteration index of the loop
-    tries: int = 0  # number of tries for this iteration
-    max_tries: int = 5  # number of tries per iteration until it is skipped
-    while iter < len(created_qualifiers):
-      created_qualifier = created_qualifiers[iter]
-      self.logger.info(f'Looking for the keywords "{keywords}" with the'
-                       f'qualifier "{created_qualifier}"')
-      new_keywords = keywords + [created_qualifier]
-      if n <= 0:
-        n = self._handle_rate_limit()
-      num_results: int = self.get_result_count(new_keywords, False)
-      n -= 1
-      if num_results < 0:  # error occurred while counting
-        if tries >= max_tries:
-          self.logger.error(f'Search using "{new_keywords}" was unsuccessful'
-                            f'{max_tries} times. Skipping this qualifier')
-          tries = 0
-          iter += 1
-        else:
-          self.logger.warning('Qualifier led to -1 results, retrying...')
-          tries += 1
-      else:  # data successfully fetched
-        if num_results <= max_results:
-          self.logger.debug(f'Found {num_results} <= {max_results} results'
-                            f'using "{new_keywords}" as search parameters')
-          return num_results, created_qualifier
-        tries = 0
-        iter += 1
-    # if all qualifiers are looked at, there were more than 1000 repositories
-    # created in one week => anomaly
-    self.logger.info(f'More than {max_results} repositories created in the '
-                     f'week of {start_week} to {start_date}, '
-                     'which is an anomaly')
-    return num_results, created_qualifier
+      self._check_rate_limit('search')
+    end: datetime = self._day_end(start_date or datetime.now())
+    # the whole history at once is the largest possible range
+    num_results: int = self._count_range(keywords, self._github_epoch, end)
+    if num_results <= max_results:
+      return num_results, self._created_qualifier(self._github_epoch, end)
+    # invariant: [too_early, end] has too many results, [fitting, end] not
+    too_early: datetime = self._github_epoch
+    fitting: datetime = end
+    best: int = None
+    while fitting - too_early > timedelta(seconds=1):
+      mid: datetime = too_early + (fitting - too_early) / 2
+      if fitting - too_early >= timedelta(days=2):
+        mid = mid.replace(hour=0, minute=0, second=0, microsecond=0)
+      else:
+        mid = mid.replace(microsecond=0)
+      num_results = self._count_range(keywords, mid, end)
+      if num_results <= max_results:
+        fitting, best = mid, num_results
+      else:
+        too_early = mid
+    if best is None:
+      best = self._count_range(keywords, fitting, end)
+    qualifier: str = self._created_qualifier(fitting, end)
+    if best > max_results:
+      self.logger.error(f'{best} > {max_results} repositories found for '
+                        f'"{keywords}" in "{qualifier}", only the first '
+                        f'{max_results} of them can be retrieved')
+    return best, qualifier
+
+  def _count_range(self, keywords: list, start: datetime,
+                   end: datetime) -> int:
+    '''
+    Returns the cached number of results in [start, end], raises a
+    RuntimeError if the count failed.
+    '''
+    num_results: int = self._count_windows(keywords, [(start, end)])[0]
+    if num_results < 0:
+      raise RuntimeError(f'Could not count "{keywords}" in '
+                         f'{self._created_qualifier(start, end)}')
+    return num_results
+
+  def partition_created_range(self, keywords: list, end: datetime = None,
+                              max_results: int = 1000,
+                              parallel: bool = False) -> list[tuple[int, str]]:
+    '''
+    Splits the search for the keywords into the smallest number of `created:`
+    ranges that each have at most max_results results and together cover the
+    whole history of GitHub up until end.
+
+    Ranges with too many results are bisected, first in whole days and then
+    down to the second. Afterwards neighbouring ranges are merged again as
+    long as their summed up counts stay below max_results, so every range
+    ends up just below the limit. Counts are cached, so repeated calls only
+    ask the API for ranges that were not counted before. A range that can not
+    be counted (after the retries of every request) raises a RuntimeError,
+    as its results could exceed max_results unnoticed.
+
+    Parameters
+    ----------
+    keywords: list
+      The list of keywords to use for the search, see `get_result_count`.
+    end: datetime
+      The (inclusive) end of the last range. Dates without a time include the
+      whole day. Default is now.
+    max_results: int
+      Maximum number of results per range. Default is 1000, which is the most
+      the GitHub API returns for a single search.
+    parallel: bool
+      Flag that states if the counts of sibling ranges are requested
+      concurrently. Default is False.
+
+    Returns
+    -------
+    list[tuple[int, str]]
+      The number of results and the qualifier of every range, starting with
+      the most recent one. Ranges that still exceed max_results after being
+      split down to a single second are kept and logged as errors.
+    '''
+    end = self._day_end(end or datetime.now())
+    pending: list = [(self._github_epoch, end)]
+    windows: list = []  # (start, end, count) of the final, unsplittable ranges
+    with self._stage('partition'):
+      while pending:
+        counts: list = self._count_windows(keywords, pending, parallel)
+        next_pending: list = []
+        for (start, stop), count in zip(pending, counts):
+          if count > max_results and stop - start >= timedelta(seconds=1):
+            next_pending.extend(self._split_window(start, stop))
+            continue
+          if count < 0:
+            raise RuntimeError(f'Could not count "{keywords}" in '
+                               f'{self._created_qualifier(start, stop)}')
+          if count > max_results:
+            self.logger.error(f'{count} > {max_results} repositories created '
+                              f'at {start} for "{keywords}", only the first '
+                              f'{max_results} of them can be retrieved')
+          windows.append((start, stop, count))
+        pending = next_pending
+    # merge neighbours from the most recent range backwards
+    windows.sort(key=lambda window: window[0], reverse=True)
+    merged: list = []
+    for start, stop, count in windows:
+      if merged and merged[-1][2] + count <= max_results:
+        merged[-1] = (start, merged[-1][1], merged[-1][2] + count)
+      else:
+        merged.append((start, stop, count))
+    self.logger.info(f'Split "{keywords}" into {len(merged)} ranges using '
+                     f'{len(self._count_cache)} cached counts')
+    return [(count, self._created_qualifier(start, stop))
+            for start, stop, count in merged]
 
   def get_all_date_params(self, keywords: list,
-                          date: datetime = datetime(2024, 1, 1)):
-    num_results, qualifier = self.get_date_params(keywords,
-                                                  start_date=date)
-    qualifiers: list = [qualifier]
-    while num_results != 0 and not qualifier.split(':')[1].startswith('<='):
-      date_str: str = qualifier.split(r':')[1]  # remove 'created:'
-      date_str = date_str.split(r'..')[0]  # remove '..YYYY-MM-DD'
-      search_date: datetime = datetime.strptime(date_str, '%Y-%m-%d')
-      num_results, qualifier = self.get_date_params(keywords,
-                                                    start_date=search_date)
-      qualifiers.append(qualifier)
-    return qualifiers
+                          date: datetime = datetime(2024, 1, 1),
+                          parallel: bool = False) -> list:
+    '''
+    Returns the qualifiers of `partition_created_range` for all repositories
+    created until the given date, starting with the most recent range.
+    '''
+    return [qualifier for _, qualifier
+            in self.partition_created_range(keywords, date,
+                                            parallel=parallel)]
   # endregion
 
   # region additional search
@@ -393,13 +803,12 @@ class GitHubSearch:
     The results of this could be appended to a DataFrame for better analysis
     options.
 
-    This performs 4-6 new API calls on the `core` resource.
+    This performs 4 new API calls on the `core` resource. Use
+    `get_additional_data` to enrich a whole DataFrame concurrently.
       * 1 call to get the number of open issues and subscribers on api_url
-      * 1-2 calls to get the number of contributors. If less than 30 this is
-        only 1 API call. If more than 30 then this needs exactly 2 calls
+      * 1 call to get the number of contributors
       * 1 call to get the list of languages used in this repository
-      * 1-2 calls to get the README contents of this repository. If no README
-        is found in the repository this only uses 1 call
+      * 1 call to get the README contents of this repository
 
     Parameters
     ----------
@@ -423,17 +832,13 @@ class GitHubSearch:
       includes the main_language as well as all other languages associated
       with files in this repository.
     readme: str
-      Text content of the README file of this repository. This is only
-      successful if there is a readme.md or readme.txt file (case-insensitive)
-      in the root of the repository.
+      Text content of the README file of this repository as returned by
+      `get_readme`.
     '''
-    api_url: str = f'https://api.github.com/repos/{owner}/{name}'
-    per_page: int = 30  # limit for some of the queries
-    n: int = self._handle_rate_limit(resource='core')
+    api_url: str = f'{self._api_url}/repos/{owner}/{name}'
 
     # reading open_issues and subscribers_count from the details api_url
-    r: requests.Response = self._session.get(api_url)
-    n -= 1
+    r: requests.Response = self._request(api_url, 'core')
     if r.status_code == 200:
       num_issues = r.json()['open_issues']
       num_subscribers = r.json()['subscribers_count']
@@ -442,73 +847,298 @@ class GitHubSearch:
     else:
       self.logger.error(f'HTTP {r.status_code}, {r.url}')
       # if initial search fails, the following calls will fail as-well
-      return (-1, -1, -1, -1, [])
+      return (-1, -1, -1, [], 'ERROR')
 
     # reading the number of contributors from the paginated contributors_url
-    if n < 2:
-      n: int = self._handle_rate_limit(min_limit=2, resource='core')
-    r: requests.Response = self._session.get(contributors_url)
-    n -= 1
-    if r.status_code == 200:
-      if 'last' in r.links:
-        last_url: str = r.links.get('last').get('url')
-        r: requests.Response = self._session.get(last_url)
-        n -= 1
-        if r.status_code == 200:
-          pattern = r'page=(\d+)'
-          match = re.search(pattern, last_url)
-          last_page_number: int = int(match.group(1))  # ? must be there
-          num_contributors = per_page * (last_page_number - 1) + len(r.json())
-        else:
-          self.logger.error(f'HTTP {r.status_code}, {r.url}')
-          num_contributors = -1
-      else:
-        num_contributors = len(r.json())
-    else:
-      self.logger.error(f'HTTP {r.status_code}, {r.url}')
-      num_contributors = -1
+    num_contributors: int = self._get_num_contributors(contributors_url)
 
     # reading all used languages in the repository from languages_url
-    if n < 1:
-      n: int = self._handle_rate_limit(resource='core')
-    r: requests.Response = self._session.get(languages_url)
-    n -= 1
+    r: requests.Response = self._request(languages_url, 'core')
     if r.status_code == 200:
       body: dict = r.json()
       languages = list(body.keys())
     else:
       languages = []
 
-    # reading out README contents from /contents
-    if n < 2:
-      n: int = self._handle_rate_limit(resource='core')
-    contents_url: str = f'{api_url}/contents'
-    contents_url = re.sub(r'//contents', r'/contents', contents_url)
-    r: requests.Response = self._session.get(contents_url)
-    n -= 1
-    if r.status_code == 200:
-      files: list = r.json()
-      readme: str = ''  # ? in case no README found
-      for repo_file in files:
-        fname: str = str(repo_file.get('name')).lower()
-        if fname.startswith('readme.'):
-          readme_url: str = repo_file.get('url')
-          r: requests.Response = self._session.get(readme_url)
-          n -= 1
-          if r.status_code == 200:
-            readme_dict: dict = r.json()
-            readme_bytes: bytes = base64.b64decode(readme_dict.get('content'))
-            encoding_detection = chardet.detect(readme_bytes)
-            encoding: str = encoding_detection.get('encoding')
-            if encoding:
-              readme = readme_bytes.decode(encoding, 'ignore')
-            else:
-              readme = 'Invalid Encoding'
-            break
-          else:
-            readme = 'ERROR'
-    else:
-      readme = 'ERROR'
+    # reading out README contents from /readme
+    readme: str = self.get_readme(name, owner)
 
     return num_issues, num_subscribers, num_contributors, languages, readme
+
+  def _get_num_contributors(self, contributors_url: str) -> int:
+    '''
+    Returns the number of contributors of a repository or -1 on error. With
+    one contributor per page, the number of the last page is the number of
+    contributors, so this always takes exactly 1 call.
+    '''
+    r: requests.Response = self._request(contributors_url, 'core',
+                                         {'per_page': 1})
+    if r.status_code == 200:
+      if 'last' in r.links:
+        last_url: str = r.links.get('last').get('url')
+        match = re.search(r'[?&]page=(\d+)', last_url)
+        return int(match.group(1))  # ? must be there
+      return len(r.json())
+    # 204 is returned for empty repositories
+    if r.status_code == 204:
+      return 0
+    self.logger.error(f'HTTP {r.status_code}, {r.url}')
+    return -1
+
+  def get_readme(self, name: str, owner: str) -> str:
+    '''
+    Returns the text of the README of a repository.
+
+    This performs 1 API call on the `core` resource. The preferred README of
+    the repository (as shown on its GitHub page) is downloaded in the raw
+    media type, so no base64 payload has to be decoded, and the download
+    stops after the `max_bytes` of the README decoder.
+
+    Parameters
+    ----------
+    name: str
+      Name of the repository.
+    owner: str
+      Name of the repository owner.
+
+    Returns
+    -------
+    str
+      The decoded README text, "" if the repository has no README, "Invalid
+      Encoding" if its encoding could not be detected and "ERROR" on error.
+    '''
+    readme_url: str = f'{self._api_url}/repos/{owner}/{name}/readme'
+    headers: dict = {'Accept': 'application/vnd.github.raw'}
+    r: requests.Response = self._request(
+      readme_url, 'core', headers=headers,
+      max_bytes=self._readme_decoder.max_bytes)
+    if r.status_code == 200:
+      return self._readme_decoder.decode(r.content)
+    # 404 is returned for repositories without README
+    if r.status_code == 404:
+      return ''
+    self.logger.error(f'HTTP {r.status_code}, {r.url}')
+    return 'ERROR'
+
+  def get_readmes(self, df: pd.DataFrame, name_key: str = 'name',
+                  owner_key: str = 'owner',
+                  max_workers: int = None) -> pd.Series:
+    '''
+    Returns the `get_readme` texts of all repositories in the given DataFrame
+    as Series with the same index, requested concurrently by max_workers
+    worker threads (default is the `max_workers` of this object).
+    '''
+    rows: list = list(zip(df[name_key], df[owner_key]))
+    with self._stage('readmes'):
+      readmes: list = self._run_concurrently(lambda row: self.get_readme(*row),
+                                             rows,
+                                             max_workers or self._max_workers,
+                                             'ERROR')
+    return pd.Series(readmes, index=df.index, name='readme', dtype=object)
+
+  def get_additional_data(self, df: pd.DataFrame, name_key: str = 'name',
+                          owner_key: str = 'owner', max_workers: int = None,
+                          backend: str = 'rest',
+                          batch_size: int = 25) -> pd.DataFrame:
+    '''
+    Gathers the additional information of `get_additional_data_for_row` for
+    every repository in the given DataFrame at once.
+
+    The repositories are enriched concurrently by a bounded pool of worker
+    threads. All workers share the keep-alive connection pool of the session
+    and draw from the same rate limit budget, so the whole pool waits for the
+    next time frame once that budget is used up.
+
+    With the "graphql" backend, batch_size repositories are packed into a
+    single GraphQL query that returns their open issues, watchers, languages
+    and README texts. Only the number of contributors, which GraphQL does not
+    provide, is requested from the REST API afterwards, and the README
+    wherever GraphQL can not pick the one that `get_readme` returns: GitHub
+    prefers a README in .github/ over the root and falls back to docs/, and
+    has its own precedence among several READMEs. GraphQL READMEs are
+    therefore only used if the root holds exactly one README, in a format
+    that the query requests, and .github/ holds none. The GraphQL API
+    requires a token.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+      DataFrame containing one repository per row, e.g. the result of
+      `get_all_search_results`.
+    name_key: str
+      Name of the column containing the repository names. Default is "name".
+    owner_key: str
+      Name of the column containing the repository owners. Default is "owner".
+    max_workers: int
+      Number of concurrent worker threads. Default is the `max_workers` value
+      this object was created with.
+    backend: str
+      Either "rest" or "graphql". Default is "rest".
+    batch_size: int
+      Number of repositories per GraphQL query. Default is 25.
+
+    Returns
+    -------
+    pd.DataFrame
+      DataFrame with the same index as `df` and the columns "num_issues",
+      "num_subscribers", "num_contributors", "languages" and "readme", typed
+      by `RepositorySchema`. It can be appended to `df` using `df.join`.
+    '''
+    if max_workers is None:
+      max_workers = self._max_workers
+    if backend == 'graphql' and not self.is_authenticated:
+      self.logger.warning('The GraphQL API requires a token, using REST')
+      backend = 'rest'
+    columns: list = ['num_issues', 'num_subscribers', 'num_contributors',
+                     'languages', 'readme']
+    rows: list = list(zip(df[name_key], df[owner_key]))
+    with self._stage('enrichment'):
+      if backend == 'graphql':
+        batches: list = [rows[i:i + batch_size]
+                         for i in range(0, len(rows), batch_size)]
+        partials: list = self._run_concurrently(self._query_graphql_batch,
+                                                batches, max_workers, None)
+        partials = [partial for batch, result in zip(batches, partials)
+                    for partial in (result or [{'rest': True, 'name': name,
+                                                'owner': owner}
+                                               for name, owner in batch])]
+        results: list = self._run_concurrently(self._complete_graphql_row,
+                                               partials, max_workers,
+                                               (-1, -1, -1, [], 'ERROR'))
+      else:
+        results: list = self._run_concurrently(
+          lambda row: self.get_additional_data_for_row(*row), rows, max_workers,
+          (-1, -1, -1, [], 'ERROR'))
+    self.logger.info(f'Done enriching {len(rows)} repositories')
+    return self._schema.apply(pd.DataFrame(results, index=df.index,
+                                           columns=columns))
+
+  def _run_concurrently(self, func, items: list, max_workers: int,
+                        default=None) -> list:
+    '''
+    Returns [func(item) for item in items] computed by a pool of worker
+    threads. Items that raise an exception are logged and result in default.
+    '''
+    results: list = [default] * len(items)
+    done: int = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      futures: dict = {executor.submit(func, item): i
+                       for i, item in enumerate(items)}
+      for future in as_completed(futures):
+        i: int = futures[future]
+        try:
+          results[i] = future.result()
+        except Exception as e:  # keep the other items on failure
+          self.logger.error(f'{func.__name__} failed for {items[i]}: {e}')
+        done += 1
+        if done % 100 == 0:
+          self.logger.info(f'Processed {done}/{len(items)} items')
+    return results
   # endregion
+
+  # region graphql enrichment
+  # README names that are requested directly in the GraphQL query, all other
+  # READMEs are requested from the REST API
+  _graphql_readme_names: list = ['README.md', 'readme.md', 'Readme.md',
+                                 'README.rst', 'README.txt',
+                                 'README.markdown']
+
+  def _build_graphql_query(self, rows: list) -> str:
+    '''
+    Returns a GraphQL query that requests the data of interest of every
+    (name, owner) pair in rows using the aliases r0, r1, ...
+    '''
+    readme_fields: str = '\n'.join(
+      f'  f{i}: object(expression: {json.dumps("HEAD:" + readme)}) '
+      '{ ... on Blob { text isBinary } }'
+      for i, readme in enumerate(self._graphql_readme_names))
+    repositories: str = '\n'.join(
+      f'  r{i}: repository(owner: {json.dumps(owner)}, '
+      f'name: {json.dumps(name)}) {{ ...enrichment }}'
+      for i, (name, owner) in enumerate(rows))
+    return ('query {\n'
+            '  rateLimit { cost remaining resetAt }\n'
+            f'{repositories}\n'
+            '}\n'
+            'fragment enrichment on Repository {\n'
+            '  issues(states: OPEN) { totalCount }\n'
+            '  pullRequests(states: OPEN) { totalCount }\n'
+            '  watchers { totalCount }\n'
+            '  languages(first: 100, '
+            'orderBy: {field: SIZE, direction: DESC}) { nodes { name } }\n'
+            '  root: object(expression: "HEAD:") '
+            '{ ... on Tree { entries { name } } }\n'
+            '  github: object(expression: "HEAD:.github") '
+            '{ ... on Tree { entries { name } } }\n'
+            f'{readme_fields}\n'
+            '}\n')
+
+  def _query_graphql_batch(self, rows: list) -> list[dict]:
+    '''
+    Requests the data of interest of a batch of (name, owner) pairs with one
+    GraphQL query. Returns one partial result per pair that still lacks the
+    REST-only fields, or None if the query failed as a whole.
+    '''
+    r: requests.Response = self._request(
+      f'{self._api_url}/graphql', 'graphql',
+      json_body={'query': self._build_graphql_query(rows)})
+    body: dict = r.json() if r.status_code == 200 else {}
+    data: dict = body.get('data')
+    if data is None:
+      self.logger.error(f'HTTP {r.status_code}, GraphQL query failed: '
+                        f'{body.get("errors")}')
+      return None
+    partials: list = []
+    for i, (name, owner) in enumerate(rows):
+      node: dict = data.get(f'r{i}')
+      partial: dict = {'name': name, 'owner': owner, 'rest': False}
+      if node is None:
+        self.logger.error(f'GraphQL found no repository {owner}/{name}')
+        partial['error'] = True
+        partials.append(partial)
+        continue
+      partial['num_issues'] = (node['issues']['totalCount']
+                               + node['pullRequests']['totalCount'])
+      partial['num_subscribers'] = node['watchers']['totalCount']
+      partial['languages'] = [lang['name']
+                              for lang in node['languages']['nodes']]
+      # None is requested from the REST API, see `get_additional_data`
+      partial['readme'] = None
+      readmes: list = self._readme_names(node.get('root'))
+      if len(readmes) == 1 and not self._readme_names(node.get('github')) \
+         and readmes[0] in self._graphql_readme_names:
+        blob: dict = node.get(
+          f'f{self._graphql_readme_names.index(readmes[0])}') or {}
+        if blob.get('text') is not None and not blob.get('isBinary'):
+          # capped and decoded like the download of `get_readme`
+          partial['readme'] = self._readme_decoder.decode(
+            blob['text'].encode('utf-8'))
+      partials.append(partial)
+    return partials
+
+  @staticmethod
+  def _readme_names(tree: dict) -> list[str]:
+    '''Returns the names of the README files of a GraphQL tree object.'''
+    return [entry['name'] for entry in (tree or {}).get('entries') or []
+            if entry['name'].split('.')[0].lower() == 'readme']
+
+  def _complete_graphql_row(self, partial: dict) -> tuple[int, int, int,
+                                                          list, str]:
+    '''
+    Completes a partial result of `_query_graphql_batch` with the fields that
+    have to be requested from the REST API.
+    '''
+    name, owner = partial['name'], partial['owner']
+    if partial['rest']:
+      return self.get_additional_data_for_row(name, owner)
+    if partial.get('error'):
+      return (-1, -1, -1, [], 'ERROR')
+    api_url: str = f'{self._api_url}/repos/{owner}/{name}'
+    num_contributors: int = self._get_num_contributors(
+      f'{api_url}/contributors')
+    readme: str = partial['readme']
+    if readme is None:
+      readme = self.get_readme(name, owner)
+    return (partial['num_issues'], partial['num_subscribers'],
+            num_contributors, partial['languages'], readme)
+
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from .schema import RepositorySchema
+
+
+class SnapshotStore:
+  '''
+  Class that keeps all intermediate CSV files of the open-source search
+  (search results, filter stages, manual classifications) as one columnar
+  Parquet file instead of one full copy per stage.
+
+  Every repository is stored once, identified by its url, together with a
+  membership bitmap whose bit i is set if the repository is part of snapshot
+  i. Columns of the `RepositorySchema` are shared by the snapshots of search
+  results (the ones with an "id" column) as long as they agree on the values
+  of their common repositories, which is the case for most columns, e.g. the
+  descriptions and READMEs. A snapshot with other values (e.g. counts that
+  changed between two searches) and all other columns, including the ones of
+  the manual classifications ("classification" means different things in
+  both files), are stored per snapshot as "{snapshot}/{column}". Loading
+  reads only the requested columns and filters the rows on the bitmap while
+  scanning, so counting and plotting never parse the CSV files. CSV files of
+  a snapshot are written on demand with `export`.
+
+  Attributes
+  ----------
+  directory: str
+    Directory of the store.
+  key: str
+    Column that identifies a repository in every snapshot.
+  default_snapshots: list
+    The (name, path relative to the data directory, read_csv arguments) of
+    the files read by visualization.ipynb, in the order they were created.
+
+  Methods
+  -------
+  build(snapshots: list) -> None
+    Writes the given (name, DataFrame) snapshots to the store.
+  from_directory(data_dir: str, snapshots: list) -> None
+    Builds the store from the CSV files of the data directory.
+  snapshots() -> list[str]
+    Returns the names of the stored snapshots in order.
+  columns(snapshot: str) -> list[str]
+    Returns the columns of a snapshot.
+  load(snapshot: str, columns: list) -> pd.DataFrame
+    Returns the repositories of a snapshot with the given columns.
+  counts() -> pd.Series
+    Returns the number of repositories per snapshot.
+  export(snapshot: str, file_path: str) -> None
+    Writes a snapshot to a CSV file like the original one.
+
+  Examples
+  --------
+  ```py
+  store = SnapshotStore('data/store')
+  store.from_directory('data')
+  print(store.counts())
+  df_description = store.load('description', ['url', 'classification'])
+  ```
+  '''
+
+  default_snapshots: list = [
+    ('raw', 'initial/data.csv', {}),
+    ('filter1_initial', 'initial/data_filtered_initial.csv', {}),
+    ('filter1', 'test/data_filtered_appended_all.csv', {}),
+    ('filter2', 'initial/data_filtered_pre_readme_fetch.csv', {}),
+    ('appended', 'appended/data_filtered_appended_1.csv', {}),
+    ('filter3', 'appended/final.csv', {}),
+    ('description', 'manual/filter_by_description.csv', {}),
+    ('readme', 'manual/filter_by_readme.csv', {'skiprows': 1}),
+    ('frameworks', 'frams.csv', {})]
+
+  def __init__(self, directory: str = 'data/store', key: str = 'url'):
+    self.logger = logging.getLogger('search_logger')
+    self.directory: str = directory
+    self.key: str = key
+    self.schema: RepositorySchema = RepositorySchema()
+
+  def _path(self, file_name: str) -> str:
+    return os.path.join(self.directory, file_name)
+
+  def _meta(self) -> dict:
+    with open(self._path('store.json'), 'r', encoding='utf-8') as file:
+      return json.load(file)
+
+  def build(self, snapshots: list) -> None:
+    '''
+    Writes the given list of (name, DataFrame) snapshots to the store,
+    replacing its previous content. Every snapshot is loaded back with the
+    values it was built from.
+    '''
+    if len(snapshots) > 32:
+      raise ValueError(f'The bitmap holds at most 32 snapshots, '
+                       f'got {len(snapshots)}')
+    os.makedirs(self.directory, exist_ok=True)
+    keys: pd.Index = pd.Index(pd.unique(pd.concat(
+      [df[self.key] for _, df in snapshots], ignore_index=True)))
+    table: dict = {}
+    written: dict = {}  # column -> positions that hold a value of a snapshot
+    membership: np.ndarray = np.zeros(len(keys), dtype=np.uint32)
+    meta: dict = {'key': self.key, 'snapshots': []}
+    for i, (name, df) in enumerate(snapshots):
+      # index columns of earlier to_csv calls
+      df = df.drop(columns=[c for c in df.columns if c.startswith('Unnamed: ')])
+      df = df.drop_duplicates(subset=self.key).set_index(self.key)
+      positions: np.ndarray = keys.get_indexer(df.index)
+      membership[positions] |= np.uint32(1 << i)
+      shared: list = []
+      for column in df.columns:
+        new: np.ndarray = df[column].astype(object).to_numpy()
+        if 'id' in df.columns and self.schema._dtype_of(column) is not None \
+           and self._agrees(table.get(column), written.get(column),
+                            positions, new):
+          shared.append(column)
+          stored: str = column
+        else:
+          stored = f'{name}/{column}'
+        values: np.ndarray = table.setdefault(
+          stored, np.full(len(keys), None, dtype=object))
+        values[positions] = new
+        written.setdefault(stored, np.zeros(len(keys), dtype=bool))[
+          positions] = True
+      meta['snapshots'].append({'name': name, 'rows': len(df),
+                                'columns': [self.key] + list(df.columns),
+                                'shared': shared})
+    frame: pd.DataFrame = pd.DataFrame({self.key: keys.astype(str), **table})
+    # values are strings of the CSV files, missing ones become None
+    frame = self.schema.apply(frame.where(frame.notna(), None))
+    frame['membership'] = membership
+    frame.to_parquet(self._path('repos.parquet'), index=False,
+                     compression='zstd')
+    with open(self._path('store.json'), 'w', encoding='utf-8') as file:
+      json.dump(meta, file, indent=2)
+    self.logger.info(f'Stored {len(keys)} repos of {len(snapshots)} '
+                     f'snapshots in {self.directory}')
+
+  def _agrees(self, values: np.ndarray, written: np.ndarray,
+              positions: np.ndarray, new: np.ndarray) -> bool:
+    '''
+    Returns whether the new values of a shared column equal the ones already
+    written at positions by earlier snapshots, compared as CSV strings.
+    '''
+    if values is None:
+      return True
+    stored: np.ndarray = written[positions]
+    old: pd.Series = pd.Series(values[positions][stored])
+    new: pd.Series = pd.Series(new[stored])
+    return bool((old.astype(str).where(old.notna(), '')
+                 == new.astype(str).where(new.notna(), '')).all())
+
+  def from_directory(self, data_dir: str = 'data',
+                     snapshots: list = None) -> None:
+    '''
+    Builds the store from the CSV files of data_dir, by default the ones of
+    `default_snapshots`. Missing files are skipped with a warning.
+    '''
+    frames: list = []
+    for name, path, kwargs in (snapshots if snapshots is not None
+                               else self.default_snapshots):
+      file_path: str = os.path.join(data_dir, path)
+      if not os.path.exists(file_path):
+        self.logger.warning(f'Skipping snapshot {name}, {file_path} is missing')
+        continue
+      frames.append((name, pd.read_csv(file_path, **kwargs)))
+    self.build(frames)
+
+  def snapshots(self) -> list[str]:
+    '''Returns the names of the stored snapshots in order.'''
+    return [snapshot['name'] for snapshot in self._meta()['snapshots']]
+
+  def columns(self, snapshot: str) -> list[str]:
+    '''Returns the columns of a snapshot as in its original file.'''
+    return self._snapshot(snapshot)['columns']
+
+  def _snapshot(self, snapshot: str) -> dict:
+    for stored in self._meta()['snapshots']:
+      if stored['name'] == snapshot:
+        return stored
+    raise KeyError(f'Unknown snapshot "{snapshot}"')
+
+  def load(self, snapshot: str, columns: list = None) -> pd.DataFrame:
+    '''
+    Returns the repositories of a snapshot with the given columns (default:
+    all columns of the snapshot) in their schema types. Only the requested
+    columns and the rows of the snapshot are read from disk.
+    '''
+    names: list = self.snapshots()
+    bit: int = 1 << names.index(snapshot)
+    shared: list = [self.key] + self._snapshot(snapshot)['shared']
+    columns = columns if columns is not None else self.columns(snapshot)
+    stored: dict = {column if column in shared else f'{snapshot}/{column}':
+                    column for column in columns}
+    table: pa.Table = ds.dataset(self._path('repos.parquet')).to_table(
+      columns=list(stored), filter=pc.bit_wise_and(
+        ds.field('membership'), pa.scalar(bit, pa.uint32())) != 0)
+    # like RepositorySchema.load, the Arrow types are converted by apply
+    df: pd.DataFrame = table.to_pandas(ignore_metadata=True)
+    return self.schema.apply(df.rename(columns=stored))
+
+  def counts(self) -> pd.Series:
+    '''
+    Returns the number of repositories per snapshot, read from the
+    membership bitmap only.
+    '''
+    membership: np.ndarray = ds.dataset(self._path('repos.parquet')) \
+      .to_table(columns=['membership'])['membership'].to_numpy()
+    names: list = self.snapshots()
+    return pd.Series([int(((membership >> np.uint32(i)) & 1).sum())
+                      for i in range(len(names))], index=names, name='repos')
+
+  def export(self, snapshot: str, file_path: str) -> None:
+    '''
+    Writes the repositories of a snapshot with its original columns to a
+    CSV (or Parquet) file, see `RepositorySchema.save`.
+    '''
+    self.schema.save(self.load(snapshot), file_path)
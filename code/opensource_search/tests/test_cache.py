@@ -0,0 +1,80 @@
+import os
+import pandas as pd
+import requests
+from gh_search.cache import ResponseCache
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.metrics import CrawlMetrics
+from gh_search.search import GitHubSearch
+
+KEYWORDS: list = ['ema', 'created:<=2012-12-31']
+
+
+def crawl(api_url: str, cache: ResponseCache) -> tuple:
+  '''Searches the keywords and enriches the first 20 results.'''
+  metrics: CrawlMetrics = CrawlMetrics()
+  gh: GitHubSearch = GitHubSearch('token', max_workers=4, api_url=api_url,
+                                  cache=cache, metrics=metrics)
+  try:
+    df: pd.DataFrame = gh.get_all_search_results(KEYWORDS, check_limit=False)
+    df = df.head(20)[['owner', 'name']]
+    return pd.concat([df, gh.get_additional_data(df)], axis=1), metrics
+  finally:
+    gh.dispose()  # closes the cache as well
+
+
+def test_second_crawl_is_revalidated(api: FakeGitHubAPI, api_url: str,
+                                     tmp_path):
+  file_path: str = os.path.join(tmp_path, 'github.sqlite')
+  first, metrics = crawl(api_url, ResponseCache(file_path))
+  assert not metrics.frame()['cached'].any()
+  assert not api.not_modified
+  before: dict = api._resources('token')
+  second, metrics = crawl(api_url, ResponseCache(file_path))
+  pd.testing.assert_frame_equal(first, second)
+  assert metrics.frame()['cached'].all()
+  assert sum(api.not_modified.values()) == len(metrics.frame())
+  # 304 responses do not count against the rate limit
+  after: dict = api._resources('token')
+  assert after['search']['remaining'] == before['search']['remaining']
+  assert after['core']['remaining'] == before['core']['remaining']
+
+
+def test_changed_responses_are_refetched(api: FakeGitHubAPI, api_url: str,
+                                         tmp_path):
+  file_path: str = os.path.join(tmp_path, 'github.sqlite')
+  first, _ = crawl(api_url, ResponseCache(file_path))
+  owner, name = first.loc[0, 'owner'], first.loc[0, 'name']
+  api._by_name[(owner, name)]['readme'] = '# Changed\n\nAn ema study.\n'
+  second, metrics = crawl(api_url, ResponseCache(file_path))
+  assert 'Changed' in second.loc[0, 'readme']
+  assert second.drop(index=0).equals(first.drop(index=0))
+  df: pd.DataFrame = metrics.frame()
+  refetched: pd.DataFrame = df[~df['cached']]
+  assert refetched['endpoint'].tolist() == ['/repos/{repo}/readme']
+  assert refetched['status'].tolist() == [200]
+
+
+def test_offline_cache_replays_without_requests(api: FakeGitHubAPI,
+                                                api_url: str, tmp_path):
+  file_path: str = os.path.join(tmp_path, 'github.sqlite')
+  first, _ = crawl(api_url, ResponseCache(file_path))
+  calls: int = sum(api.calls.values())
+  second, metrics = crawl(api_url, ResponseCache(file_path, offline=True))
+  pd.testing.assert_frame_equal(first, second)
+  assert sum(api.calls.values()) == calls
+  assert metrics.frame()['cached'].all()
+
+
+def test_if_modified_since(api: FakeGitHubAPI, api_url: str):
+  url: str = f'{api_url}/repos/owner0/repo0'
+  r: requests.Response = requests.get(
+    url, headers={'If-Modified-Since': api.last_modified})
+  assert r.status_code == 304 and r.content == b''
+  assert r.headers['ETag'] and r.headers['X-RateLimit-Remaining']
+  r = requests.get(url, headers={
+    'If-Modified-Since': 'Mon, 01 Jan 2018 00:00:00 GMT'})
+  assert r.status_code == 200 and r.json()['name'] == 'repo0'
+  # an entity tag takes precedence over the date
+  r = requests.get(url, headers={'If-None-Match': '"outdated"',
+                                 'If-Modified-Since': api.last_modified})
+  assert r.status_code == 200
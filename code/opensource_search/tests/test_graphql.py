@@ -0,0 +1,60 @@
+import os
+import pandas as pd
+import pytest
+from gh_search.benchmark import CrawlBenchmark
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.metrics import CrawlMetrics
+from gh_search.readme import ReadmeDecoder
+from gh_search.search import GitHubSearch
+
+# first repositories of data/appended/data_filtered_appended_1.csv, recorded
+# with `CrawlBenchmark.save_fixtures`
+FIXTURES: str = os.path.join(os.path.dirname(__file__), 'fixtures',
+                             'repositories.json')
+
+
+@pytest.fixture
+def repositories() -> list:
+  repositories: list = CrawlBenchmark.load_fixtures(FIXTURES) \
+    + FakeGitHubAPI.generate_repositories(30)
+  repositories[-1]['readme'] = None
+  # longer than the cap of the decoder, which cuts a character in half
+  repositories[-2]['readme'] = 'Überblick ' + 'ä' * 600
+  # READMEs outside the root are only found by the REST API
+  repositories[-3]['readme_path'] = 'docs/README.md'
+  repositories[-4]['readme_path'] = '.github/README.md'
+  return repositories
+
+
+def enrich(api_url: str, df: pd.DataFrame, backend: str) -> tuple:
+  metrics: CrawlMetrics = CrawlMetrics()
+  gh: GitHubSearch = GitHubSearch('token', max_workers=4, api_url=api_url,
+                                  readme_decoder=ReadmeDecoder(max_bytes=512),
+                                  metrics=metrics)
+  try:
+    return gh.get_additional_data(df, backend=backend, batch_size=7), metrics
+  finally:
+    gh.dispose()
+
+
+def test_graphql_and_rest_return_identical_frames(api_url: str,
+                                                  repositories: list):
+  df: pd.DataFrame = pd.DataFrame(
+    [(repo['name'], repo['owner']) for repo in repositories]
+    + [('missing', 'nobody')], columns=['name', 'owner'])
+  rest, rest_metrics = enrich(api_url, df, 'rest')
+  graphql, graphql_metrics = enrich(api_url, df, 'graphql')
+  pd.testing.assert_frame_equal(graphql, rest)
+  assert (rest['num_issues'] >= 0).sum() == len(repositories)
+  assert rest['readme'].iloc[-1] == 'ERROR'
+  assert rest['readme'].iloc[-2] == ''
+  assert len(rest['readme'].iloc[-3].encode('utf-8')) <= 512
+  assert 'repo' in rest['readme'].iloc[-4] and 'repo' in rest['readme'].iloc[-5]
+  # one query per batch, only the contributors and the READMEs that are not
+  # the only one in the root are requested from REST
+  endpoints: pd.Series = graphql_metrics.frame()['endpoint'].value_counts()
+  assert endpoints['/graphql'] == (len(df) + 6) // 7
+  assert endpoints['/repos/{repo}/contributors'] == len(repositories)
+  assert endpoints['/repos/{repo}/readme'] == 2 + sum(
+    repo['readme'] is None for repo in repositories)
+  assert len(rest_metrics.frame()) == 4 * len(repositories) + 1
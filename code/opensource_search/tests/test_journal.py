@@ -0,0 +1,68 @@
+import os
+import pandas as pd
+import pytest
+from gh_search.journal import CrawlJournal
+from gh_search.metrics import CrawlMetrics
+from gh_search.search import GitHubSearch
+
+# about 320 of the fixture repositories, i.e. 4 pages
+KEYWORDS: list = ['ema', 'created:<=2012-12-31']
+
+
+@pytest.fixture
+def directory(tmp_path) -> str:
+  return os.path.join(tmp_path, 'journal')
+
+
+def search(api_url: str, directory: str = None) -> tuple:
+  '''Runs the search like a new process would, the journal is reopened.'''
+  metrics: CrawlMetrics = CrawlMetrics()
+  gh: GitHubSearch = GitHubSearch(
+    'token', api_url=api_url, metrics=metrics,
+    journal=CrawlJournal(directory) if directory else None)
+  try:
+    return gh.get_all_search_results(KEYWORDS, check_limit=False), metrics
+  finally:
+    gh.dispose()
+
+
+def searches(metrics: CrawlMetrics) -> int:
+  df: pd.DataFrame = metrics.frame()
+  return int((df['endpoint'] == '/search/repositories').sum())
+
+
+def test_interrupted_search_resumes_after_last_page(api_url: str,
+                                                    directory: str):
+  expected, metrics = search(api_url)
+  assert searches(metrics) == 4
+  journal: CrawlJournal = CrawlJournal(directory)
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url, journal=journal)
+  pages = gh.iter_search_pages(KEYWORDS, check_limit=False)
+  next(pages)
+  next(pages)
+  pages.close()  # interrupted after the second page
+  page, next_url, finished = journal.resume_point(KEYWORDS)
+  assert (page, finished) == (2, False) and 'page=3' in next_url
+  gh.dispose()
+  df, metrics = search(api_url, directory)
+  assert searches(metrics) == 2
+  pd.testing.assert_frame_equal(df, expected)
+  # a finished search is answered from the journal alone
+  df, metrics = search(api_url, directory)
+  assert searches(metrics) == 0
+  pd.testing.assert_frame_equal(df, expected)
+
+
+def test_merge_into_drops_known_repositories(api_url: str,
+                                             directory: str, tmp_path):
+  expected, _ = search(api_url, directory)
+  csv_path: str = os.path.join(tmp_path, 'data.csv')
+  journal: CrawlJournal = CrawlJournal(directory)
+  try:
+    journal._schema.save(expected.head(50), csv_path)
+    df: pd.DataFrame = journal.merge_into(csv_path)
+    assert df['id'].tolist() == expected['id'].tolist()
+    # merging again does not add anything
+    assert journal.merge_into(csv_path)['id'].tolist() == df['id'].tolist()
+  finally:
+    journal.close()
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import pandas as pd
+from gh_search.keywords import RelevanceScreen
+
+FILTERS_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'filters')
+
+
+def test_import_does_not_load_the_screening_package():
+  # a fresh interpreter, the tests may have loaded anything already
+  code: str = ('import sys, gh_search\n'
+               'gh_search.RelevanceScreen(["ema"])\n'
+               'print(sorted(m for m in sys.modules if m.split(".")[0] in '
+               '("screening", "bibtexparser", "rispy")))\n'
+               'print(any("filters" in p for p in sys.path))')
+  output: str = subprocess.run(
+    [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+    cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')).stdout
+  assert output.split('\n')[-3:] == ["['screening.keywords']", 'False', '']
+
+
+def test_screen_matches_every_query(monkeypatch):
+  screen: RelevanceScreen = RelevanceScreen([
+    '"ecological momentary" in:description',
+    'ema AND app NOT game', 'mhealth OR ehealth in:topics'])
+  # one index class shared with the literature screening
+  monkeypatch.syspath_prepend(FILTERS_DIR)
+  from screening.keywords import KeywordIndex
+  assert isinstance(screen.index, KeywordIndex)
+  df: pd.DataFrame = pd.DataFrame({
+    'name': ['ema-app', 'ema-game-app', 'tracker'],
+    'description': ['Ecological Momentary Assessment', None, 'An EMA app'],
+    'topics': [['mhealth'], [], None]}, index=[5, 6, 7])
+  matches: pd.DataFrame = screen.screen(df)
+  assert matches.index.tolist() == [5, 6, 7]
+  assert matches[0].tolist() == [True, False, False]
+  assert matches[1].tolist() == [True, False, True]
+  assert matches[2].tolist() == [True, False, False]
+  assert matches['hits'].tolist() == [3, 0, 1]
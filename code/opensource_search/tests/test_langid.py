@@ -0,0 +1,52 @@
+import os
+import pandas as pd
+import pytest
+from gh_search.filters import apply_filters, filter_out_archived, \
+  filter_out_nodesc, filter_out_nonenglish
+from gh_search.langid import LanguageDetector
+
+# the detection and the url check are optional dependencies of the crawler
+pytest.importorskip('langdetect')
+pytest.importorskip('validators')
+
+TEXTS: list = [
+  'A mobile app for ecological momentary assessment of mood',
+  'Eine App zur Erfassung der Stimmung im Alltag von Patienten',
+  'Une application mobile pour évaluer l\'humeur au quotidien',
+  'https://example.org/ema', None, '🙂🙂']
+
+
+def test_languages_are_detected_once(tmp_path):
+  file_path: str = os.path.join(tmp_path, 'cache', 'languages.sqlite')
+  detector: LanguageDetector = LanguageDetector(file_path)
+  languages: list = detector.detect(TEXTS + TEXTS[:2])
+  assert languages == ['en', 'de', 'fr', None, None, None, 'en', 'de']
+  assert detector.stats['detected'] == 5
+  detector.close()
+  # a new session reads the results of the first one from the file
+  detector = LanguageDetector(file_path)
+  assert detector.detect(TEXTS) == languages[:6]
+  assert detector.stats['cached'] == 5 and detector.stats['detected'] == 0
+  detector.close()
+
+
+def test_batches_in_workers_match_one_process():
+  texts: list = [f'{text} {i}' for i in range(5) for text in TEXTS[:3]]
+  sequential: list = LanguageDetector(None, processes=1).detect(texts)
+  parallel: list = LanguageDetector(None, processes=2,
+                                    batch_size=4).detect(texts)
+  assert parallel == sequential
+  assert sequential[:3] == ['en', 'de', 'fr']
+
+
+def test_apply_filters_chains_in_order():
+  df: pd.DataFrame = pd.DataFrame({
+    'description': TEXTS[:4] + ['', 'Another app to track the daily mood'],
+    'is_archived': [False, False, False, False, False, True]})
+  detector: LanguageDetector = LanguageDetector(None, processes=1)
+  filtered: pd.DataFrame = apply_filters(df, [
+    filter_out_nodesc, filter_out_archived,
+    (filter_out_nonenglish, {'detector': detector})])
+  # undetectable urls are kept
+  assert filtered.index.tolist() == [0, 3]
+  assert detector.stats['texts'] == 4
@@ -0,0 +1,71 @@
+import json
+import os
+import pytest
+from gh_search.language import LinguistData
+
+LANGUAGES: str = '''C++:
+  type: programming
+  aliases:
+  - cpp
+  extensions:
+  - ".cpp"
+  - ".h"
+C:
+  type: programming
+  extensions:
+  - ".h"
+  - ".c"
+TeX:
+  type: markup
+  aliases:
+  - latex
+  extensions:
+  - ".tex"
+'''
+
+
+@pytest.fixture
+def file_path(tmp_path) -> str:
+  file_path: str = os.path.join(tmp_path, 'languages.yaml')
+  with open(file_path, 'w', encoding='utf-8') as file:
+    file.write(LANGUAGES)
+  return file_path
+
+
+def test_lookups(file_path: str):
+  lang: LinguistData = LinguistData(file_path)
+  assert lang.is_programming_language('C++')
+  assert lang.is_programming_language('cpp')
+  assert not lang.is_programming_language('TeX')
+  assert not lang.is_programming_language('Brainfuck')
+  assert not lang.is_programming_language(None)
+  assert lang.canonical_name('CPP') == 'C++'
+  assert lang.canonical_name('latex') == 'TeX'
+  assert lang.canonical_name('Brainfuck') is None
+  assert lang.language_for_extension('TEX') == 'TeX'
+  # the first extension of C wins over the second one of C++
+  assert lang.language_for_extension('.h') == 'C'
+
+
+def test_tables_are_shared_and_cached(file_path: str, monkeypatch):
+  assert LinguistData(file_path).is_programming_language('C')
+  sidecar_path: str = f'{file_path}.cache.json'
+  assert os.path.exists(sidecar_path)
+  # further instances of the process neither parse nor read a file
+  monkeypatch.setattr(LinguistData, '_load_or_build_sidecar', None)
+  assert LinguistData(file_path).canonical_name('cpp') == 'C++'
+  monkeypatch.undo()
+  # a new process reads the sidecar instead of the YAML file
+  LinguistData._tables.pop(os.path.abspath(file_path))
+  monkeypatch.setattr(LinguistData, '_read_linguist_data', None)
+  assert LinguistData(file_path).canonical_name('cpp') == 'C++'
+
+
+def test_changed_file_rebuilds_the_sidecar(file_path: str):
+  LinguistData(file_path).is_programming_language('C')
+  LinguistData._tables.pop(os.path.abspath(file_path))
+  with open(file_path, 'a', encoding='utf-8') as file:
+    file.write('Kotlin:\n  type: programming\n')
+  assert LinguistData(file_path).canonical_name('kotlin') == 'Kotlin'
+  with open(f'{file_path}.cache.json', 'r', encoding='utf-8') as file:
+    assert 'Kotlin' in json.load(file)['names']
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+PACKAGE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..')
+
+
+def test_import_writes_no_log_into_the_working_directory(tmp_path):
+  code: str = 'import gh_search\nprint(gh_search.LOG_PATH)'
+  output: str = subprocess.run(
+    [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+    cwd=tmp_path, env={**os.environ, 'PYTHONPATH': PACKAGE_DIR}).stdout
+  assert os.listdir(tmp_path) == []
+  assert os.path.samefile(os.path.dirname(output.strip()),
+                          os.path.join(PACKAGE_DIR, 'data', 'logs'))
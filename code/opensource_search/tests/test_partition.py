@@ -0,0 +1,76 @@
+from datetime import datetime
+import pytest
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.metrics import CrawlMetrics
+from gh_search.search import GitHubSearch
+
+
+def test_counts_request_a_single_item(api_url: str):
+  metrics: CrawlMetrics = CrawlMetrics()
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url, metrics=metrics)
+  assert gh.get_result_count(['ema'], check_limit=False) == 1500
+  gh.dispose()
+  # one search item is about 1 kB, a full page of 100 about 100 kB
+  assert metrics.frame()['bytes'].max() < 2000
+
+
+def test_date_params_fit_the_limit(api: FakeGitHubAPI, api_url: str):
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url)
+  count, qualifier = gh.get_date_params(['ema'], check_limit=False,
+                                        start_date=datetime(2024, 12, 31))
+  gh.dispose()
+  assert 0 < count <= 1000
+  assert api._search(f'ema {qualifier}', 1, 1)[0] == count
+
+
+def test_failed_count_raises_instead_of_narrowing(api_url: str, monkeypatch):
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url)
+  count = gh.get_result_count
+  calls: list = []
+
+  def flaky(keywords: list, check_limit: bool = True) -> int:
+    calls.append(keywords)
+    return -1 if len(calls) == 3 else count(keywords, check_limit)
+  monkeypatch.setattr(gh, 'get_result_count', flaky)
+  with pytest.raises(RuntimeError, match='Could not count'):
+    gh.get_date_params(['ema'], check_limit=False,
+                       start_date=datetime(2024, 12, 31))
+  gh.dispose()
+
+
+def test_partition_covers_every_repository_once(api: FakeGitHubAPI,
+                                                api_url: str):
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url)
+  ranges: list = gh.partition_created_range(['ema'], datetime(2024, 12, 31),
+                                            max_results=200, parallel=True)
+  gh.dispose()
+  assert len(ranges) >= 1500 // 200
+  counts: list = [api._search(f'ema {qualifier}', 1, 1)[0]
+                  for _, qualifier in ranges]
+  assert counts == [count for count, _ in ranges]
+  assert all(0 < count <= 200 for count in counts)
+  # the ranges neither overlap nor leave gaps
+  assert sum(counts) == 1500
+  # merged neighbours would exceed the limit
+  assert all(a + b > 200 for a, b in zip(counts, counts[1:]))
+
+
+def test_failed_window_raises_instead_of_being_kept(api_url: str,
+                                                   monkeypatch):
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url)
+  count = gh.get_result_count
+  calls: list = []
+
+  def flaky(keywords: list, check_limit: bool = True) -> int:
+    calls.append(keywords)
+    return -1 if len(calls) == 4 else count(keywords, check_limit)
+  monkeypatch.setattr(gh, 'get_result_count', flaky)
+  with pytest.raises(RuntimeError, match='Could not count'):
+    gh.partition_created_range(['ema'], datetime(2024, 12, 31),
+                               max_results=200)
+  # the failed count is not cached, a second call asks for it again
+  monkeypatch.setattr(gh, 'get_result_count', count)
+  ranges: list = gh.partition_created_range(['ema'], datetime(2024, 12, 31),
+                                            max_results=200)
+  gh.dispose()
+  assert sum(count for count, _ in ranges) == 1500
@@ -0,0 +1,38 @@
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.readme import ReadmeDecoder
+from gh_search.search import GitHubSearch
+
+
+def test_decode_utf8():
+  decoder: ReadmeDecoder = ReadmeDecoder()
+  assert decoder.decode('# Título ✓'.encode('utf-8')) == '# Título ✓'
+  assert decoder.decode('\ufeff# BOM'.encode('utf-8')) == '# BOM'
+  assert decoder.decode(b'') == ''
+
+
+def test_decode_other_encodings():
+  text: str = ('# Über die App\n\nDiese App erfasst täglich die Stimmung, '
+               'Schlafqualität und Aktivität der Studienteilnehmer.\n') * 20
+  assert ReadmeDecoder().decode(text.encode('latin-1')) == text
+
+
+def test_decode_is_capped():
+  decoder: ReadmeDecoder = ReadmeDecoder(max_bytes=10)
+  assert decoder.decode(b'0123456789abcdef') == '0123456789'
+  # a character cut in half by the cap is dropped
+  assert decoder.decode('012345678é'.encode('utf-8')) == '012345678'
+
+
+def test_readmes_are_downloaded_raw_and_capped(repositories: list):
+  repositories[0]['readme'] = '# Big\n' + 'x' * 5000
+  repositories[1]['readme_path'] = 'docs/README.md'
+  repositories[2]['readme'] = None
+  with FakeGitHubAPI(repositories[:3]) as url:
+    gh: GitHubSearch = GitHubSearch(
+      'token', api_url=url, readme_decoder=ReadmeDecoder(max_bytes=1000))
+    readmes: list = [gh.get_readme(repo['name'], repo['owner'])
+                     for repo in repositories[:3]]
+    gh.dispose()
+  assert readmes[0] == repositories[0]['readme'][:1000]
+  assert readmes[1] == repositories[1]['readme']
+  assert readmes[2] == ''
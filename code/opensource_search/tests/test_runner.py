@@ -0,0 +1,49 @@
+import os
+from datetime import datetime
+import pandas as pd
+import pytest
+from gh_search.rate_limit import TokenPool
+from gh_search.runner import CrawlRunner
+from gh_search.search import GitHubSearch
+
+
+def task(api_url: str, shard_dir: str) -> dict:
+  '''The task of the first keyword line, about 320 repositories.'''
+  return {'index': 0, 'keywords': 'ema', 'tokens': TokenPool(['token']),
+          'shard_dir': shard_dir, 'until': datetime(2012, 12, 31),
+          'journal_dir': None, 'filter': False, 'api_url': api_url}
+
+
+def test_keyword_streams_into_its_shard(api_url: str, tmp_path):
+  stats: dict = CrawlRunner._crawl_keyword(task(api_url, str(tmp_path)))
+  assert stats['ok'] and stats['windows'] == 1 and stats['pages'] == 4
+  shard: pd.DataFrame = pd.read_csv(os.path.join(tmp_path, 'data_0.csv'))
+  assert len(shard) == stats['rows'] and shard['id'].is_unique
+
+
+def test_failed_page_fails_the_keyword(api_url: str, tmp_path, monkeypatch):
+  request = GitHubSearch._request
+
+  def flaky(self, url: str, resource: str = 'core', *args, **kwargs):
+    r = request(self, url, resource, *args, **kwargs)
+    if resource == 'search' and '&page=3' in r.url:
+      r.status_code = 502
+    return r
+  monkeypatch.setattr(GitHubSearch, '_request', flaky)
+  with pytest.raises(RuntimeError, match='HTTP 502 on page 3'):
+    CrawlRunner._crawl_keyword(task(api_url, str(tmp_path)))
+
+
+def test_merge_keeps_the_first_row_of_every_id(tmp_path):
+  output: str = os.path.join(tmp_path, 'data.csv')
+  pd.DataFrame({'id': [1], 'name': ['known']}).to_csv(output, index=False)
+  shards: list = []
+  for i, (ids, name) in enumerate([([1, 2], 'a'), ([2, 3], 'b')]):
+    shards.append(os.path.join(tmp_path, f'data_{i}.csv'))
+    pd.DataFrame({'id': ids, 'name': name}).to_csv(shards[-1], index=False)
+  runner: CrawlRunner = CrawlRunner(output_path=output,
+                                    shard_dir=str(tmp_path))
+  assert runner.merge_shards(shards) == 2
+  merged: pd.DataFrame = pd.read_csv(output)
+  assert merged.to_dict('list') == {'id': [1, 2, 3],
+                                    'name': ['known', 'a', 'b']}
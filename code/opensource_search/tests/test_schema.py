@@ -0,0 +1,33 @@
+import os
+import pandas as pd
+import pytest
+from gh_search.schema import RepositorySchema
+
+
+def test_malformed_list_cells_become_missing(tmp_path):
+  csv_path: str = os.path.join(tmp_path, 'data.csv')
+  pd.DataFrame({'id': [1, 2, 3, 4],
+                'topics': ["['ema', 'mhealth']", '["ema"', '12', ''],
+                'languages': ['["Python"]', "['R', 'Java'", None, '[]']}) \
+    .to_csv(csv_path, index=False)
+  df: pd.DataFrame = RepositorySchema().load(csv_path)
+  assert df['id'].tolist() == [1, 2, 3, 4]
+  assert df['topics'][0] == ['ema', 'mhealth']
+  assert df['topics'][1:].isna().all()
+  assert df['languages'][0] == ['Python'] and df['languages'][3] == []
+  assert df['languages'][1:3].isna().all()
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_types_survive_save_and_load(tmp_path, suffix: str):
+  schema: RepositorySchema = RepositorySchema()
+  df: pd.DataFrame = schema.apply(pd.DataFrame({
+    'id': [1, 2], 'name': ['app', None], 'owner_type': ['User', 'Organization'],
+    'created_at': ['2020-01-02T03:04:05Z', '2021-06-07T08:09:10Z'],
+    'license': ['mit', None], 'num_stars': [3, None],
+    'is_fork': [False, True], 'topics': [['ema', 'mhealth'], []],
+    'default_branch': ['main', 'master'], 'main_language': ['Kotlin', None],
+    'languages': [None, ['R']]}))
+  file_path: str = os.path.join(tmp_path, f'data{suffix}')
+  schema.save(df, file_path)
+  pd.testing.assert_frame_equal(schema.load(file_path), df)
@@ -0,0 +1,32 @@
+import pandas as pd
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.search import GitHubSearch
+
+# about 320 of the fixture repositories, i.e. 4 pages
+KEYWORDS: list = ['ema', 'created:<=2012-12-31']
+
+
+def test_pages_stream_in_api_order(api: FakeGitHubAPI, api_url: str):
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url)
+  pages: list = list(gh.iter_search_pages(KEYWORDS, check_limit=False))
+  df: pd.DataFrame = gh.get_all_search_results(KEYWORDS, check_limit=False)
+  gh.dispose()
+  total, _ = api._search(' '.join(KEYWORDS), 1, 1)
+  assert [len(page) for page in pages] == [100, 100, 100, total - 300]
+  records: list = [record for page in pages for record in page]
+  # the frame is built once from the records of all pages
+  assert df['id'].tolist() == [record['id'] for record in records]
+  assert df['owner'].tolist() == [record['owner'] for record in records]
+  _, fields_of_interest = gh._create_empty_df_of_interest()
+  assert list(df.columns) == fields_of_interest
+
+
+def test_non_programming_repositories_are_skipped(api_url: str):
+  gh: GitHubSearch = GitHubSearch('token', api_url=api_url)
+  df: pd.DataFrame = gh.get_all_search_results(KEYWORDS, check_limit=False)
+  filtered: pd.DataFrame = gh.get_all_search_results(
+    KEYWORDS, filter_out_non_programming=True, check_limit=False)
+  gh.dispose()
+  assert (df['main_language'] == 'TeX').any()
+  expected: pd.DataFrame = df[df['main_language'] != 'TeX']
+  assert filtered['id'].tolist() == expected['id'].tolist()
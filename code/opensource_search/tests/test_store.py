@@ -0,0 +1,55 @@
+import os
+import pandas as pd
+import pytest
+from gh_search.store import SnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path) -> SnapshotStore:
+  raw: pd.DataFrame = pd.DataFrame({
+    'Unnamed: 0': [0, 1, 2], 'id': [1, 2, 3],
+    'url': ['https://github.com/a/x', 'https://github.com/b/y',
+            'https://github.com/c/z'],
+    'description': ['EMA app', 'Mood diary', None],
+    'num_stars': [3, 5, 8], 'topics': ["['ema']", '[]', None]})
+  # a later search with changed stars, and a manual classification
+  filtered: pd.DataFrame = raw[raw['id'] != 2].assign(num_stars=[4, 8])
+  manual: pd.DataFrame = pd.DataFrame({
+    'url': ['https://github.com/a/x'], 'classification': ['EMA']})
+  store: SnapshotStore = SnapshotStore(os.path.join(tmp_path, 'store'))
+  store.build([('raw', raw), ('filtered', filtered), ('manual', manual)])
+  return store
+
+
+def test_snapshots_load_their_own_values(store: SnapshotStore):
+  assert store.snapshots() == ['raw', 'filtered', 'manual']
+  assert store.counts().tolist() == [3, 2, 1]
+  assert store.columns('raw') == ['url', 'id', 'description', 'num_stars',
+                                  'topics']
+  raw: pd.DataFrame = store.load('raw')
+  assert raw['id'].tolist() == [1, 2, 3]
+  assert raw['num_stars'].tolist() == [3, 5, 8]
+  assert raw['topics'][0] == ['ema'] and raw['topics'][1] == []
+  filtered: pd.DataFrame = store.load('filtered', ['url', 'num_stars'])
+  assert list(filtered.columns) == ['url', 'num_stars']
+  assert filtered['num_stars'].tolist() == [4, 8]
+  manual: pd.DataFrame = store.load('manual')
+  assert manual.to_dict('list') == {'url': ['https://github.com/a/x'],
+                                    'classification': ['EMA']}
+  with pytest.raises(KeyError):
+    store.columns('unknown')
+
+
+def test_columns_are_shared_while_they_agree(store: SnapshotStore):
+  meta: dict = store._meta()
+  assert meta['snapshots'][0]['shared'] == ['id', 'description',
+                                            'num_stars', 'topics']
+  assert meta['snapshots'][1]['shared'] == ['id', 'description', 'topics']
+
+
+def test_export_writes_the_snapshot(store: SnapshotStore, tmp_path):
+  file_path: str = os.path.join(tmp_path, 'filtered.csv')
+  store.export('filtered', file_path)
+  df: pd.DataFrame = pd.read_csv(file_path)
+  assert list(df.columns) == store.columns('filtered')
+  assert df['id'].tolist() == [1, 3]
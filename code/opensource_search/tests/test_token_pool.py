@@ -0,0 +1,57 @@
+from datetime import datetime
+from gh_search.fake_api import FakeGitHubAPI
+from gh_search.metrics import CrawlMetrics
+from gh_search.rate_limit import TokenPool
+from gh_search.search import GitHubSearch
+
+
+def count_years(api: FakeGitHubAPI, tokens: list, years: range) -> tuple:
+  '''Counts the repositories of every year in a new `GitHubSearch`.'''
+  metrics: CrawlMetrics = CrawlMetrics()
+  pool: TokenPool = TokenPool(tokens)
+  with api as url:
+    gh: GitHubSearch = GitHubSearch(tokens=pool, api_url=url, metrics=metrics)
+    counts: list = [gh.get_result_count(
+      ['ema', f'created:{year}-01-01..{year}-12-31'], check_limit=False)
+      for year in years]
+    gh.dispose()
+  return counts, metrics, pool
+
+
+def test_tokens_share_the_load(repositories: list):
+  api: FakeGitHubAPI = FakeGitHubAPI(repositories, {'a': True, 'b': True},
+                                     search_limit=3)
+  counts, metrics, _ = count_years(api, ['a', 'b'], range(2010, 2016))
+  assert all(count > 0 for count in counts)
+  # twice the budget of a single token, without waiting for a reset
+  assert api.calls == {'a': 3, 'b': 3}
+  assert not api.rejected
+  assert metrics.frame()['rate_limit_seconds'].sum() < 0.5
+
+
+def test_rejected_token_fails_over(repositories: list):
+  api: FakeGitHubAPI = FakeGitHubAPI(repositories,
+                                     {'revoked': False, 'valid': True})
+  counts, metrics, pool = count_years(api, ['revoked', 'valid'],
+                                      range(2010, 2014))
+  assert all(count > 0 for count in counts)
+  assert api.rejected == {401: 1}
+  assert api.calls == {'valid': 4}
+  assert pool.remaining('search') == 26
+  # the first call is resent with the next token right away
+  assert metrics.frame()['attempts'].tolist() == [2, 1, 1, 1]
+  assert metrics.frame()['backoff_seconds'].sum() == 0
+
+
+def test_exhausted_pool_waits_for_the_reset(repositories: list):
+  api: FakeGitHubAPI = FakeGitHubAPI(repositories, {'a': True, 'b': True},
+                                     search_limit=1, window=2)
+  counts, metrics, _ = count_years(api, ['a', 'b'], range(2010, 2014))
+  assert all(count > 0 for count in counts)
+  # the pool waits instead of running into the limit, resets are whole
+  # seconds at least one second after the first call
+  assert not api.rejected
+  assert api.calls == {'a': 2, 'b': 2}
+  assert metrics.frame()['rate_limit_seconds'].sum() > 0.5
+  assert api._search(f'ema created:<={datetime(2013, 12, 31):%Y-%m-%d}',
+                     1, 1)[0] == sum(counts)